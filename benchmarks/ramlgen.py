@@ -0,0 +1,179 @@
+# coding: utf-8
+"""
+Synthetic RAML definitions and service modules for the benchmarks
+
+Every generated resource ``/items{n}`` has a collection GET with many
+query parameters and a schema validated POST, every generated resource
+``/items{n}/{itemId}`` has a GET.
+"""
+import json
+import os
+import sys
+import tempfile
+
+QUERY_PARAMS = 20
+
+RAML_HEADER = """#%RAML 0.8
+title: Benchmark API
+version: v1
+baseUri: http://localhost/api/{version}/
+mediaType: application/json
+schemas:
+"""
+
+RESOURCE = """
+/items{n}:
+  displayName: Items {n}
+  get:
+    queryParameters:
+{query_params}
+    responses:
+      200:
+        body:
+          application/json:
+            schema: ItemList{n}
+  post:
+    body:
+      application/json:
+        schema: ItemList{n}
+    responses:
+      200:
+        body:
+          application/json:
+            schema: Result
+  /{{itemId}}:
+    displayName: Item {n}
+    uriParameters:
+      itemId:
+        type: integer
+        minimum: 1
+    get:
+      responses:
+        200:
+          body:
+            application/json:
+              schema: Item{n}
+"""
+
+QUERY_PARAM_TYPES = (
+    ('type: string\n        pattern: ^[a-z]+[0-9]*$\n        default: abc', 'abc{}'),
+    ('type: integer\n        minimum: 0\n        maximum: 1000\n        default: 1', '{}'),
+    ('type: number\n        default: 1.5', '{}.5'),
+    ('type: string\n        enum: [a, b, c, d]\n        default: a', 'b'),
+    ('type: bool\n        default: false', 'true'),
+)
+
+MODULE_HEADER = """from pyramlson import api_service, api_method
+
+
+def item(item_id):
+    return dict(id=item_id, name='item {}'.format(item_id), price=1.5, tags=['a', 'b'])
+
+"""
+
+SERVICE = """
+@api_service('/items{n}')
+class Items{n}(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    def get_all(self, **params):
+        return [item(i) for i in range(1, int(params.get('p1', 1)) + 1)]
+
+    @api_method('post')
+    def create(self, items):
+        return dict(success=True, message=str(len(items)))
+
+
+@api_service('/items{n}/{{itemId}}')
+class Item{n}(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    def get_one(self, item_id):
+        return item(int(item_id))
+"""
+
+
+def item_schema():
+    return {
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer", "minimum": 1},
+            "name": {"type": "string", "minLength": 1, "maxLength": 100},
+            "price": {"type": "number", "minimum": 0},
+            "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 10},
+        },
+        "required": ["id", "name", "price"],
+        "additionalProperties": False,
+    }
+
+
+def item_list_schema():
+    return {
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "type": "array",
+        "items": item_schema(),
+    }
+
+
+def query_params():
+    lines = []
+    for i in range(QUERY_PARAMS):
+        (spec, _) = QUERY_PARAM_TYPES[i % len(QUERY_PARAM_TYPES)]
+        lines.append("      p{}:\n        {}".format(i, spec))
+    return '\n'.join(lines)
+
+
+def query_values():
+    """ Return valid values for all the generated query parameters """
+    values = {}
+    for i in range(QUERY_PARAMS):
+        (_, value) = QUERY_PARAM_TYPES[i % len(QUERY_PARAM_TYPES)]
+        values['p{}'.format(i)] = value.format(i)
+    return values
+
+
+def generate(resources, directory=None):
+    """ Generate a RAML file with ``resources`` resources and a module
+        with their services.
+
+        :returns: ``(raml_path, module_name)``, the directory is added
+            to ``sys.path`` so the module can be scanned
+    """
+    directory = directory or tempfile.mkdtemp(prefix='pyramlson-bench-')
+    schemas_dir = os.path.join(directory, 'schemas')
+    if not os.path.isdir(schemas_dir):
+        os.makedirs(schemas_dir)
+    parts = [RAML_HEADER]
+    parts.append("  - Result: |\n      {}\n".format(json.dumps({
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "type": "object",
+        "properties": {"success": {"type": "boolean"}, "message": {"type": "string"}},
+    })))
+    params = query_params()
+    for n in range(resources):
+        for (name, schema) in (('Item', item_schema()), ('ItemList', item_list_schema())):
+            filename = '{}{}.json'.format(name, n)
+            with open(os.path.join(schemas_dir, filename), 'w') as schema_file:
+                json.dump(schema, schema_file, indent=2)
+            parts.append("  - {}{}: !include schemas/{}\n".format(name, n, filename))
+    for n in range(resources):
+        parts.append(RESOURCE.format(n=n, query_params=params))
+    raml_path = os.path.join(directory, 'bench-api.raml')
+    with open(raml_path, 'w') as raml:
+        raml.write(''.join(parts))
+
+    module_name = 'bench_services_{}'.format(resources)
+    with open(os.path.join(directory, module_name + '.py'), 'w') as module:
+        module.write(MODULE_HEADER)
+        for n in range(resources):
+            module.write(SERVICE.format(n=n))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return (raml_path, module_name)
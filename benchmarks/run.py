@@ -0,0 +1,203 @@
+# coding: utf-8
+"""
+Pyramlson benchmarks
+
+Runs offline against an in-process WSGI app built from a synthetic RAML
+definition (see :py:mod:`benchmarks.ramlgen`)::
+
+    python -m benchmarks.run                        # print results
+    python -m benchmarks.run --save benchmarks/baselines/default.json
+    python -m benchmarks.run --compare benchmarks/baselines/default.json
+
+Comparing prints the relative change of every metric and exits with
+status 1 if any metric regressed by more than ``--threshold`` percent.
+Baselines are only comparable on the same machine and Python version.
+"""
+import argparse
+import gc
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from pyramid.config import Configurator
+from webtest import TestApp
+
+from benchmarks import ramlgen
+
+try:
+    clock = time.perf_counter
+except AttributeError: # pragma: no cover
+    clock = time.time
+
+
+STARTUP_SIZES = (10, 100, 300)
+REQUEST_RESOURCES = 20
+
+
+def build_app(raml_path, module_name, **settings):
+    """ Build the WSGI app the way an application would """
+    config_settings = {
+        'pyramlson.apidef_path': raml_path,
+        'pyramlson.convert_parameters': 'true',
+    }
+    config_settings.update(settings)
+    config = Configurator(settings=config_settings)
+    config.include('pyramlson')
+    config.scan(module_name)
+    return config.make_wsgi_app()
+
+
+def bench_startup(sizes, repeat, directory):
+    """ Time parsing the RAML definition and scanning the services, with
+        eager and lazy view compilation
+    """
+    results = {}
+    # exclude one-time import costs
+    build_app(*ramlgen.generate(1, directory))
+    for size in sizes:
+        (raml_path, module_name) = ramlgen.generate(size, directory)
+        for (prefix, mode) in (('startup', 'eager'), ('startup.lazy', 'lazy')):
+            timings = []
+            for _ in range(repeat):
+                gc.collect()
+                started = clock()
+                build_app(raml_path, module_name, **{'pyramlson.compilation': mode})
+                timings.append(clock() - started)
+            results['{}.resources_{}'.format(prefix, size)] = summarize(timings)
+    return results
+
+
+def summarize(timings):
+    """ Return mean, median, p95 and throughput of a list of durations (in ms) """
+    timings = sorted(timings)
+    count = len(timings)
+    total = sum(timings)
+    return {
+        'mean_ms': total / count * 1000,
+        'p50_ms': timings[count // 2] * 1000,
+        'p95_ms': timings[min(count - 1, int(count * 0.95))] * 1000,
+        'ops_per_sec': count / total if total else None,
+    }
+
+
+def run_requests(call, iterations, warmup):
+    for _ in range(warmup):
+        call()
+    timings = []
+    for _ in range(iterations):
+        started = clock()
+        call()
+        timings.append(clock() - started)
+    return summarize(timings)
+
+
+def request_scenarios(app):
+    """ Return a dict of scenario name -> callable doing one request """
+    testapp = TestApp(app)
+    query = ramlgen.query_values()
+    small_body = [bench_item(i) for i in range(1, 11)]
+    large_body = [bench_item(i) for i in range(1, 2001)]
+    invalid_body = [dict(bench_item(1), price=-1)]
+    return {
+        'get.one': lambda: testapp.get('/api/v1/items0/1', status=200),
+        'get.many_query_params': lambda: testapp.get('/api/v1/items0', params=query, status=200),
+        'get.large_list': lambda: testapp.get(
+            '/api/v1/items0', params=dict(query, p1='1000'), status=200),
+        'post.small_body': lambda: testapp.post_json('/api/v1/items0', small_body, status=200),
+        'post.large_body': lambda: testapp.post_json('/api/v1/items0', large_body, status=200),
+        'error.invalid_param': lambda: testapp.get('/api/v1/items0/abc', status=400),
+        'error.invalid_body': lambda: testapp.post_json(
+            '/api/v1/items0', invalid_body, status=400),
+        'error.not_found': lambda: testapp.get('/api/v1/nothing', status=404),
+    }
+
+
+def bench_item(item_id):
+    return dict(id=item_id, name='item {}'.format(item_id), price=9.99, tags=['x'])
+
+
+def bench_requests(iterations, warmup, settings, directory):
+    (raml_path, module_name) = ramlgen.generate(REQUEST_RESOURCES, directory)
+    app = build_app(raml_path, module_name, **settings)
+    results = {}
+    for (name, call) in sorted(request_scenarios(app).items()):
+        # large payloads take much longer, scale them down
+        count = iterations // 10 if 'large' in name else iterations
+        results['request.{}'.format(name)] = run_requests(call, max(count, 10), warmup)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Print a comparison report, return True if nothing regressed """
+    ok = True
+    print("{:45} {:>12} {:>12} {:>9}".format('metric', 'baseline', 'current', 'change'))
+    for name in sorted(results):
+        if name not in baseline:
+            print("{:45} {:>12} {:>12.3f} {:>9}".format(name, '-', results[name]['mean_ms'], 'new'))
+            continue
+        before = baseline[name]['mean_ms']
+        after = results[name]['mean_ms']
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            ok = False
+        print("{:45} {:>12.3f} {:>12.3f} {:>+8.1f}%{}".format(name, before, after, change, flag))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=500,
+                        help='requests per scenario (default: 500)')
+    parser.add_argument('--warmup', type=int, default=20,
+                        help='warmup requests per scenario (default: 20)')
+    parser.add_argument('--startup-repeat', type=int, default=3,
+                        help='app builds per RAML size (default: 3)')
+    parser.add_argument('--sizes', type=int, nargs='*', default=STARTUP_SIZES,
+                        help='RAML sizes (number of resources) for startup benchmarks')
+    parser.add_argument('--setting', action='append', default=[], metavar='KEY=VALUE',
+                        help='additional pyramlson setting for the request benchmarks')
+    parser.add_argument('--save', metavar='FILE', help='store the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a stored baseline')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='regression threshold in percent (default: 10)')
+    args = parser.parse_args(argv)
+
+    settings = dict(setting.split('=', 1) for setting in args.setting)
+    results = {}
+    directory = tempfile.mkdtemp(prefix='pyramlson-bench-')
+    try:
+        results.update(bench_startup(args.sizes, args.startup_repeat, directory))
+        results.update(bench_requests(args.iterations, args.warmup, settings, directory))
+    finally:
+        shutil.rmtree(directory)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        ok = compare(results, baseline['results'], args.threshold)
+    else:
+        ok = True
+        for name in sorted(results):
+            result = results[name]
+            print("{:45} mean {:9.3f}ms  p50 {:9.3f}ms  p95 {:9.3f}ms  {:10.1f}/s".format(
+                name, result['mean_ms'], result['p50_ms'], result['p95_ms'],
+                result['ops_per_sec']))
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'settings': settings,
+                'results': results,
+            }, baseline_file, indent=2, sort_keys=True)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,7 +7,12 @@ import os
 import logging
 
 from email.utils import parsedate
-from inspect import getmembers
+from functools import partial
+try:
+    from inspect import iscoroutinefunction
+except ImportError: # pragma: no cover
+    def iscoroutinefunction(func):  # pylint: disable=unused-argument,missing-docstring
+        return False
 from collections import namedtuple, defaultdict
 
 import venusian
@@ -16,21 +21,42 @@ from pyramid.path import (
     AssetResolver,
     DottedNameResolver
 )
-from pyramid.httpexceptions import (
-    HTTPBadRequest,
-    HTTPInternalServerError,
-    HTTPNoContent,
-)
+from pyramid.httpexceptions import HTTPInternalServerError
+from pyramid.events import ApplicationCreated, NewResponse
+from pyramid.exceptions import ConfigurationError
 from pyramid.interfaces import IExceptionResponse
 from pyramid.settings import asbool
 
 from .apidef import IRamlApiDefinition
-from .utils import (
-    prepare_json_body,
-    render_mime_view,
-    render_view,
-    validate_and_convert
+from .cache import (
+    ICacheBackend,
+    create_backend,
+    create_cached_view,
+    create_invalidating_view,
+)
+from .compression import ICompressor, create_compressor
+from .compilation import CompilationReport, ICompilationReport, log_report
+from .cors import ICorsPolicy, add_cors_headers, create_cors_policy, create_options_view
+from .error import IErrorLogLimiter, create_limiter
+from .fields import FIELDS_PARAM, INCLUDE_PARAM
+from .pagination import CURSOR_PARAM, ICursorCodec, create_codec
+from .plan import body_settings, compile_request_plan
+from .reload import (
+    DEFAULT_INTERVAL as DEFAULT_RELOAD_INTERVAL,
+    ApiReloader,
+    IApiReloader,
+    find_reloader,
 )
+from .response_validation import validation_mode
+from .timing import (
+    ENVIRON_KEY as TIMINGS_KEY,
+    ITimingSink,
+    clock,
+    create_sink,
+    record_phase,
+    server_timing,
+)
+from .validation import BACKENDS as VALIDATOR_BACKENDS
 
 LOG = logging.getLogger(__name__)
 
@@ -47,11 +73,22 @@ DEFAULT_METHOD_MAP = {
 MethodRestConfig = namedtuple('MethodRestConfig', [
     'http_method',
     'permission',
-    'returns'
+    'returns',
+    'etag',
+    'last_modified',
+    'cache_ttl',
+    'cache_vary',
+    'cache_per_principal',
+    'invalidates',
+    'path',
+    'paginate',
+    'sparse_fields',
+    'stream_body',
 ])
-
-
-MARKER = object()
+# all options after 'returns' are optional
+MethodRestConfig.__new__.__defaults__ = (
+    None, None, None, (), None, None, '', False, False, False
+)
 
 
 class NoMethodFoundError(Exception):
@@ -61,7 +98,11 @@ class NoMethodFoundError(Exception):
 class api_method(object):
     # pylint: disable=invalid-name
 
-    def __init__(self, http_method, permission=None, returns=None):
+    def __init__(self, http_method, permission=None, returns=None, etag=None,
+                 last_modified=None, cache_ttl=None, cache_vary=(),
+                 cache_per_principal=None, invalidates=None, path='', paginate=False,
+                 sparse_fields=False, stream_body=False):
+        # pylint: disable=too-many-arguments
         """Configure a resource method corresponding with a RAML resource path
 
         This decorator must be used to declare REST resources.
@@ -78,16 +119,91 @@ class api_method(object):
                 - PUT: 201
                 - DELETE: 204
 
+        :param etag: Enable ``ETag`` support for GET requests.
+
+            If ``True``, the ETag is a hash of the rendered response body.
+            If a callable, it's called with the same arguments as the
+            decorated method before the method itself and should return
+            the ETag (e.g. a version, converted to a string) cheaply, so a ``304 Not Modified``
+            can be returned without calling the method at all.
+
+        :param last_modified: A callable called with the same arguments
+            as the decorated method, returning a ``datetime`` used for
+            ``Last-Modified`` / ``If-Modified-Since`` handling.
+
+        :param cache_ttl: Cache rendered GET responses for this many seconds.
+
+            Responses are cached per route, URI parameters and the query
+            parameters defined in the RAML file, cache hits are served
+            without calling the method.
+
+        :param cache_vary: Names of request headers the cached response
+            depends on, e.g. ``('Accept-Language', )``.
+
+        :param cache_per_principal: Cache responses per set of effective
+            principals. Defaults to ``True`` if a permission is set.
+
+        :param invalidates: Invalidate cached responses after a successful
+            call: ``True`` for the responses of this service, or a list
+            of route names.
+
+        :param path: The path of the RAML resource relative to the path
+            of the service, e.g. ``/{bookId}``. Per default a method serves
+            the resource at the path of the service.
+
+        :param paginate: Enable cursor pagination, see
+            :py:mod:`pyramlson.pagination`. The method gets the signed
+            ``cursor`` query parameter as a
+            :py:class:`pyramlson.pagination.Cursor` and returns a
+            :py:class:`pyramlson.pagination.Page`.
+
+        :param sparse_fields: Let clients select the fields of the
+            response with the ``fields`` and ``include`` query parameters,
+            see :py:mod:`pyramlson.fields`. The method gets the parsed
+            :py:class:`pyramlson.fields.Projection` as the ``fields``
+            argument.
+
+        :param stream_body: Pass a JSON array request body to the method
+            as an iterator of items, which are parsed and validated while
+            the method consumes them, so large bodies never have to be
+            held in memory. An invalid item raises a ``400 Bad Request``
+            only when it's reached, after the method has already
+            processed the items before it: methods should process the
+            items in a transaction or tolerate partial imports. The
+            iterator can only be consumed once.
+
         """
         self.http_method = http_method
         self.permission = permission
         self.returns = returns if returns is not None else DEFAULT_METHOD_MAP[self.http_method]
+        self.etag = etag
+        self.last_modified = last_modified
+        self.cache_ttl = cache_ttl
+        self.cache_vary = tuple(cache_vary)
+        if cache_per_principal is None:
+            cache_per_principal = permission is not None
+        self.cache_per_principal = cache_per_principal
+        self.invalidates = invalidates
+        self.path = path
+        self.paginate = paginate
+        self.sparse_fields = sparse_fields
+        self.stream_body = stream_body
 
     def __call__(self, method):
         method._rest_config = MethodRestConfig(
             self.http_method,
             self.permission,
-            self.returns
+            self.returns,
+            self.etag,
+            self.last_modified,
+            self.cache_ttl,
+            self.cache_vary,
+            self.cache_per_principal,
+            self.invalidates,
+            self.path,
+            self.paginate,
+            self.sparse_fields,
+            self.stream_body
         )
         return method
 
@@ -97,77 +213,120 @@ class api_service(object):
 
     This decorator configures a class as a REST resource. All endpoints
     must be defined in a RAML file.
+
+    :param resource_path: The RAML resource path of the service
+    :param route_name: The route name, defaults to the RAML display name
+        and the path of the resource
+    :param api: The name or base path of the API definition configured
+        in ``pyramlson.apidefs``, defaults to ``pyramlson.apidef_path``.
+        Stack several decorators to serve more than one API version
+        with the same class.
     """
     # pylint: disable=invalid-name
 
-    def __init__(self, resource_path, route_name=None):
+    def __init__(self, resource_path, route_name=None, api=None):
         LOG.debug("Resource path: %s", resource_path)
         self.resource_path = resource_path
+        self.api = api
         self.route_name = route_name
+        self.default_route_name = route_name
+        self.route_names = {}
         self.resources = []
+        self.method_index = {}
         self.apidef = None
         self.cls = None
         self.module = None
 
     def callback(self, scanner, name, cls):
         config = scanner.config.with_package(self.module)
-        self.apidef = config.registry.queryUtility(IRamlApiDefinition)
+        self.apidef = find_apidef(config.registry, self.api)
+        if self.apidef is None:
+            # venusian ignores ValueErrors raised by scan callbacks
+            raise ConfigurationError("No RAML API definition {} for {}".format(
+                self.api or 'configured',
+                cls
+            ))
+        # the class might be scanned more than once (e.g. by several apps)
+        self.route_name = self.default_route_name
+        self.route_names = {}
+        self.resources = []
+        self.method_index = build_method_index(self.cls)
         self.create_route(config)
         LOG.debug("registered routes with base route '%s'", self.apidef.base_path)
         self.create_views(config)
 
     def create_route(self, config):
-        LOG.debug("Creating route for %s", self.resource_path)
+        # the path of the service and all sub-paths of its methods
+        rel_paths = set(rel_path for (_, rel_path) in self.method_index)
+        rel_paths.add('')
+        for rel_path in sorted(rel_paths):
+            self.create_sub_route(config, rel_path)
+
+    def create_sub_route(self, config, rel_path):
+        resource_path = self.resource_path + rel_path
+        LOG.debug("Creating route for %s", resource_path)
         supported_methods = []
 
-        path = self.resource_path
+        path = resource_path
         if self.apidef.base_path:
             path = "{}{}".format(self.apidef.base_path, path)
 
+        route_name = self.route_name if not rel_path else None
         # Find all methods for this resource path
-        for resource in self.apidef.get_resources(self.resource_path):
-            if self.route_name is None:
-                self.route_name = "{}-{}".format(resource.display_name, path)
+        for resource in self.apidef.get_resources(resource_path):
+            if route_name is None:
+                if self.default_route_name is not None:
+                    route_name = "{}{}".format(self.default_route_name, rel_path)
+                else:
+                    route_name = "{}-{}".format(resource.display_name, path)
 
             method = resource.method.upper()
-            self.resources.append((method, resource, None))
+            self.resources.append((route_name, method, resource, None))
             supported_methods.append(method)
 
+        if not supported_methods:
+            if rel_path:
+                LOG.warning("No RAML resource %s for the methods of %s", resource_path, self.cls)
+            return
+        if not rel_path:
+            self.route_name = route_name
+        self.route_names[rel_path] = route_name
+
         # Add one route for all the methods at this resource path
-        if supported_methods:
-            LOG.debug("Registering route with path %s", path)
-            config.add_route(self.route_name, path, factory=self.cls)
-            # add a default OPTIONS view if none was defined by the resource
-            opts_meth = 'OPTIONS'
-            if opts_meth not in supported_methods:
-                methods = supported_methods + [opts_meth]
-                self.resources.append((
-                    'OPTIONS',
-                    resource,
-                    create_options_view(methods)
-                ))
+        LOG.debug("Registering route with path %s", path)
+        config.add_route(route_name, path, factory=self.cls)
+        # add a default OPTIONS view if none was defined by the resource
+        opts_meth = 'OPTIONS'
+        if opts_meth not in supported_methods:
+            methods = supported_methods + [opts_meth]
+            self.resources.append((
+                route_name,
+                'OPTIONS',
+                resource,
+                create_options_view(methods, config.registry.queryUtility(ICorsPolicy))
+            ))
 
     def create_views(self, config):
-        for (method, resource, default_view) in self.resources:
-            LOG.debug("Creating view %s %s", self.route_name, method)
+        for (route_name, method, resource, default_view) in self.resources:
+            LOG.debug("Creating view %s %s", route_name, method)
             if default_view:
                 config.add_view(
                     default_view,
-                    route_name=self.route_name,
+                    route_name=route_name,
                     request_method=method
                 )
             else:
-                (view, permission) = self.create_view(resource)
+                (view, permission) = self.create_view(resource, config.registry, route_name)
                 LOG.debug(
                     "Registering view %s for route name '%s', resource '%s', method '%s'",
                     view,
-                    self.route_name,
+                    route_name,
                     resource,
                     method
                 )
                 config.add_view(
                     view,
-                    route_name=self.route_name,
+                    route_name=route_name,
                     request_method=method,
                     permission=permission
                 )
@@ -178,7 +337,8 @@ class api_service(object):
         self.module = info.module
         return cls
 
-    def create_view(self, resource):
+    def create_view(self, resource, registry=None, route_name=None):
+        route_name = route_name or self.route_name
         (meth, cfg) = self.get_service_class_method(resource)
         LOG.debug("Got method %s for resource %s", meth, resource)
         if not meth:
@@ -187,86 +347,215 @@ class api_service(object):
                 resource
             )
             raise NoMethodFoundError(msg)
-        transform = self.apidef.args_transform_cb
-        transform = transform if callable(transform) else lambda arg: arg
-        convert = self.apidef.convert_params
-        def view(context, request):
-            required_params = [context]
-            optional_params = dict()
-            # URI parameters have the highest prio
-            if resource.uri_params:
-                for param in resource.uri_params:
-                    param_value = request.matchdict[param.name]
-                    converted = validate_and_convert(param, param_value)
-                    # pyramid router makes sure the URI params are all
-                    # set, otherwise the view isn't called all, because
-                    # a NotFound error is triggered before the request
-                    # can be routed to this view
-                    required_params.append(converted if convert else param_value)
-            # If there's a body defined - include it before traits or query params
-            if resource.body:
-                if resource.body[0].mime_type == "application/json":
-                    required_params.append(prepare_json_body(request, resource.body))
-                else:
-                    required_params.append(request.body)
-            if resource.query_params:
-                for param in resource.query_params:
-                    # query params are always named (i.e. not positional)
-                    # so they effectively become keyword agruments in a
-                    # method call, we just make sure they are present
-                    # in the request if marked as 'required'
-                    if param.required and param.name not in request.params:
-                        raise HTTPBadRequest("{} ({}) is required".format(param.name, param.type))
-                    param_value = request.params.get(param.name, MARKER)
-                    absent = param_value is MARKER
-                    # If there's no default value defined in RAML let the decorated
-                    # method decide which defaults to use. Unfortunatelly there is
-                    # no way to tell whether a default value was declared as 'null'
-                    # in RAML or if it was omitted - it's None in both cases
-                    if absent and param.default is None:
-                        continue
-                    if not absent:
-                        if convert:
-                            param_value = validate_and_convert(param, param_value)
-                    else:
-                        if convert:
-                            param_value = validate_and_convert(param, param.default)
-                        else:
-                            param_value = param.default
-                    optional_params[transform(param.name)] = param_value
-            result = meth(*required_params, **optional_params)
-
-            # check if a response type is specified
-            for response in resource.responses:
-                if response.code == cfg.returns and len(response.body) == 1:
-                    body = response.body[0]
-                    if body.mime_type == 'application/json':
-                        break
-                    response_mime_type = body.mime_type
-                    return render_mime_view(result, cfg.returns, mime_type=response_mime_type)
-
-            return render_view(request, result, cfg.returns)
-
+        # bind the current state, the view might be compiled lazily
+        compile_view = partial(
+            self.compile_view,
+            self.apidef,
+            meth,
+            cfg,
+            resource,
+            registry,
+            route_name,
+            list(self.route_names.values())
+        )
+        report = registry.queryUtility(ICompilationReport) if registry is not None else None
+        if report is None:
+            view = compile_view()
+        else:
+            view = report.create_view(compile_view, route_name, resource.method.upper())
+        reloader = find_reloader(registry, self.apidef) if registry is not None else None
+        if reloader is not None:
+            rebuild = partial(
+                self.compile_view,
+                meth=meth,
+                cfg=cfg,
+                registry=registry,
+                route_name=route_name,
+                service_routes=list(self.route_names.values())
+            )
+            view = reloader.add_view(view, rebuild, route_name, resource)
         return (view, cfg.permission)
 
+    @staticmethod
+    def compile_view(apidef, meth, cfg, resource, registry, route_name, service_routes):
+        """ Compile the request plan of a resource method and return its view """
+        # pylint: disable=too-many-arguments
+        sink = registry.queryUtility(ITimingSink) if registry is not None else None
+        plan = compile_request_plan(
+            apidef,
+            resource,
+            cfg,
+            registry,
+            timed=sink is not None
+        )
+        if iscoroutinefunction(meth):
+            from .asgi import compile_async
+            (meth, plan) = compile_async(meth, plan)
+        if sink is None:
+            view = create_plan_view(meth, plan)
+        else:
+            view = create_timed_view(
+                meth,
+                plan,
+                sink,
+                route_name,
+                resource.method.upper(),
+                debug=asbool(registry.settings.get('pyramlson.debug'))
+            )
+        if cfg.cache_ttl or cfg.invalidates:
+            view = wrap_cache(view, resource, cfg, registry, route_name, service_routes)
+        return view
+
     def get_service_class_method(self, resource):
         rel_path = resource.path[len(self.resource_path):]
         LOG.debug("Relative path for %s: '%s'", resource, rel_path)
-        http_method = resource.method.lower()
-        for (_, member) in getmembers(self.cls):
-            if not hasattr(member, '_rest_config'):
-                continue
-            cfg = member._rest_config  # pylint: disable=protected-access
-            if (cfg.http_method.lower() == http_method) and callable(member):
-                return (member, cfg)
-        return (None, None)
-
-def create_options_view(supported_methods):
-    """ Create a view callable for the OPTIONS request """
-    def view(context, request):  # pylint: disable=unused-argument,missing-docstring
-        response = HTTPNoContent()
-        response.headers['Access-Control-Allow-Methods'] =\
-                ', '.join(supported_methods)
+        return self.method_index.get((resource.method.lower(), rel_path), (None, None))
+
+
+def find_apidef(registry, api=None):
+    """ Return the API definition registered with the name or base
+        path ``api``, the default definition if ``api`` is None
+    """
+    apidef = registry.queryUtility(IRamlApiDefinition, name=api or '')
+    if apidef is None and api:
+        for (_, candidate) in registry.getUtilitiesFor(IRamlApiDefinition):
+            if candidate.base_path == api:
+                return candidate
+    return apidef
+
+
+def wrap_cache(view, resource, cfg, registry, route_name, service_routes):
+    """ Wrap a view with the response cache or cache invalidation """
+    # pylint: disable=too-many-arguments
+    backend = registry.queryUtility(ICacheBackend) if registry is not None else None
+    if backend is None:
+        LOG.warning("No cache backend registered, not caching %s", route_name)
+        return view
+    if cfg.invalidates:
+        if cfg.invalidates is True:
+            # all routes of this service
+            namespaces = service_routes
+        else:
+            namespaces = cfg.invalidates
+        return create_invalidating_view(view, backend, namespaces)
+    if resource.method.lower() != 'get':
+        raise ConfigurationError("Only GET responses can be cached: {} {}".format(
+            resource.method.upper(), resource.path))
+    query_params = set(param.name for param in resource.query_params or ())
+    if cfg.sparse_fields:
+        # read by the view even if they aren't declared
+        query_params.update((FIELDS_PARAM, INCLUDE_PARAM))
+    if cfg.paginate:
+        query_params.add(CURSOR_PARAM)
+    return create_cached_view(
+        view,
+        backend,
+        route_name,
+        float(cfg.cache_ttl),
+        query_params=query_params,
+        vary=cfg.cache_vary,
+        per_principal=cfg.cache_per_principal,
+        compressor=registry.queryUtility(ICompressor)
+    )
+
+
+def build_method_index(cls):
+    """ Return a dict of ``(http_method, relative path)`` -> ``(method, cfg)``
+        of all the methods of a class decorated with :py:class:`api_method`.
+
+        The class and its bases are walked only once, attributes are
+        not looked up (so properties aren't evaluated).
+    """
+    members = {}
+    for klass in reversed(cls.__mro__):
+        members.update(vars(klass))
+    index = {}
+    for name in sorted(members):
+        member = members[name]
+        cfg = getattr(member, '_rest_config', None)
+        if cfg is None or not callable(member):
+            continue
+        key = (cfg.http_method.lower(), cfg.path)
+        if key in index:
+            LOG.warning("%s.%s ignored, %s already serves %s %s",
+                        cls.__name__, name, index[key][0].__name__, key[0].upper(),
+                        key[1] or '/')
+            continue
+        index[key] = (member, cfg)
+    return index
+
+def create_plan_view(meth, plan):
+    """ Create a view callable running a compiled request plan """
+    (uri_params, body, query_params, precondition, render) = plan
+    def view(context, request):  # pylint: disable=missing-docstring
+        required_params = [context]
+        # URI parameters have the highest prio
+        if uri_params:
+            matchdict = request.matchdict
+            # pyramid router makes sure the URI params are all
+            # set, otherwise the view isn't called all, because
+            # a NotFound error is triggered before the request
+            # can be routed to this view
+            for (name, convert) in uri_params:
+                required_params.append(convert(matchdict[name]))
+        # If there's a body defined - include it before traits or query params
+        if body is not None:
+            required_params.append(body(request))
+        optional_params = dict()
+        if query_params:
+            params = request.params
+            for extract in query_params:
+                extract(params, optional_params)
+        if precondition is not None:
+            response = precondition(request, required_params, optional_params)
+            if response is not None:
+                return response
+        result = meth(*required_params, **optional_params)
+        return render(request, result)
+    return view
+
+
+def create_timed_view(meth, plan, sink, route_name, method, debug=False):
+    """ Create a view callable running a compiled request plan and
+        reporting the duration of each phase to a timing sink.
+
+        The plan must have been compiled with ``timed=True``.
+    """
+    # pylint: disable=too-many-arguments
+    (uri_params, body, query_params, precondition, render) = plan
+    def view(context, request):  # pylint: disable=missing-docstring
+        timings = request.environ[TIMINGS_KEY] = []
+        try:
+            started = clock()
+            required_params = [context]
+            if uri_params:
+                matchdict = request.matchdict
+                for (name, convert) in uri_params:
+                    required_params.append(convert(matchdict[name]))
+                started = record_phase(request, 'uri', started)
+            if body is not None:
+                # body strategies record their own phases
+                required_params.append(body(request))
+                started = clock()
+            optional_params = dict()
+            if query_params:
+                params = request.params
+                for extract in query_params:
+                    extract(params, optional_params)
+                started = record_phase(request, 'query', started)
+            response = None
+            if precondition is not None:
+                response = precondition(request, required_params, optional_params)
+                started = record_phase(request, 'precondition', started)
+            if response is None:
+                result = meth(*required_params, **optional_params)
+                started = record_phase(request, 'call', started)
+                response = render(request, result)
+                record_phase(request, 'render', started)
+        finally:
+            sink.record(route_name, method, timings)
+        if debug:
+            response.headers['Server-Timing'] = server_timing(timings)
         return response
     return view
 
@@ -283,7 +572,7 @@ def includeme(config):
        config = Configurator()
        config.include('pyramlson')
     """
-    from pyramlson.apidef import RamlApiDefinition
+    from pyramlson.apidef import RamlApiDefinition, get_shared_definition, parse_apidefs
     settings = config.registry.settings
     settings['pyramlson.debug'] = \
             settings.get('debug_all') or \
@@ -294,7 +583,33 @@ def includeme(config):
     config.add_notfound_view('pyramlson.error.notfound', renderer='json')
     config.add_forbidden_view('pyramlson.error.forbidden', renderer='json')
 
-    if 'pyramlson.apidef_path' not in settings:
+    config.registry.registerUtility(
+        CompilationReport(settings.get('pyramlson.compilation', 'eager')),
+        ICompilationReport
+    )
+    config.add_subscriber(log_report, ApplicationCreated)
+
+    # check the mode and sizes once, before any service is scanned
+    validation_mode(settings)
+    body_settings(settings)
+
+    cors_policy = create_cors_policy(settings)
+    if cors_policy is not None:
+        config.registry.registerUtility(cors_policy, ICorsPolicy)
+        config.add_subscriber(add_cors_headers, NewResponse)
+
+    cursor_codec = create_codec(settings)
+    if cursor_codec is not None:
+        config.registry.registerUtility(cursor_codec, ICursorCodec)
+
+    error_log_limiter = create_limiter(settings)
+    if error_log_limiter is not None:
+        config.registry.registerUtility(error_log_limiter, IErrorLogLimiter)
+
+    apidefs = parse_apidefs(settings.get('pyramlson.apidefs', ''))
+    if 'pyramlson.apidef_path' in settings:
+        apidefs.insert(0, ('', settings['pyramlson.apidef_path']))
+    if not apidefs:
         raise ValueError("Cannot create RamlApiDefinition without a RAML file.")
 
 
@@ -308,11 +623,64 @@ def includeme(config):
     if 'pyramlson.convert_parameters' in settings:
         convert_params = asbool(settings['pyramlson.convert_parameters'])
 
+    validator_backend = settings.get('pyramlson.schema_validator', 'jsonschema')
+    if validator_backend not in VALIDATOR_BACKENDS:
+        raise ConfigurationError(
+            "Unknown pyramlson.schema_validator '{}'".format(validator_backend)
+        )
+    cache_dir = settings.get('pyramlson.apidef_cache_dir')
+
+    shared = asbool(settings.get('pyramlson.shared_apidef', False))
+
+    timing_sink = create_sink(settings)
+    if timing_sink is not None:
+        config.registry.registerUtility(timing_sink, ITimingSink)
+
+    config.registry.registerUtility(create_backend(settings), ICacheBackend)
+
+    compressor = create_compressor(settings)
+    if compressor is not None:
+        config.registry.registerUtility(compressor, ICompressor)
+
+    batch_path = settings.get('pyramlson.batch_path')
+    if batch_path:
+        from pyramlson.batch import add_batch_view
+        add_batch_view(
+            config,
+            batch_path,
+            max_requests=settings.get('pyramlson.batch_max_requests', 50),
+            workers=settings.get('pyramlson.batch_workers', 0),
+            permission=settings.get('pyramlson.batch_permission')
+        )
+
+    json_serializer = settings.get('pyramlson.json_serializer')
+    if json_serializer:
+        from pyramlson.renderers import IJSONSerializer, JSONSerializer, add_json_adapter
+        config.registry.registerUtility(JSONSerializer(json_serializer), IJSONSerializer)
+        config.add_directive('add_pyramlson_json_adapter', add_json_adapter)
+
+    reload_apidefs = asbool(settings.get('pyramlson.reload', False))
+    reload_interval = settings.get('pyramlson.reload_interval', DEFAULT_RELOAD_INTERVAL)
+
     res = AssetResolver()
-    apidef_path = res.resolve(settings['pyramlson.apidef_path'])
-    apidef = RamlApiDefinition(
-            apidef_path.abspath(),
-            args_transform_cb=args_transform_cb,
-            convert_params=convert_params
+    factory = get_shared_definition if shared else RamlApiDefinition
+    for (name, path) in apidefs:
+        apidef_path = res.resolve(path).abspath()
+        options = dict(
+                args_transform_cb=args_transform_cb,
+                convert_params=convert_params,
+                validator_backend=validator_backend,
+                cache_dir=cache_dir
+                )
+        apidef = factory(apidef_path, **options)
+        config.registry.registerUtility(apidef, IRamlApiDefinition, name=name)
+        if reload_apidefs:
+            reloader = ApiReloader(
+                config.registry,
+                apidef,
+                partial(RamlApiDefinition, apidef_path, **options),
+                apidef_path,
+                name=name,
+                interval=reload_interval
             )
-    config.registry.registerUtility(apidef, IRamlApiDefinition)
+            config.registry.registerUtility(reloader, IApiReloader, name=name)
@@ -2,15 +2,30 @@
 """
 Pyramlson API Definition utility
 """
+import gc
+import os
+import threading
+
+from collections import OrderedDict
+
 import ramlfications
 
+from ramlfications.config import MEDIA_TYPES
 from zope.interface import Interface
 
+from .renderers import NDJSON_MIME_TYPE
+from .snapshot import parse_cached, take_snapshot
+from .validation import POOL
+
 try:
     from urllib.parse import urlparse
 except ImportError: # pragma: no cover
     from urlparse import urlparse
 
+# ramlfications silently drops bodies with unknown mime types
+if NDJSON_MIME_TYPE not in MEDIA_TYPES:
+    MEDIA_TYPES.append(NDJSON_MIME_TYPE)
+
 
 class IRamlApiDefinition(Interface):
     """ Marker interface for API Definition """
@@ -29,18 +44,56 @@ class RamlApiDefinition(object):
         :param convert_params: If true, all parameters
             will be converted to their declared types before beeing
             passed in to the view callable
+        :param validator_backend: The JSON schema validator backend,
+            either ``jsonschema`` (default) or ``fastjsonschema``
+        :param cache_dir: Optional directory to cache the parsed RAML
+            definition in. If set, :py:attr:`raml` is a compact
+            :py:class:`pyramlson.snapshot.RamlRoot` snapshot instead
+            of the ramlfications root node.
+        :param compact: If true, :py:attr:`raml` is always a compact
+            :py:class:`pyramlson.snapshot.RamlRoot` snapshot and the
+            ramlfications object graph is discarded after parsing.
+        :param schema_pool: The :py:class:`pyramlson.validation.SchemaPool`
+            deduplicating schemas and validators, defaults to the pool
+            shared by all definitions of the process.
     """
 
-    __traits_cache = {}
-
-    def __init__(self, apidef_path, args_transform_cb=None, convert_params=False):
-        self.raml = ramlfications.parse(apidef_path)
+    def __init__(self, apidef_path, args_transform_cb=None, convert_params=False,
+                 validator_backend='jsonschema', cache_dir=None, compact=False,
+                 schema_pool=None):
+        # pylint: disable=too-many-arguments
+        if cache_dir:
+            self.raml = parse_cached(apidef_path, cache_dir)
+        elif compact:
+            self.raml = take_snapshot(ramlfications.parse(apidef_path))
+        else:
+            self.raml = ramlfications.parse(apidef_path)
         self.base_uri = self.raml.base_uri
         if self.base_uri.endswith('/'):
             self.base_uri = self.base_uri[:-1]
         self.base_path = urlparse(self.base_uri).path
         self.args_transform_cb = args_transform_cb
         self.convert_params = convert_params
+        self.validator_backend = validator_backend
+        self.schema_pool = schema_pool if schema_pool is not None else POOL
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """ Index resources, schemas and traits for constant time lookups """
+        self._resources_by_path = OrderedDict()
+        self._resources_by_method = {}
+        for res in self.raml.resources or ():
+            self._resources_by_path.setdefault(res.path, []).append(res)
+            self._resources_by_method.setdefault((res.path, res.method.lower()), res)
+        self._schemas = {}
+        for schemas in self.raml.schemas or ():
+            for (name, schema) in schemas.items():
+                if name not in self._schemas:
+                    self._schemas[name] = self.schema_pool.intern(schema)
+        self._traits = {}
+        for trait in self.raml.traits or ():
+            # the last definition wins, like it used to
+            self._traits[trait.name] = trait
 
     @property
     def default_mime_type(self):
@@ -51,32 +104,41 @@ class RamlApiDefinition(object):
 
     def get_trait(self, name):
         """ Return a trait from RAML """
-        if not self.raml.traits:
-            return None
-        trait = None
-        if name not in self.__traits_cache:
-            for trait in self.raml.traits:
-                if trait.name == name:
-                    self.__traits_cache[name] = trait
-        return self.__traits_cache.get(name)
+        return self._traits.get(name)
 
     def get_resources(self, path=None):
         """ Get resources """
         if not path:
             return self.raml.resources
-        return (res for res in self.raml.resources if res.path == path)
+        return self._resources_by_path.get(path, [])
+
+    def get_resource(self, path, method):
+        """ Get the resource for a path and a HTTP method or None """
+        return self._resources_by_method.get((path, method.lower()))
 
     def get_schema_def(self, name):
         """ Get schema definition """
-        if self.raml.schemas is None:
+        return self._schemas.get(name)
+
+    def get_items_validator(self, body):
+        """ Return a compiled :py:class:`pyramlson.validation.ArrayItemsValidator`
+            for a body whose JSON schema describes an array or None.
+        """
+        schema = self.get_schema(body)
+        if not schema:
             return None
-        for schemas in self.raml.schemas:
-            if name in schemas:
-                return schemas[name]
+        return self.schema_pool.get_items_validator(schema, self.validator_backend)
+
+    def compile_validators(self):
+        """ Compile the validators of all JSON request bodies upfront """
+        for res in self.raml.resources or ():
+            if res.body:
+                self.get_validator(res.body)
 
     def get_schema(self, body):
         """ Extract a schema from body for a given mime-type """
-        if isinstance(body, list):
+        if body and not hasattr(body, 'mime_type'):
+            # a list of bodies
             bodies = body
             for body in bodies:
                 if body.mime_type == 'application/json':
@@ -88,3 +150,72 @@ class RamlApiDefinition(object):
         if '$schema' not in schema:
             schema = self.get_schema_def(schema)
         return schema
+
+    def get_validator(self, body):
+        """ Return a compiled validator for the JSON schema of a body
+            or None if there's no schema.
+
+            Validators are compiled once per schema content and shared
+            through the schema pool.
+        """
+        schema = self.get_schema(body)
+        if not schema:
+            return None
+        return self.schema_pool.get_validator(schema, self.validator_backend)
+
+
+_SHARED_LOCK = threading.Lock()
+_SHARED = {}
+
+
+def parse_apidefs(value):
+    """ Parse the ``pyramlson.apidefs`` setting: one ``name = path``
+        per line. Return a list of ``(name, path)`` tuples.
+    """
+    apidefs = []
+    for line in value.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        (name, sep, path) = line.partition('=')
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError("Invalid pyramlson.apidefs entry: {}".format(line))
+        apidefs.append((name.strip(), path.strip()))
+    return apidefs
+
+
+def get_shared_definition(apidef_path, **kwargs):
+    """ Return a process-wide shared :py:class:`RamlApiDefinition`.
+
+        The definition is built only once per path and options, uses
+        the compact snapshot form and has all its request body
+        validators compiled. Build it in the master process of a
+        pre-forking server (e.g. in the gunicorn ``--preload`` app
+        factory) and call :py:func:`freeze` before the workers are
+        forked, so the workers share its memory pages.
+
+        :param apidef_path: Path to RAML definition
+        :param kwargs: Keyword arguments for :py:class:`RamlApiDefinition`
+    """
+    kwargs['compact'] = True
+    key = (os.path.abspath(apidef_path), tuple(sorted(kwargs.items())))
+    with _SHARED_LOCK:
+        apidef = _SHARED.get(key)
+        if apidef is None:
+            apidef = RamlApiDefinition(apidef_path, **kwargs)
+            apidef.compile_validators()
+            _SHARED[key] = apidef
+    return apidef
+
+
+def freeze():
+    """ Move all objects allocated so far out of reach of the cyclic
+        garbage collector (Python 3.7+).
+
+        Call this in the master process right before forking workers:
+        otherwise the first collection in each worker touches the
+        headers of every shared object and copies the memory pages.
+    """
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
@@ -0,0 +1,267 @@
+# coding: utf-8
+"""
+Pyramlson asyncio support
+
+Service methods decorated with ``api_method`` can be coroutine
+functions (``async def``). In a WSGI application they are run to
+completion in the worker thread. Served by :py:class:`ASGIApp`, the
+request is routed, authorized, converted and validated in a thread pool
+as usual, but the coroutine is awaited on the event loop, so slow
+backends don't tie up a thread per request::
+
+    config = Configurator(settings=settings)
+    config.include('pyramlson')
+    config.scan('.resources')
+    application = ASGIApp(config.make_wsgi_app())
+
+The result of the coroutine is rendered in the thread pool too, and
+streamed response bodies are iterated there, so serialization and
+compression don't block the event loop. Response callbacks and
+finished callbacks run before the coroutine completes. Headers set on the response by callbacks and tweens are
+copied to the final response. Callbacks registered with
+:py:meth:`AsyncResponse.on_complete` (e.g. by the response cache) run
+once the coroutine succeeded and its result has been rendered.
+"""
+import asyncio
+import logging
+import sys
+import threading
+
+from functools import partial
+from io import BytesIO
+
+from pyramid.response import Response
+
+
+LOG = logging.getLogger(__name__)
+
+ENVIRON_KEY = 'pyramlson.asgi'
+
+# headers of the pending response not copied to the final response
+NOT_COPIED_HEADERS = frozenset(['content-type', 'content-length'])
+
+_LOCAL = threading.local()
+
+try:
+    get_running_loop = asyncio.get_running_loop
+except AttributeError: # pragma: no cover
+    # Python < 3.7, in a coroutine get_event_loop returns the running loop
+    get_running_loop = asyncio.get_event_loop
+
+
+def run_sync(coroutine):
+    """ Run a coroutine to completion in an event loop of the current thread """
+    loop = getattr(_LOCAL, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _LOCAL.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coroutine)
+
+
+class AsyncCall(object):
+    """ A pending call of a coroutine service method """
+
+    __slots__ = ('meth', 'args', 'kwargs')
+
+    def __init__(self, meth, args, kwargs):
+        self.meth = meth
+        self.args = args
+        self.kwargs = kwargs
+
+    def coroutine(self):
+        return self.meth(*self.args, **self.kwargs)
+
+
+class AsyncResponse(Response):
+    """ Returned by views of coroutine methods when served by
+        :py:class:`ASGIApp`, the response is rendered after the
+        coroutine has been awaited on the event loop.
+    """
+
+    def __init__(self, request, call, render):
+        super(AsyncResponse, self).__init__()
+        # not a list, so the response cache never stores it
+        self.app_iter = ()
+        self.request = request
+        self.call = call
+        self.render = render
+        self.callbacks = []
+
+    def on_complete(self, callback):
+        """ Call ``callback`` with the final response once the coroutine
+            succeeded and its result has been rendered
+        """
+        self.callbacks.append(callback)
+
+
+def _defer(meth, *args, **kwargs):
+    return AsyncCall(meth, args, kwargs)
+
+
+def _render_async(render, request, call):
+    if request.environ.get(ENVIRON_KEY):
+        return AsyncResponse(request, call, render)
+    return render(request, run_sync(call.coroutine()))
+
+
+def compile_async(meth, plan):
+    """ Adapt a coroutine service method and its request plan.
+
+        Return a method creating an :py:class:`AsyncCall` and a plan
+        whose render strategy runs the call before rendering its result.
+    """
+    return (partial(_defer, meth), plan._replace(render=partial(_render_async, plan.render)))
+
+
+def build_environ(scope, body):
+    """ Build a WSGI environment from an ASGI HTTP scope and the request body """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': client[0] if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        ENVIRON_KEY: True,
+    }
+    for (name, value) in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            environ[name] = value
+            continue
+        key = 'HTTP_{}'.format(name)
+        if key in environ:
+            value = '{},{}'.format(environ[key], value)
+        environ[key] = value
+    environ.setdefault('CONTENT_LENGTH', str(len(body)))
+    return environ
+
+
+class ASGIApp(object):
+    """ Serve a Pyramid application using pyramlson as ASGI application.
+
+        :param app: The Pyramid WSGI application (router)
+        :param executor: A :py:class:`concurrent.futures.Executor` for
+            routing and synchronous views, the loop's default executor
+            is used if None
+    """
+
+    def __init__(self, app, executor=None):
+        self.app = app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError("Unsupported ASGI scope type {}".format(scope['type']))
+        body = await self.read_body(receive)
+        environ = build_environ(scope, body)
+        loop = get_running_loop()
+        response = await loop.run_in_executor(
+            self.executor,
+            self.app.execution_policy,
+            environ,
+            self.app
+        )
+        if isinstance(response, AsyncResponse):
+            response = await self.finish(response, environ)
+        await self.send_response(send, response, environ)
+
+    def run_in_executor(self, func, *args):
+        return get_running_loop().run_in_executor(self.executor, func, *args)
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        return b''.join(chunks)
+
+    async def finish(self, pending, environ):
+        """ Await the coroutine of a pending response and render its
+            result in the executor
+        """
+        request = pending.request
+        callbacks = pending.callbacks
+        try:
+            result = await pending.call.coroutine()
+            response = await self.run_in_executor(pending.render, request, result)
+        except Exception: # pylint: disable=broad-except
+            LOG.debug("Coroutine of %s %s failed", environ['REQUEST_METHOD'],
+                      environ['PATH_INFO'], exc_info=True)
+            response = await self.run_in_executor(request.invoke_exception_view, sys.exc_info())
+            callbacks = ()
+        for (name, value) in pending.headerlist:
+            if name.lower() not in NOT_COPIED_HEADERS and name not in response.headers:
+                response.headers.add(name, value)
+        for callback in callbacks:
+            callback(response)
+        return response
+
+    async def send_response(self, send, response, environ):
+        """ Send a response, calling it as WSGI application so webob
+            handles conditional and HEAD requests. Bodies which aren't
+            materialized (e.g. streamed results) are iterated in the
+            executor.
+        """
+        started = []
+
+        def start_response(status, headerlist, exc_info=None):
+            # pylint: disable=unused-argument
+            started.append((int(status.split(' ', 1)[0]), headerlist))
+
+        app_iter = response(environ, start_response)
+        try:
+            (status, headerlist) = started[0]
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [
+                    (name.encode('latin-1'), value.encode('latin-1'))
+                    for (name, value) in headerlist
+                ],
+            })
+            materialized = isinstance(app_iter, (list, tuple))
+            chunks = iter(app_iter)
+            while True:
+                if materialized:
+                    chunk = next(chunks, None)
+                else:
+                    chunk = await self.run_in_executor(next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk,
+                                'more_body': True})
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,212 @@
+# coding: utf-8
+"""
+Pyramlson batch endpoint
+
+If ``pyramlson.batch_path`` is set, a ``POST`` to this path accepts a
+JSON list of sub-requests::
+
+    [
+        {"method": "GET", "path": "/api/v1/books/123"},
+        {"method": "GET", "path": "/api/v1/books", "query": {"limit": 10}},
+        {"method": "POST", "path": "/api/v1/books", "body": {"id": 1, ...}}
+    ]
+
+Every sub-request is routed through the application like a normal
+request (including authentication and permission checks, using the
+headers of the batch request) and the responses are returned as a
+list of ``{"status": ..., "headers": {...}, "body": ...}`` objects in
+the same order.
+
+With ``pyramlson.batch_workers`` > 0, consecutive ``GET`` and ``HEAD``
+sub-requests are executed concurrently in a bounded thread pool, all
+other sub-requests are executed in order.
+"""
+import json
+import logging
+
+from pyramid.httpexceptions import HTTPBadRequest
+from pyramid.request import Request
+
+try:
+    from urllib.parse import urlencode
+except ImportError: # pragma: no cover
+    from urllib import urlencode
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError: # pragma: no cover
+    ThreadPoolExecutor = None
+
+
+LOG = logging.getLogger(__name__)
+
+ROUTE_NAME = 'pyramlson-batch'
+
+# sub-requests which may be executed concurrently
+CONCURRENT_METHODS = ('GET', 'HEAD')
+
+# the type of strings decoded from JSON
+TEXT_TYPE = type(u'')
+
+# request environment copied from the batch request to its sub-requests
+INHERITED_ENVIRON = ('SERVER_NAME', 'SERVER_PORT', 'SCRIPT_NAME', 'REMOTE_ADDR',
+                     'REMOTE_USER', 'wsgi.url_scheme')
+
+# headers of the batch request not passed on to its sub-requests: the
+# sub-responses are embedded in the batch response, which is compressed
+# and validated by itself
+NOT_INHERITED_HEADERS = frozenset([
+    'HTTP_CONTENT_TYPE',
+    'HTTP_CONTENT_LENGTH',
+    'HTTP_CONTENT_ENCODING',
+    'HTTP_ACCEPT_ENCODING',
+    'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE',
+])
+
+# headers of sub-responses not included in the batch response
+SKIPPED_RESPONSE_HEADERS = frozenset(['content-length', 'set-cookie'])
+
+
+def _base_environ(request):
+    environ = dict(
+        (key, value) for (key, value) in request.environ.items()
+        if key.startswith('HTTP_') and key not in NOT_INHERITED_HEADERS
+    )
+    for key in INHERITED_ENVIRON:
+        if key in request.environ:
+            environ[key] = request.environ[key]
+    return environ
+
+
+def parse_batch(request, batch_path, max_requests):
+    """ Parse and check the body of a batch request, return a list of
+        ``(method, path, query, headers, body)`` tuples
+    """
+    try:
+        items = request.json_body
+    except ValueError as err:
+        raise HTTPBadRequest("Invalid batch request: {}".format(err))
+    if not isinstance(items, list):
+        raise HTTPBadRequest("Invalid batch request: expected a list of requests")
+    if len(items) > max_requests:
+        raise HTTPBadRequest("Too many requests in batch: {} (max. {})".format(
+            len(items), max_requests))
+    subrequests = []
+    for (index, item) in enumerate(items):
+        if not isinstance(item, dict) or not item.get('path'):
+            raise HTTPBadRequest("Invalid batch request {}: a path is required".format(index))
+        path = item['path']
+        if not isinstance(path, TEXT_TYPE) or not path.startswith('/') or \
+                path.split('?', 1)[0].rstrip('/') == batch_path:
+            raise HTTPBadRequest("Invalid batch request {}: invalid path {}".format(index, path))
+        method = item.get('method', 'GET')
+        if not isinstance(method, TEXT_TYPE):
+            raise HTTPBadRequest("Invalid batch request {}: invalid method {}".format(index, method))
+        for name in ('query', 'headers'):
+            if not isinstance(item.get(name) or {}, dict):
+                raise HTTPBadRequest("Invalid batch request {}: {} must be an object".format(
+                    index, name))
+        if not all(isinstance(value, TEXT_TYPE) for value in (item.get('headers') or {}).values()):
+            raise HTTPBadRequest("Invalid batch request {}: header values must be strings".format(
+                index))
+        subrequests.append((
+            method.upper(),
+            path,
+            item.get('query') or {},
+            item.get('headers') or {},
+            item.get('body'),
+        ))
+    return subrequests
+
+
+def make_subrequest(request, method, path, query, headers, body):
+    """ Create a sub-request of a batch request """
+    # pylint: disable=too-many-arguments
+    if query:
+        separator = '&' if '?' in path else '?'
+        path = '{}{}{}'.format(path, separator, urlencode(query, doseq=True))
+    subrequest = Request.blank(path, environ=_base_environ(request), method=method)
+    for (name, value) in headers.items():
+        subrequest.headers[name] = value
+    if body is not None:
+        subrequest.body = json.dumps(body).encode('utf-8')
+        subrequest.content_type = 'application/json'
+    return subrequest
+
+
+def response_dict(response):
+    """ Convert a sub-response to a dict included in the batch response """
+    headers = dict(
+        (name, value) for (name, value) in response.headerlist
+        if name.lower() not in SKIPPED_RESPONSE_HEADERS
+    )
+    body = response.body
+    if not body:
+        body = None
+    elif response.content_type == 'application/json':
+        body = json.loads(body.decode(response.charset or 'utf-8'))
+    else:
+        body = body.decode(response.charset or 'utf-8', 'replace')
+    return dict(status=response.status_int, headers=headers, body=body)
+
+
+class BatchView(object):
+    """ The batch view callable
+
+        :param batch_path: The path of the batch endpoint
+        :param max_requests: Maximum number of sub-requests per batch
+        :param workers: Size of the thread pool, 0 executes all
+            sub-requests sequentially
+    """
+
+    def __init__(self, batch_path, max_requests=50, workers=0):
+        self.batch_path = batch_path.rstrip('/')
+        self.max_requests = int(max_requests)
+        self.executor = None
+        workers = int(workers)
+        if workers > 0:
+            if ThreadPoolExecutor is None: # pragma: no cover
+                LOG.warning("concurrent.futures is not available, batches run sequentially")
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def __call__(self, request):
+        subrequests = parse_batch(request, self.batch_path, self.max_requests)
+        responses = []
+        pending = []
+        for (method, path, query, headers, body) in subrequests:
+            subrequest = make_subrequest(request, method, path, query, headers, body)
+            if self.executor is not None and method in CONCURRENT_METHODS:
+                pending.append(subrequest)
+                continue
+            responses.extend(self.invoke_all(request, pending))
+            pending = []
+            responses.append(self.invoke(request, subrequest))
+        responses.extend(self.invoke_all(request, pending))
+        return responses
+
+    def invoke(self, request, subrequest):
+        return response_dict(request.invoke_subrequest(subrequest, use_tweens=True))
+
+    def invoke_all(self, request, subrequests):
+        if len(subrequests) < 2:
+            return [self.invoke(request, subrequest) for subrequest in subrequests]
+        futures = [
+            self.executor.submit(self.invoke, request, subrequest)
+            for subrequest in subrequests
+        ]
+        return [future.result() for future in futures]
+
+
+def add_batch_view(config, batch_path, max_requests=50, workers=0, permission=None):
+    """ Register the batch endpoint at ``batch_path`` """
+    # pylint: disable=too-many-arguments
+    config.add_route(ROUTE_NAME, batch_path)
+    config.add_view(
+        BatchView(batch_path, max_requests, workers),
+        route_name=ROUTE_NAME,
+        request_method='POST',
+        renderer='json',
+        permission=permission
+    )
@@ -0,0 +1,287 @@
+# coding: utf-8
+"""
+Pyramlson response cache
+
+GET methods decorated with ``api_method(..., cache_ttl=...)`` store
+their rendered responses in a cache backend. Cache hits are served
+before any parameter conversion, method call or JSON encoding happens.
+Write methods can invalidate the cached responses of their service
+with ``api_method(..., invalidates=True)``.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+from functools import partial
+
+from pyramid.path import DottedNameResolver
+from pyramid.response import Response
+from zope.interface import Interface
+
+
+LOG = logging.getLogger(__name__)
+
+# headers which are never stored in the cache
+UNCACHED_HEADERS = frozenset(['set-cookie', 'content-length', 'date'])
+
+
+class ICacheBackend(Interface):
+    """ Marker interface for response cache backends.
+
+        A backend implements ``get(namespace, key)``, returning a
+        :py:class:`CacheEntry` or None, ``set(namespace, key, entry)``
+        and ``invalidate(namespace)``.
+    """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+# status: the HTTP status code
+# headerlist: tuple of (name, value) pairs
+# body: the rendered body (bytes)
+# expires: timestamp after which the entry is stale
+CacheEntry = namedtuple('CacheEntry', [
+    'status',
+    'headerlist',
+    'body',
+    'expires',
+])
+
+
+def entry_from_response(response, ttl):
+    """ Create a :py:class:`CacheEntry` from a rendered response or
+        return None if it can't be cached (e.g. streamed responses)
+    """
+    if not isinstance(response.app_iter, list) or response.status_int != 200:
+        return None
+    headerlist = tuple(
+        (name, value) for (name, value) in response.headerlist
+        if name.lower() not in UNCACHED_HEADERS
+    )
+    return CacheEntry(response.status_int, headerlist, response.body, time.time() + ttl)
+
+
+def response_from_entry(entry):
+    """ Create a response from a :py:class:`CacheEntry` """
+    response = Response(status=entry.status, headerlist=list(entry.headerlist))
+    response.body = entry.body
+    response.conditional_response = True
+    return response
+
+
+class MemoryCache(object):
+    """ In-process LRU cache bounded by number of entries and body size.
+
+        Invalidating a namespace bumps its generation number, entries of
+        older generations are never returned again and age out of the LRU.
+
+        :param max_entries: Maximum number of entries
+        :param max_bytes: Maximum size of all cached bodies
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.size = 0
+
+    def get(self, namespace, key):
+        with self.lock:
+            full_key = (namespace, self.generations.get(namespace, 0), key)
+            entry = self.entries.get(full_key)
+            if entry is None:
+                return None
+            if entry.expires < time.time():
+                self._remove(full_key)
+                return None
+            # move to the end, i.e. mark as recently used
+            del self.entries[full_key]
+            self.entries[full_key] = entry
+            return entry
+
+    def set(self, namespace, key, entry):
+        size = len(entry.body)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self.lock:
+            full_key = (namespace, self.generations.get(namespace, 0), key)
+            if full_key in self.entries:
+                self._remove(full_key)
+            self.entries[full_key] = entry
+            self.size += size
+            while len(self.entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.size > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, full_key):
+        entry = self.entries.pop(full_key)
+        self.size -= len(entry.body)
+
+    def invalidate(self, namespace):
+        with self.lock:
+            self.generations[namespace] = self.generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()
+
+
+class FileCache(object):
+    """ File based cache shared by all processes using the same directory.
+
+        :param directory: The cache directory
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, namespace, key=None):
+        path = os.path.join(self.directory, _digest(namespace))
+        if key is not None:
+            path = os.path.join(path, _digest(key))
+        return path
+
+    def get(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as cached:
+                entry = pickle.load(cached)
+        except (IOError, OSError):
+            return None
+        except Exception as err: # pylint: disable=broad-except
+            LOG.warning("Ignoring broken cache file %s: %s", path, err)
+            return None
+        if entry.expires < time.time():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def set(self, namespace, key, entry):
+        directory = self._path(namespace)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            (fd, tmp_path) = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                pickle.dump(entry, tmp, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, self._path(namespace, key))
+        except (IOError, OSError) as err:
+            LOG.warning("Could not write cache file in %s: %s", directory, err)
+
+    def invalidate(self, namespace):
+        directory = self._path(namespace)
+        if not os.path.isdir(directory):
+            return
+        # move it out of the way atomically before removing it
+        trash = '{}.{}.invalidated'.format(directory, _digest(time.time()))
+        try:
+            os.rename(directory, trash)
+        except OSError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+
+def create_backend(settings):
+    """ Create the response cache backend from settings.
+
+        - ``pyramlson.cache_backend``: ``memory`` (default), ``file``
+          or a dotted name of a backend factory taking the settings
+        - ``pyramlson.cache_max_entries``, ``pyramlson.cache_max_bytes``:
+          bounds of the memory backend
+        - ``pyramlson.cache_dir``: directory of the file backend
+    """
+    backend = settings.get('pyramlson.cache_backend', 'memory')
+    if backend == 'memory':
+        return MemoryCache(
+            settings.get('pyramlson.cache_max_entries', 1000),
+            settings.get('pyramlson.cache_max_bytes'),
+        )
+    if backend == 'file':
+        if not settings.get('pyramlson.cache_dir'):
+            raise ValueError("pyramlson.cache_dir is required for the file cache backend")
+        return FileCache(settings['pyramlson.cache_dir'])
+    return DottedNameResolver().maybe_resolve(backend)(settings)
+
+
+def create_cached_view(view, backend, namespace, ttl, query_params=(), vary=(),
+                       per_principal=False, compressor=None):
+    """ Wrap a view callable so its responses are served from a cache.
+
+        The cache key consists of the matched URI parameters, the
+        declared query parameters, the ``vary`` request headers,
+        if ``per_principal`` is true, the effective principals and,
+        if a ``compressor`` is given, the negotiated content encoding,
+        so compressed responses are cached once per encoding.
+    """
+    # pylint: disable=too-many-arguments
+    query_params = tuple(sorted(query_params))
+    vary = tuple(vary)
+
+    def cached_view(context, request):  # pylint: disable=missing-docstring
+        params = request.GET
+        key = (
+            tuple(sorted(request.matchdict.items())) if request.matchdict else (),
+            tuple(tuple(params.getall(name)) for name in query_params),
+            tuple(request.headers.get(name) for name in vary),
+            tuple(sorted(request.effective_principals)) if per_principal else (),
+            compressor.negotiate(request) if compressor is not None else None,
+        )
+        entry = backend.get(namespace, key)
+        if entry is not None:
+            return response_from_entry(entry)
+        response = view(context, request)
+        when_complete(response, partial(_store, backend, namespace, key, ttl))
+        return response
+    return cached_view
+
+
+def _store(backend, namespace, key, ttl, response):
+    entry = entry_from_response(response, ttl)
+    if entry is not None:
+        backend.set(namespace, key, entry)
+
+
+def _invalidate(backend, namespaces, response):
+    # pylint: disable=unused-argument
+    for namespace in namespaces:
+        backend.invalidate(namespace)
+
+
+def when_complete(response, callback):
+    """ Call ``callback`` with the final response: right away, or for
+        a pending response of a coroutine method (see
+        :py:class:`pyramlson.asgi.AsyncResponse`) once the coroutine
+        succeeded
+    """
+    on_complete = getattr(response, 'on_complete', None)
+    if on_complete is not None:
+        on_complete(callback)
+    else:
+        callback(response)
+
+
+def create_invalidating_view(view, backend, namespaces):
+    """ Wrap a view callable so it invalidates the cached responses of
+        the given namespaces after it succeeded
+    """
+    def invalidating_view(context, request):  # pylint: disable=missing-docstring
+        response = view(context, request)
+        when_complete(response, partial(_invalidate, backend, namespaces))
+        return response
+    return invalidating_view
@@ -0,0 +1,147 @@
+# coding: utf-8
+"""
+Pyramlson view compilation modes
+
+``pyramlson.compilation`` chooses when the request plans of the
+generated views (converters, validators, render strategies) are built:
+
+- ``eager`` (default): while the service classes are scanned, so the
+  application is fully prepared before it accepts requests
+- ``lazy``: on the first request of every view, for a faster startup
+  with huge RAML definitions where most routes are rarely used. Call
+  :py:func:`warmup` to prepare all views which haven't been used yet,
+  e.g. in a post-fork hook.
+
+The compilation time of every resource is recorded in the
+:py:class:`CompilationReport` registered for the application, a
+summary is logged when the application has been created.
+"""
+import logging
+import threading
+
+from zope.interface import Interface
+
+from .timing import clock
+
+
+LOG = logging.getLogger(__name__)
+
+MODES = ('eager', 'lazy')
+
+
+class ICompilationReport(Interface):
+    """ Marker interface for the compilation report """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+class LazyView(object):
+    """ A view callable compiling the real view on its first call
+
+        :param compile_view: Callable returning the compiled view
+        :param report: The :py:class:`CompilationReport` to record the
+            compilation time in
+        :param name: ``(route_name, method)`` of the view
+    """
+
+    def __init__(self, compile_view, report, name):
+        self.compile_view = compile_view
+        self.report = report
+        self.name = name
+        self.view = None
+        self.lock = threading.Lock()
+
+    def __call__(self, context, request):
+        view = self.view
+        if view is None:
+            view = self.prepare()
+        return view(context, request)
+
+    def prepare(self):
+        """ Compile the view unless it has been compiled already """
+        with self.lock:
+            if self.view is None:
+                self.view = self.report.compile(self.compile_view, self.name)
+                self.compile_view = None
+        return self.view
+
+
+class CompilationReport(object):
+    """ Compiles views and keeps track of the compilation times
+
+        :param mode: ``eager`` or ``lazy``
+    """
+
+    def __init__(self, mode='eager'):
+        if mode not in MODES:
+            raise ValueError("Invalid pyramlson.compilation: {}".format(mode))
+        self.lazy = mode == 'lazy'
+        self.lock = threading.Lock()
+        # list of ((route_name, method), seconds)
+        self.timings = []
+        self.pending = []
+
+    def compile(self, compile_view, name):
+        started = clock()
+        view = compile_view()
+        duration = clock() - started
+        LOG.debug("Compiled %s %s in %.3fms", name[1], name[0], duration * 1000)
+        with self.lock:
+            self.timings.append((name, duration))
+        return view
+
+    def create_view(self, compile_view, route_name, method):
+        """ Return the compiled view or a :py:class:`LazyView` """
+        name = (route_name, method)
+        if not self.lazy:
+            return self.compile(compile_view, name)
+        view = LazyView(compile_view, self, name)
+        with self.lock:
+            self.pending.append(view)
+        return view
+
+    def warmup(self):
+        """ Compile all pending lazy views, return the number of views compiled """
+        with self.lock:
+            (pending, self.pending) = (self.pending, [])
+        compiled = 0
+        for view in pending:
+            if view.view is None:
+                view.prepare()
+                compiled += 1
+        return compiled
+
+    def total(self):
+        return sum(duration for (_, duration) in self.timings)
+
+    def slowest(self, count=5):
+        """ Return the ``count`` slowest ``((route_name, method), seconds)`` pairs """
+        return sorted(self.timings, key=lambda timing: timing[1], reverse=True)[:count]
+
+
+def warmup(registry):
+    """ Compile all views of an application which haven't been compiled yet """
+    report = registry.getUtility(ICompilationReport)
+    started = clock()
+    compiled = report.warmup()
+    LOG.info("Warmup compiled %d views in %.1fms", compiled, (clock() - started) * 1000)
+    return compiled
+
+
+def log_report(event):
+    """ ApplicationCreated subscriber logging a compilation summary """
+    report = event.app.registry.queryUtility(ICompilationReport)
+    if report is None:
+        return
+    LOG.info(
+        "%d views compiled in %.1fms%s",
+        len(report.timings),
+        report.total() * 1000,
+        ", {} views pending".format(len(report.pending)) if report.pending else ''
+    )
+    if report.timings and LOG.isEnabledFor(logging.DEBUG):
+        LOG.debug("Slowest views: %s", ', '.join(
+            '{} {} {:.3f}ms'.format(method, route_name, duration * 1000)
+            for ((route_name, method), duration) in report.slowest()
+        ))
+
@@ -0,0 +1,180 @@
+# coding: utf-8
+"""
+Pyramlson response compression
+
+If ``pyramlson.compression`` is enabled, responses of the generated views
+are compressed according to the request's ``Accept-Encoding`` header:
+
+- ``pyramlson.compression.encodings``: supported encodings in order of
+  preference (default: ``br gzip``, ``br`` requires :py:mod:`brotli`)
+- ``pyramlson.compression.min_size``: rendered responses smaller than
+  this aren't compressed (default: 1024 bytes), streamed responses are
+  always compressed
+- ``pyramlson.compression.level``: gzip compression level (default: 6)
+- ``pyramlson.compression.brotli_quality``: brotli quality (default: 4)
+
+Cached responses are stored compressed, once per negotiated encoding.
+"""
+import logging
+import zlib
+
+from functools import partial
+
+from pyramid.settings import asbool, aslist
+from zope.interface import Interface
+
+try:
+    import brotli
+except ImportError: # pragma: no cover
+    brotli = None
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1024
+
+COMPRESSIBLE_TYPES = frozenset([
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+])
+
+# zlib window bits producing a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class ICompressor(Interface):
+    """ Marker interface for the response compressor """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+def compressible(content_type):
+    """ Return True if responses of this content type should be compressed """
+    return content_type is not None and (
+        content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+    )
+
+
+class Compressor(object):
+    """ Compresses responses with the best encoding a client accepts
+
+        :param encodings: Supported encodings in order of preference
+        :param min_size: Minimum size of rendered responses to compress
+        :param level: gzip compression level
+        :param brotli_quality: brotli quality
+    """
+
+    def __init__(self, encodings=('br', 'gzip'), min_size=DEFAULT_MIN_SIZE, level=6,
+                 brotli_quality=4):
+        self.encodings = []
+        for encoding in encodings:
+            if encoding == 'br' and brotli is None:
+                LOG.debug("brotli is not installed, not using br encoding")
+                continue
+            if encoding not in ('br', 'gzip'):
+                raise ValueError("Unsupported compression encoding {}".format(encoding))
+            self.encodings.append(encoding)
+        self.min_size = int(min_size)
+        self.level = int(level)
+        self.brotli_quality = int(brotli_quality)
+
+    def negotiate(self, request):
+        """ Return the encoding to use for a request or None """
+        if not self.encodings or 'HTTP_ACCEPT_ENCODING' not in request.environ:
+            return None
+        offers = request.accept_encoding.acceptable_offers(self.encodings)
+        if not offers:
+            return None
+        # prefer our order if the client has no preference
+        best = max(quality for (_, quality) in offers)
+        for encoding in self.encodings:
+            if (encoding, best) in offers:
+                return encoding
+        return None # pragma: no cover
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, GZIP_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_iter(self, app_iter, encoding):
+        """ Compress a streamed response, yielding one chunk per chunk """
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress = compressor.process
+            flush = compressor.flush
+            finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, GZIP_WBITS)
+            compress = compressor.compress
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            finish = compressor.flush
+        try:
+            for chunk in app_iter:
+                # flush every chunk, so streamed items reach the client
+                data = compress(chunk) + flush()
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def compress_response(self, request, response):
+        """ Compress a response in place if the client accepts it and
+            it's worth it, return the response
+        """
+        if response.content_encoding or response.status_int in (204, 304) \
+                or not compressible(response.content_type):
+            return response
+        vary = tuple(response.vary or ())
+        if 'Accept-Encoding' not in vary:
+            response.vary = vary + ('Accept-Encoding', )
+        encoding = self.negotiate(request)
+        if encoding is None:
+            return response
+        if isinstance(response.app_iter, list):
+            body = response.body
+            if len(body) < self.min_size:
+                return response
+            response.body = self.compress(body, encoding)
+        else:
+            response.app_iter = self.compress_iter(response.app_iter, encoding)
+            response.content_length = None
+        response.content_encoding = encoding
+        etag = response.headers.get('ETag')
+        if etag is not None and not etag.startswith('W/'):
+            # the representation changed, it's only weakly equal now
+            response.headers['ETag'] = 'W/{}'.format(etag)
+        return response
+
+
+def create_compressor(settings):
+    """ Create the response compressor from settings or return None
+        if compression is disabled
+    """
+    if not asbool(settings.get('pyramlson.compression', False)):
+        return None
+    return Compressor(
+        aslist(settings.get('pyramlson.compression.encodings', 'br gzip')),
+        settings.get('pyramlson.compression.min_size', DEFAULT_MIN_SIZE),
+        settings.get('pyramlson.compression.level', 6),
+        settings.get('pyramlson.compression.brotli_quality', 4),
+    )
+
+
+def _compressed_render(compressor, render, request, result):
+    return compressor.compress_response(request, render(request, result))
+
+
+def compile_compression(compressor, render):
+    """ Wrap a render strategy so it compresses the responses, or return
+        it unchanged if compression is disabled
+    """
+    if compressor is None:
+        return render
+    return partial(_compressed_render, compressor, render)
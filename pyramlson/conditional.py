@@ -0,0 +1,92 @@
+# coding: utf-8
+"""
+Pyramlson conditional GET support
+
+Service methods can opt in to ``ETag`` / ``Last-Modified`` handling
+with the ``etag`` and ``last_modified`` options of ``api_method``.
+"""
+from functools import partial
+
+from pyramid.httpexceptions import HTTPNotModified
+
+
+CONDITIONAL_METHODS = ('get', 'head')
+
+TEXT_TYPE = type(u'')
+
+
+def _not_modified(response):
+    headers = []
+    if response.etag is not None:
+        headers.append(('ETag', response.headers['ETag']))
+    if response.last_modified is not None:
+        headers.append(('Last-Modified', response.headers['Last-Modified']))
+    return HTTPNotModified(headers=headers)
+
+
+def _precondition(etag, last_modified, request, args, kwargs):
+    """ Compute the validators before the method is called and return
+        a 304 response if the client's copy is still fresh.
+    """
+    response = request.response
+    if etag is not None:
+        value = etag(*args, **kwargs)
+        if value is not None:
+            # e.g. an integer version, webob only accepts strings
+            if not isinstance(value, TEXT_TYPE):
+                value = str(value)
+            response.etag = value
+            if value in request.if_none_match:
+                return _not_modified(response)
+    if last_modified is not None:
+        value = last_modified(*args, **kwargs)
+        if value is not None:
+            response.last_modified = value
+            # If-None-Match takes precedence over If-Modified-Since
+            if not request.if_none_match and request.if_modified_since is not None \
+                    and response.last_modified <= request.if_modified_since:
+                return _not_modified(response)
+    return None
+
+
+def compile_precondition(resource, cfg):
+    """ Return a precondition callable for a resource method or None.
+
+        The callable takes ``(request, args, kwargs)``, ``args`` and
+        ``kwargs`` being the arguments of the service method call,
+        and returns either None or a ``304 Not Modified`` response.
+    """
+    if resource.method.lower() not in CONDITIONAL_METHODS:
+        return None
+    etag = cfg.etag if callable(cfg.etag) else None
+    last_modified = cfg.last_modified
+    if etag is None and last_modified is None:
+        return None
+    return partial(_precondition, etag, last_modified)
+
+
+def _conditional_render(render, hash_body, request, result):
+    response = render(request, result)
+    if response is not request.response:
+        # a response returned by the service method itself
+        if request.response.etag is not None and response.etag is None:
+            response.etag = request.response.etag
+        if request.response.last_modified is not None and response.last_modified is None:
+            response.last_modified = request.response.last_modified
+    if hash_body and response.etag is None and isinstance(response.app_iter, list):
+        response.md5_etag()
+    # let webob answer If-None-Match / If-Modified-Since with a 304
+    response.conditional_response = True
+    return response
+
+
+def compile_conditional_render(resource, cfg, render):
+    """ Wrap a render strategy so it sets validators and answers
+        conditional requests, or return it unchanged if the
+        method didn't opt in.
+    """
+    if resource.method.lower() not in CONDITIONAL_METHODS:
+        return render
+    if not cfg.etag and cfg.last_modified is None:
+        return render
+    return partial(_conditional_render, render, cfg.etag is True)
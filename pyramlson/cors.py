@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+Pyramlson CORS support
+
+CORS is enabled by setting the allowed origins:
+
+- ``pyramlson.cors.allow_origins``: allowed origins or ``*``
+- ``pyramlson.cors.allow_headers``: request headers allowed in
+  preflighted requests (default: ``Content-Type Authorization``)
+- ``pyramlson.cors.expose_headers``: response headers exposed to
+  the client (default: ``ETag Link``)
+- ``pyramlson.cors.allow_credentials``: allow credentials (default: false)
+- ``pyramlson.cors.max_age``: seconds browsers may cache the result
+  of a preflight request (default: 86400)
+
+The allowed methods of every route are taken from the RAML file. The
+headers of the generated OPTIONS responses are computed once when the
+route is created.
+"""
+from pyramid.response import Response
+from pyramid.settings import asbool, aslist
+from zope.interface import Interface
+
+
+DEFAULT_ALLOW_HEADERS = ('Content-Type', 'Authorization')
+DEFAULT_EXPOSE_HEADERS = ('ETag', 'Link')
+DEFAULT_MAX_AGE = 86400
+
+
+class ICorsPolicy(Interface):
+    """ Marker interface for the CORS policy """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+class CorsPolicy(object):
+    """ The CORS configuration of an application
+
+        :param allow_origins: Allowed origins, ``('*', )`` allows all
+        :param allow_headers: Request headers allowed in preflighted requests
+        :param expose_headers: Response headers exposed to the client
+        :param allow_credentials: Allow requests with credentials
+        :param max_age: Seconds browsers may cache a preflight result
+    """
+
+    def __init__(self, allow_origins, allow_headers=DEFAULT_ALLOW_HEADERS,
+                 expose_headers=DEFAULT_EXPOSE_HEADERS, allow_credentials=False,
+                 max_age=DEFAULT_MAX_AGE):
+        # pylint: disable=too-many-arguments
+        self.any_origin = '*' in allow_origins
+        self.allow_origins = frozenset(allow_origins)
+        self.allow_headers = tuple(allow_headers)
+        self.expose_headers = tuple(expose_headers)
+        self.allow_credentials = allow_credentials
+        self.max_age = int(max_age)
+        common = []
+        if allow_credentials:
+            common.append(('Access-Control-Allow-Credentials', 'true'))
+        if self.any_origin and not allow_credentials:
+            # the same for every origin
+            common.append(('Access-Control-Allow-Origin', '*'))
+        self.common_headers = tuple(common)
+        self.simple_headers = self.common_headers
+        if self.expose_headers:
+            self.simple_headers += (
+                ('Access-Control-Expose-Headers', ', '.join(self.expose_headers)),
+            )
+
+    def origin_allowed(self, origin):
+        return self.any_origin or origin in self.allow_origins
+
+    def preflight_headers(self, methods):
+        """ Return the static headers of a preflight response of a route """
+        headers = [('Access-Control-Allow-Methods', ', '.join(methods))]
+        if self.allow_headers:
+            headers.append(('Access-Control-Allow-Headers', ', '.join(self.allow_headers)))
+        headers.append(('Access-Control-Max-Age', str(self.max_age)))
+        return tuple(headers)
+
+    def add_headers(self, request, response, headers):
+        """ Add the CORS headers to a response to a request with
+            an ``Origin`` header
+        """
+        origin = request.headers.get('Origin')
+        if origin is None or not self.origin_allowed(origin):
+            return
+        response.headerlist.extend(headers)
+        if self.any_origin and not self.allow_credentials:
+            return
+        response.headerlist.append(('Access-Control-Allow-Origin', origin))
+        vary = tuple(response.vary or ())
+        if 'Origin' not in vary:
+            response.vary = vary + ('Origin', )
+
+
+def create_cors_policy(settings):
+    """ Create the CORS policy from settings or return None if
+        CORS isn't enabled
+    """
+    allow_origins = aslist(settings.get('pyramlson.cors.allow_origins', ''))
+    if not allow_origins:
+        return None
+    return CorsPolicy(
+        allow_origins,
+        aslist(settings.get('pyramlson.cors.allow_headers', ' '.join(DEFAULT_ALLOW_HEADERS))),
+        aslist(settings.get('pyramlson.cors.expose_headers', ' '.join(DEFAULT_EXPOSE_HEADERS))),
+        asbool(settings.get('pyramlson.cors.allow_credentials', False)),
+        settings.get('pyramlson.cors.max_age', DEFAULT_MAX_AGE),
+    )
+
+
+def add_cors_headers(event):
+    """ NewResponse subscriber adding CORS headers to all responses
+        except preflight responses, which have their own headers
+    """
+    request = event.request
+    if request.method == 'OPTIONS' or 'HTTP_ORIGIN' not in request.environ:
+        return
+    policy = request.registry.queryUtility(ICorsPolicy)
+    if policy is not None:
+        policy.add_headers(request, event.response, policy.simple_headers)
+
+
+def create_options_view(supported_methods, cors=None):
+    """ Create a view callable for the OPTIONS request.
+
+        The response headers are computed once, every request gets
+        a copy of them.
+    """
+    if cors is None:
+        headerlist = (('Access-Control-Allow-Methods', ', '.join(supported_methods)), )
+    else:
+        headerlist = cors.preflight_headers(supported_methods)
+    cors_headers = cors.common_headers if cors is not None else ()
+
+    def view(context, request):  # pylint: disable=unused-argument,missing-docstring
+        response = Response(status=204, headerlist=list(headerlist))
+        if cors is not None:
+            cors.add_headers(request, response, cors_headers)
+        return response
+    return view
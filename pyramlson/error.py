@@ -1,31 +1,144 @@
 import logging
+import threading
+import time
 import traceback
 from pyramid.httpexceptions import HTTPNotFound
 from pyramid.security import unauthenticated_userid
+from zope.interface import Interface
 
 
 log = logging.getLogger(__name__)
 
 
+class IErrorLogLimiter(Interface):
+    """ Marker interface for the error log limiter """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+class LazyTraceback(object):
+    """ Formats a traceback only when it's converted to a string """
+
+    __slots__ = ('exc_info', )
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+    def __str__(self):
+        return ''.join(traceback.format_exception(*self.exc_info))
+
+
+class ErrorLogLimiter(object):
+    """ Limits logging of repeated identical errors.
+
+        Errors are identical if they have the same type, message and
+        origin. Per ``interval`` seconds only the first ``burst``
+        occurrences of an error are logged, the others are counted and
+        logged as a summary once the interval is over, by the next
+        error or by a timer if no more errors occur.
+
+        :param interval: Length of the interval in seconds
+        :param burst: Number of identical errors logged per interval
+    """
+
+    def __init__(self, interval=60, burst=5, clock=time.time):
+        self.interval = float(interval)
+        self.burst = int(burst)
+        self.clock = clock
+        self.lock = threading.Lock()
+        # key -> [interval start, count]
+        self.errors = {}
+        self.next_sweep = clock() + self.interval
+        self.timer = None
+
+    @staticmethod
+    def error_key(exc_info):
+        (exc_type, exc, tb) = exc_info
+        origin = None
+        while tb is not None:
+            origin = (tb.tb_frame.f_code.co_filename, tb.tb_lineno)
+            tb = tb.tb_next
+        return (exc_type, str(exc), origin)
+
+    def allow(self, exc_info):
+        """ Return True if this error should be logged """
+        key = self.error_key(exc_info)
+        now = self.clock()
+        with self.lock:
+            if now >= self.next_sweep:
+                self.sweep(now)
+            entry = self.errors.get(key)
+            if entry is None:
+                self.errors[key] = [now, 1]
+                return True
+            entry[1] += 1
+            if entry[1] <= self.burst:
+                return True
+            if self.timer is None:
+                self.schedule(entry[0] + self.interval - now)
+            return False
+
+    def schedule(self, delay):
+        """ Flush the summaries after ``delay`` seconds """
+        self.timer = threading.Timer(max(delay, 0) + 0.01, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """ Log the summaries of the intervals which are over, even if
+            no more errors occurred
+        """
+        with self.lock:
+            self.timer = None
+            now = self.clock()
+            self.sweep(now)
+            pending = [started for (started, count) in self.errors.values()
+                       if count > self.burst]
+            if pending:
+                self.schedule(min(pending) + self.interval - now)
+
+    def sweep(self, now):
+        """ Log summaries of the intervals which are over """
+        self.next_sweep = now + self.interval
+        for (key, (started, count)) in list(self.errors.items()):
+            if now - started < self.interval:
+                continue
+            del self.errors[key]
+            if count > self.burst:
+                log.error("error.generic -- %d more \"%s: %s\" errors in the last %ds",
+                          count - self.burst, key[0].__name__, key[1], now - started)
+
+
+def create_limiter(settings):
+    """ Create the error log limiter from settings or return None if
+        ``pyramlson.error_log_interval`` isn't set (or 0)
+    """
+    interval = float(settings.get('pyramlson.error_log_interval', 0))
+    if not interval:
+        return None
+    return ErrorLogLimiter(interval, settings.get('pyramlson.error_log_burst', 5))
+
+
 def err_dict(message):
     return dict(success=False, message=message)
 
 def generic(context, request):
-    log.error("error.generic -- context: \"{}\"".format(context))
-    tb = ''.join(traceback.format_exception(*request.exc_info))
-    log.error("error.generic -- traceback: \"{}\"".format(tb))
+    limiter = request.registry.queryUtility(IErrorLogLimiter)
+    if limiter is None or limiter.allow(request.exc_info):
+        log.error("error.generic -- context: \"%s\"", context)
+        log.error("error.generic -- traceback: \"%s\"", LazyTraceback(request.exc_info))
     request.response.status_int = 500
     try:
         response = err_dict(context.args[0])
     except IndexError:
         response = err_dict('Unknown error')
     if request.registry.settings.get('pyramlson.debug'):
-        response['traceback'] = tb
+        response['traceback'] = str(LazyTraceback(request.exc_info))
     return response
 
 
 def http_error(context, request):
-    log.info("error.http_error -- context: \"{}\"".format(context))
+    log.info("error.http_error -- context: \"%s\"", context)
     request.response.status = context.status
     for (header, value) in context.headers.items():
         if header in {'Content-Type', 'Content-Length'}:
@@ -38,7 +151,7 @@ def http_error(context, request):
 
 
 def notfound(context, request):
-    log.info("error.notfound -- context: \"{}\"".format(context))
+    log.info("error.notfound -- context: \"%s\"", context)
     message = 'Resource not found'
     if isinstance(context, HTTPNotFound):
         if context.content_type == 'application/json':
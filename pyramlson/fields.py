@@ -0,0 +1,219 @@
+# coding: utf-8
+"""
+Pyramlson sparse field selection
+
+Methods decorated with ``api_method(..., sparse_fields=True)`` let
+clients choose the fields of the response with two query parameters,
+which should be declared in the RAML file (e.g. with a trait):
+
+- ``fields``: the fields to return, nested fields in parentheses or
+  as dotted paths, e.g. ``fields=id,title,author(name,born)``
+- ``include``: dotted paths of nested fields to add to the (possibly
+  complete) response, e.g. ``include=author.books,reviews``
+
+Both parameters are parsed once into a :py:class:`Projection` passed to
+the method as the ``fields`` argument, so it can skip loading what
+isn't requested. The projection is applied to the returned dicts and
+lists before they are serialized. Responses with a projection aren't
+validated against the RAML response schema, since they purposely
+omit fields.
+"""
+import re
+
+from functools import partial
+
+from pyramid.httpexceptions import HTTPBadRequest
+
+from .renderers import is_stream
+
+
+FIELDS_PARAM = 'fields'
+INCLUDE_PARAM = 'include'
+
+ENVIRON_KEY = 'pyramlson.fields'
+
+# limits protecting the parser from abusive parameters
+MAX_LENGTH = 2048
+MAX_DEPTH = 16
+
+TOKEN_RE = re.compile(r'\s*([(),.]|[^(),.\s]+)')
+
+
+class Projection(object):
+    """ A tree of selected fields
+
+        :param children: dict of field name -> :py:class:`Projection`
+        :param all_fields: True if all fields are selected, the
+            children only refine nested fields
+    """
+
+    __slots__ = ('children', 'all_fields')
+
+    def __init__(self, children=None, all_fields=False):
+        self.children = children if children is not None else {}
+        self.all_fields = all_fields
+
+    def __contains__(self, name):
+        """ Return True if a field has been requested explicitly """
+        return name in self.children
+
+    def __eq__(self, other):
+        return isinstance(other, Projection) and \
+            (self.children, self.all_fields) == (other.children, other.all_fields)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Projection({!r}, all_fields={!r})'.format(self.children, self.all_fields)
+
+    def selects(self, name):
+        """ Return True if a field is part of the response """
+        return self.all_fields or name in self.children
+
+    def get(self, name):
+        """ Return the projection of a nested field or None if the
+            field wasn't requested explicitly
+        """
+        return self.children.get(name)
+
+    def add_path(self, path):
+        """ Select a nested field given as a list of names """
+        node = self
+        for name in path:
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = Projection(all_fields=True)
+            node = child
+
+    def apply(self, value):
+        """ Return a copy of dicts (or lists of dicts) reduced to the
+            selected fields, other values are returned unchanged
+        """
+        if isinstance(value, dict):
+            if self.all_fields:
+                result = dict(value)
+                for (name, child) in self.children.items():
+                    if name in result:
+                        result[name] = child.apply(result[name])
+                return result
+            return dict(
+                (name, child.apply(value[name]))
+                for (name, child) in self.children.items()
+                if name in value
+            )
+        if isinstance(value, (list, tuple)):
+            return [self.apply(item) for item in value]
+        return value
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if match is None:  # pragma: no cover
+            raise ValueError("unexpected character at position {}".format(pos))
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+def _parse_list(tokens, pos, node, depth):
+    if depth > MAX_DEPTH:
+        raise ValueError("fields are nested too deeply")
+    while True:
+        pos = _parse_item(tokens, pos, node, depth)
+        if pos < len(tokens) and tokens[pos] == ',':
+            pos += 1
+            continue
+        return pos
+
+
+def _parse_item(tokens, pos, node, depth):
+    # like include paths, at most MAX_DEPTH names are nested
+    if depth >= MAX_DEPTH:
+        raise ValueError("fields are nested too deeply")
+    if pos >= len(tokens) or tokens[pos] in '(),.':
+        raise ValueError("field name expected at token {}".format(pos + 1))
+    name = tokens[pos]
+    pos += 1
+    child = node.children.get(name)
+    if pos < len(tokens) and tokens[pos] in '(.':
+        # a field selected whole stays whole, nested fields only refine it
+        if child is None:
+            child = node.children[name] = Projection()
+        if tokens[pos] == '(':
+            pos = _parse_list(tokens, pos + 1, child, depth + 1)
+            if pos >= len(tokens) or tokens[pos] != ')':
+                raise ValueError("')' expected at token {}".format(pos + 1))
+            return pos + 1
+        return _parse_item(tokens, pos + 1, child, depth + 1)
+    if child is None:
+        node.children[name] = Projection(all_fields=True)
+    else:
+        child.all_fields = True
+    return pos
+
+
+def parse_projection(fields=None, include=None):
+    """ Parse the ``fields`` and ``include`` parameters into a
+        :py:class:`Projection`, return None if both are empty. Raise
+        a ``ValueError`` if a parameter is malformed.
+    """
+    if not fields and not include:
+        return None
+    if len(fields or '') + len(include or '') > MAX_LENGTH:
+        raise ValueError("too many fields")
+    projection = Projection(all_fields=not fields)
+    if fields:
+        tokens = _tokenize(fields)
+        pos = _parse_list(tokens, 0, projection, 0)
+        if pos != len(tokens):
+            raise ValueError("unexpected '{}' at token {}".format(tokens[pos], pos + 1))
+    if include:
+        for path in include.split(','):
+            names = [name.strip() for name in path.split('.')]
+            if not all(names) or len(names) > MAX_DEPTH:
+                raise ValueError("invalid include path '{}'".format(path.strip()))
+            projection.add_path(names)
+    return projection
+
+
+def _select_fields(key, precondition, request, args, kwargs):
+    params = request.GET
+    try:
+        projection = parse_projection(params.get(FIELDS_PARAM), params.get(INCLUDE_PARAM))
+    except ValueError as err:
+        raise HTTPBadRequest("Invalid fields: {}".format(err))
+    if projection is not None:
+        request.environ[ENVIRON_KEY] = projection
+        kwargs[key] = projection
+    if precondition is not None:
+        return precondition(request, args, kwargs)
+    return None
+
+
+def compile_field_selection(key, precondition):
+    """ Wrap a precondition so it parses the projection of a request
+        and passes it to the method as the keyword argument ``key``
+    """
+    return partial(_select_fields, key, precondition)
+
+
+def _projected_render(render, request, result):
+    projection = request.environ.get(ENVIRON_KEY)
+    if projection is not None:
+        if is_stream(result):
+            result = (projection.apply(item) for item in result)
+        else:
+            result = projection.apply(result)
+    return render(request, result)
+
+
+def compile_projection(render):
+    """ Wrap a render strategy so it applies the projection of a
+        request to the result
+    """
+    return partial(_projected_render, render)
@@ -0,0 +1,156 @@
+# coding: utf-8
+"""
+Pyramlson cursor pagination
+
+Methods decorated with ``api_method(..., paginate=True)`` get the
+``cursor`` query parameter as a :py:class:`Cursor`, or no ``cursor``
+argument at all for the first page, and return a :py:class:`Page`:
+
+.. code-block:: python
+
+    @api_method('get', paginate=True)
+    def get_all(self, cursor=None, limit=20):
+        after = cursor.position if cursor else 0
+        books = query_books(id_greater_than=after, limit=limit)
+        return Page(books, books[-1]['id'] if len(books) == limit else None)
+
+The items of the page are rendered as the response body. If there is a
+next page, its URL is added as a ``Link: <...>; rel="next"`` header,
+with the same query parameters and a new cursor.
+
+Cursors are opaque to clients: the position is serialized as JSON and
+signed with ``pyramlson.cursor_secret``, so clients can't forge
+positions and cursors of one resource aren't accepted by another one.
+"""
+import base64
+import hashlib
+import hmac
+import json
+
+from collections import namedtuple
+from functools import partial
+
+from pyramid.httpexceptions import HTTPBadRequest
+from zope.interface import Interface
+
+try:
+    from urllib.parse import urlencode
+except ImportError: # pragma: no cover
+    from urllib import urlencode
+
+
+CURSOR_PARAM = 'cursor'
+
+# bytes of the HMAC-SHA256 digest kept in a cursor
+SIGNATURE_SIZE = 16
+
+
+# The position of a page in a collection, e.g. the sort key of the last
+# item of the previous page. Any JSON serializable value.
+Cursor = namedtuple('Cursor', ['position'])
+
+# A page returned by a paginated method: the items to render and the
+# position of the next page or None if this is the last page.
+Page = namedtuple('Page', ['items', 'next'])
+Page.__new__.__defaults__ = (None, )
+
+
+class ICursorCodec(Interface):
+    """ Marker interface for the cursor codec """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    data = data.encode('ascii')
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+class CursorCodec(object):
+    """ Encodes positions into signed, URL safe cursors and back
+
+        :param secret: The secret key of the signatures
+    """
+
+    def __init__(self, secret):
+        if not secret:
+            raise ValueError("A cursor secret is required")
+        self.secret = secret.encode('utf-8') if not isinstance(secret, bytes) else secret
+
+    def sign(self, namespace, payload):
+        digest = hmac.new(self.secret, namespace.encode('utf-8') + b'\0' + payload,
+                          hashlib.sha256).digest()
+        return digest[:SIGNATURE_SIZE]
+
+    def encode(self, namespace, position):
+        """ Return the cursor of a position for a namespace (resource) """
+        payload = json.dumps(position, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        return '{}.{}'.format(_b64encode(payload), _b64encode(self.sign(namespace, payload)))
+
+    def decode(self, namespace, cursor):
+        """ Return the :py:class:`Cursor` of a cursor string, raise a
+            ``ValueError`` if it's malformed or the signature is invalid
+        """
+        (payload, sep, signature) = cursor.partition('.')
+        if not sep:
+            raise ValueError("malformed cursor")
+        try:
+            payload = _b64decode(payload)
+            signature = _b64decode(signature)
+        except (TypeError, ValueError):
+            raise ValueError("malformed cursor")
+        if not hmac.compare_digest(signature, self.sign(namespace, payload)):
+            raise ValueError("invalid cursor signature")
+        return Cursor(json.loads(payload.decode('utf-8')))
+
+
+def create_codec(settings):
+    """ Create the cursor codec from settings or return None if
+        ``pyramlson.cursor_secret`` isn't set
+    """
+    secret = settings.get('pyramlson.cursor_secret')
+    if not secret:
+        return None
+    return CursorCodec(secret)
+
+
+def compile_cursor_param(codec, namespace, key):
+    """ Return a query parameter extractor decoding the cursor """
+
+    def extract(params, kwargs):
+        value = params.get(CURSOR_PARAM)
+        if not value:
+            return
+        try:
+            kwargs[key] = codec.decode(namespace, value)
+        except ValueError:
+            raise HTTPBadRequest("Invalid cursor")
+    return extract
+
+
+def next_url(request, cursor):
+    """ Return the URL of the request with the cursor replaced """
+    params = [(name, value) for (name, value) in request.GET.items() if name != CURSOR_PARAM]
+    params.append((CURSOR_PARAM, cursor))
+    return '{}?{}'.format(request.path_url, urlencode(params))
+
+
+def _paginated_render(codec, namespace, render, request, result):
+    if not isinstance(result, Page):
+        return render(request, result)
+    response = render(request, result.items)
+    if result.next is not None:
+        link = '<{}>; rel="next"'.format(next_url(request, codec.encode(namespace, result.next)))
+        response.headerlist.append(('Link', link))
+    return response
+
+
+def compile_pagination(codec, namespace, render):
+    """ Wrap a render strategy so it renders :py:class:`Page` results
+        with a ``Link`` header to the next page
+    """
+    return partial(_paginated_render, codec, namespace, render)
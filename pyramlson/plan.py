@@ -0,0 +1,307 @@
+# coding: utf-8
+"""
+Pyramlson request plans
+
+A request plan is compiled once per RAML resource method when the
+view is created. It contains pre-bound callables for every step of
+the argument marshalling, so the generated view doesn't have to walk
+the RAML objects on every request.
+"""
+from collections import namedtuple
+from functools import partial
+
+from pyramid.exceptions import ConfigurationError
+from pyramid.httpexceptions import HTTPBadRequest
+from pyramid.settings import asbool
+
+from .compression import ICompressor, compile_compression
+from .conditional import compile_conditional_render, compile_precondition
+from .fields import (
+    FIELDS_PARAM,
+    INCLUDE_PARAM,
+    compile_field_selection,
+    compile_projection,
+)
+from .pagination import CURSOR_PARAM, ICursorCodec, compile_cursor_param, compile_pagination
+from .renderers import (
+    DEFAULT_CHUNK_SIZE,
+    IJSONSerializer,
+    NDJSON_MIME_TYPE,
+    is_stream,
+    render_stream,
+    stream_serializer,
+)
+from .response_validation import compile_response_validation
+from .streaming import check_body_size, read_body, stream_json_body
+from .timing import clock, record_phase
+from .utils import (
+    decode_json_body,
+    get_converter,
+    parse_json_body,
+    validate_json_body,
+    render_mime_view,
+    render_view,
+)
+
+
+MARKER = object()
+
+
+# A compiled view plan:
+#  - uri_params: tuple of (name, converter) pairs, the converter is
+#    always a callable taking the raw matchdict value
+#  - body: None or a callable taking the request and returning the
+#    positional body argument
+#  - query_params: tuple of callables taking (params, kwargs), each one
+#    stores the (converted) value of a query parameter in kwargs
+#  - precondition: None or a callable taking (request, args, kwargs)
+#    called before the method, returning None or a response which
+#    is returned instead of calling the method
+#  - render: callable taking (request, result) returning the response
+RequestPlan = namedtuple('RequestPlan', [
+    'uri_params',
+    'body',
+    'query_params',
+    'precondition',
+    'render',
+])
+
+
+def _identity(value):
+    return value
+
+
+def _size_setting(settings, name, default=None):
+    value = settings.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        size = -1
+    if size < 0:
+        # raised from the scan callback too, venusian would ignore a ValueError
+        raise ConfigurationError("Invalid {} '{}', expected a number of bytes".format(name, value))
+    return size
+
+
+def body_settings(settings):
+    """ Return the ``pyramlson.stream_chunk_size`` and
+        ``pyramlson.max_body_size`` (or None) settings, raise a
+        ``ConfigurationError`` if they aren't valid sizes
+    """
+    return (
+        _size_setting(settings, 'pyramlson.stream_chunk_size', DEFAULT_CHUNK_SIZE) or DEFAULT_CHUNK_SIZE,
+        _size_setting(settings, 'pyramlson.max_body_size'),
+    )
+
+
+def _validator_only(converter, value):
+    converter(value)
+    return value
+
+
+def compile_uri_param(param, convert):
+    """ Return a ``(name, converter)`` pair for an URI parameter.
+
+        URI parameters are always validated, but only converted
+        if ``convert`` is true.
+    """
+    converter = get_converter(param)
+    if converter is None:
+        return (param.name, _identity)
+    if not convert:
+        converter = partial(_validator_only, converter)
+    return (param.name, converter)
+
+
+def compile_query_param(param, transform, convert):
+    """ Return an extractor callable for a query parameter. """
+    # query params are always named (i.e. not positional)
+    # so they effectively become keyword agruments in a
+    # method call, we just make sure they are present
+    # in the request if marked as 'required'
+    name = param.name
+    key = transform(name)
+    required = param.required
+    required_msg = "{} ({}) is required".format(name, param.type)
+    converter = get_converter(param) if convert else None
+    # If there's no default value defined in RAML let the decorated
+    # method decide which defaults to use. Unfortunatelly there is
+    # no way to tell whether a default value was declared as 'null'
+    # in RAML or if it was omitted - it's None in both cases
+    has_default = param.default is not None
+    default = param.default
+
+    def extract(params, kwargs):
+        value = params.get(name, MARKER)
+        if value is MARKER:
+            if required:
+                raise HTTPBadRequest(required_msg)
+            if has_default:
+                kwargs[key] = converter(default) if converter else default
+            return
+        kwargs[key] = converter(value) if converter else value
+    return extract
+
+
+def compile_body(apidef, resource, max_body_size=None, stream=False,
+                 debug=False, timed=False):
+    """ Return the body extraction strategy for a resource or ``None``.
+
+        If ``stream`` is true, JSON array bodies are always passed to
+        the method as an iterator of validated items. Timed strategies
+        record their ``body`` and ``validate`` phases themselves.
+    """
+    # pylint: disable=too-many-arguments
+    if not resource.body:
+        return None
+    if resource.body[0].mime_type == "application/json":
+        if not stream:
+            validator = apidef.get_validator(resource.body)
+            if timed:
+                return partial(_timed_json_body, validator, max_body_size)
+            return partial(_json_body, validator, max_body_size)
+        items_validator = apidef.get_items_validator(resource.body)
+        if items_validator is None:
+            raise ConfigurationError(
+                "Only JSON array bodies can be streamed: {} {}".format(
+                    resource.method.upper(),
+                    resource.path
+                )
+            )
+        strategy = partial(_streamed_json_body, items_validator, max_body_size, debug)
+    else:
+        strategy = partial(_raw_body, max_body_size)
+    if timed:
+        return partial(_timed_body, strategy)
+    return strategy
+
+
+def _timed_json_body(validator, max_body_size, request):
+    started = clock()
+    data = decode_json_body(request, max_body_size)
+    started = record_phase(request, 'body', started)
+    validate_json_body(request, data, validator)
+    record_phase(request, 'validate', started)
+    return data
+
+
+def _timed_body(strategy, request):
+    started = clock()
+    data = strategy(request)
+    record_phase(request, 'body', started)
+    return data
+
+
+def _json_body(validator, max_body_size, request):
+    return parse_json_body(request, validator, max_body_size)
+
+
+def _streamed_json_body(items_validator, max_body_size, debug, request):
+    check_body_size(request, max_body_size)
+    return stream_json_body(request, items_validator, debug, max_body_size)
+
+
+def _raw_body(max_body_size, request):
+    return read_body(request, max_body_size)
+
+
+def compile_render(resource, status_code, serializer=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Return the response rendering strategy for a resource. """
+    # check if a response type is specified
+    for response in resource.responses or ():
+        if response.code == status_code and response.body and len(response.body) == 1:
+            body = response.body[0]
+            if body.mime_type == 'application/json':
+                break
+            if body.mime_type == NDJSON_MIME_TYPE:
+                return partial(_render_ndjson, status_code, serializer, chunk_size)
+            return partial(_render_mime, status_code, body.mime_type)
+    return partial(_render_json, status_code, serializer, chunk_size)
+
+
+def _render_mime(status_code, mime_type, request, result):
+    # pylint: disable=unused-argument
+    return render_mime_view(result, status_code, mime_type=mime_type)
+
+
+def _render_ndjson(status_code, serializer, chunk_size, request, result):
+    # the json renderer may be replaced after the views are created, so
+    # it's looked up when a response is streamed
+    serializer = serializer or stream_serializer(request.registry)
+    return render_stream(request, result, status_code, serializer, chunk_size, ndjson=True)
+
+
+def _render_json(status_code, serializer, chunk_size, request, result):
+    if is_stream(result):
+        serializer = serializer or stream_serializer(request.registry)
+        return render_stream(request, result, status_code, serializer, chunk_size)
+    return render_view(request, result, status_code, serializer)
+
+
+def compile_request_plan(apidef, resource, cfg, registry=None, timed=False):
+    """ Compile a :py:class:`RequestPlan` for a RAML resource method
+
+        :param apidef: The :py:class:`pyramlson.apidef.RamlApiDefinition`
+        :param resource: The RAML resource node
+        :param cfg: The ``MethodRestConfig`` of the service method
+        :param registry: The Pyramid registry, used to look up optional
+            utilities like the JSON serializer
+        :param timed: Compile a plan for a timed view
+    """
+    settings = registry.settings if registry is not None else {}
+    serializer = None
+    compressor = None
+    if registry is not None:
+        serializer = registry.queryUtility(IJSONSerializer)
+        compressor = registry.queryUtility(ICompressor)
+    (chunk_size, max_body_size) = body_settings(settings)
+    debug = asbool(settings.get('pyramlson.debug'))
+    transform = apidef.args_transform_cb
+    transform = transform if callable(transform) else _identity
+    convert = apidef.convert_params
+    uri_params = tuple(
+        compile_uri_param(param, convert)
+        for param in resource.uri_params or ()
+    )
+    query_params = tuple(
+        compile_query_param(param, transform, convert)
+        for param in resource.query_params or ()
+        if not (cfg.paginate and param.name == CURSOR_PARAM)
+        and not (cfg.sparse_fields and param.name in (FIELDS_PARAM, INCLUDE_PARAM))
+    )
+    render = compile_render(resource, cfg.returns, serializer, chunk_size)
+    precondition = compile_precondition(resource, cfg)
+    if cfg.sparse_fields:
+        precondition = compile_field_selection(transform(FIELDS_PARAM), precondition)
+        render = compile_projection(render)
+    if cfg.paginate:
+        codec = registry.queryUtility(ICursorCodec) if registry is not None else None
+        if codec is None:
+            raise ConfigurationError(
+                "pyramlson.cursor_secret is required for paginated methods"
+            )
+        namespace = '{} {}'.format(resource.method.upper(), resource.path)
+        query_params += (compile_cursor_param(codec, namespace, transform(CURSOR_PARAM)), )
+        render = compile_pagination(codec, namespace, render)
+    return RequestPlan(
+        uri_params=uri_params,
+        body=compile_body(apidef, resource, max_body_size, cfg.stream_body, debug, timed),
+        query_params=query_params,
+        precondition=precondition,
+        render=compile_compression(
+            compressor,
+            compile_conditional_render(
+                resource,
+                cfg,
+                compile_response_validation(
+                    apidef,
+                    resource,
+                    cfg.returns,
+                    render,
+                    settings
+                )
+            )
+        ),
+    )
@@ -0,0 +1,181 @@
+# coding: utf-8
+"""
+Pyramlson hot reload of RAML definitions
+
+If ``pyramlson.reload`` is enabled, the RAML files of the application
+and all the files they include are checked for changes at most every
+``pyramlson.reload_interval`` seconds (default: 2). The check runs when
+a request arrives; a changed definition is parsed and the views are
+recompiled in a background thread, the request continues with the
+current views.
+
+All the views of a definition are swapped at once. Requests which
+have already started finish on the old definition. Changes to schemas,
+parameters and response bodies take effect without a restart, new or
+removed resources and methods need one (``config.scan`` creates the
+routes).
+"""
+import logging
+import os
+import threading
+
+from zope.interface import Interface
+
+from .apidef import IRamlApiDefinition
+from .snapshot import source_files
+from .timing import clock
+from .validation import SchemaPool
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 2
+
+
+class IApiReloader(Interface):
+    """ Marker interface for the reloader of an API definition """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+def file_stamp(apidef_path):
+    """ Return the modification times and sizes of a RAML file and its includes """
+    stamp = []
+    for path in source_files(apidef_path):
+        try:
+            stat = os.stat(path)
+        except (IOError, OSError):
+            stamp.append((path, None))
+            continue
+        stamp.append((path, stat.st_mtime, stat.st_size))
+    return tuple(stamp)
+
+
+class ReloadableView(object):
+    """ A view callable dispatching to the current view of a reloader """
+
+    def __init__(self, reloader, key):
+        self.reloader = reloader
+        self.key = key
+
+    def __call__(self, context, request):
+        reloader = self.reloader
+        # read the views once, a reload doesn't affect this request
+        views = reloader.views
+        reloader.poll()
+        return views[self.key](context, request)
+
+
+class ApiReloader(object):
+    """ Rebuilds an API definition and the views of its resources when
+        the RAML files change
+
+        :param registry: The application registry
+        :param apidef: The current API definition
+        :param factory: Callable returning a new API definition, given
+            the ``schema_pool`` keyword argument
+        :param apidef_path: Path of the RAML file to watch
+        :param name: The name of the API definition utility
+        :param interval: Minimum seconds between two checks for changes
+    """
+
+    def __init__(self, registry, apidef, factory, apidef_path, name='',
+                 interval=DEFAULT_INTERVAL):
+        # pylint: disable=too-many-arguments
+        self.registry = registry
+        self.apidef = apidef
+        self.factory = factory
+        self.apidef_path = apidef_path
+        self.name = name
+        self.interval = float(interval)
+        self.lock = threading.Lock()
+        self.stamp = file_stamp(apidef_path)
+        self.next_check = clock() + self.interval
+        self.thread = None
+        # (route_name, method) -> view
+        self.views = {}
+        # (route_name, method) -> (resource path, method, rebuild)
+        self.rebuilders = {}
+
+    def add_view(self, view, rebuild, route_name, resource):
+        """ Return a :py:class:`ReloadableView` for a view.
+
+            :param rebuild: Called with the keyword arguments ``apidef``
+                and ``resource`` to compile the view for a new definition
+        """
+        key = (route_name, resource.method.upper())
+        self.views[key] = view
+        self.rebuilders[key] = (resource.path, resource.method, rebuild)
+        return ReloadableView(self, key)
+
+    def poll(self):
+        """ Start a reload in a background thread if it's time to check
+            for changes and the RAML files have changed
+        """
+        if clock() < self.next_check or not self.lock.acquire(False):
+            return
+        try:
+            if clock() < self.next_check or self.thread is not None:
+                return
+            self.next_check = clock() + self.interval
+            self.thread = threading.Thread(
+                target=self.check,
+                name='pyramlson-reload'
+            )
+            self.thread.daemon = True
+            self.thread.start()
+        finally:
+            self.lock.release()
+
+    def check(self):
+        """ Reload the definition if the RAML files have changed """
+        try:
+            stamp = file_stamp(self.apidef_path)
+            if stamp != self.stamp:
+                # don't retry a broken definition until it changes again
+                self.stamp = stamp
+                self.reload()
+        finally:
+            self.thread = None
+
+    def reload(self):
+        """ Rebuild the definition and all views, swap them in and return
+            True. If the new definition can't be compiled, the current one
+            is kept and False is returned.
+        """
+        started = clock()
+        try:
+            # a pool of its own, freed with the definition once replaced
+            apidef = self.factory(schema_pool=SchemaPool())
+            apidef.compile_validators()
+            views = self.rebuild(apidef)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("Reloading %s failed, keeping the current definition",
+                          self.apidef_path)
+            return False
+        self.apidef = apidef
+        self.views = views
+        self.registry.registerUtility(apidef, IRamlApiDefinition, name=self.name)
+        LOG.info("Reloaded %s in %.1fms", self.apidef_path, (clock() - started) * 1000)
+        return True
+
+    def rebuild(self, apidef):
+        """ Compile the views of all known resources for a new definition """
+        views = {}
+        for (key, (path, method, rebuild)) in self.rebuilders.items():
+            resource = apidef.get_resource(path, method)
+            if resource is None:
+                LOG.warning("%s %s has been removed from %s, restart to remove its route",
+                            method.upper(), path, self.apidef_path)
+                views[key] = self.views[key]
+                continue
+            views[key] = rebuild(apidef=apidef, resource=resource)
+        return views
+
+
+def find_reloader(registry, apidef):
+    """ Return the reloader of an API definition or None """
+    for (_, reloader) in registry.getUtilitiesFor(IApiReloader):
+        if reloader.apidef is apidef:
+            return reloader
+    return None
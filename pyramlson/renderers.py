@@ -0,0 +1,292 @@
+# coding: utf-8
+"""
+Pyramlson JSON serialization
+
+A small JSON serializer which uses the fastest JSON library available
+(orjson or rapidjson, falling back to the stdlib json module)
+and writes the encoded bytes directly into the response, plus helpers
+to stream iterators as JSON arrays or NDJSON.
+"""
+import datetime
+import json
+
+try:
+    from collections.abc import Iterator
+except ImportError: # pragma: no cover
+    from collections import Iterator
+
+from pyramid.exceptions import ConfigurationError
+from pyramid.interfaces import IRendererFactory
+from pyramid.renderers import JSON
+from zope.interface import Interface
+
+try:
+    import orjson
+except ImportError: # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError: # pragma: no cover
+    ujson = None
+
+try:
+    import rapidjson
+except ImportError: # pragma: no cover
+    rapidjson = None
+
+
+class IJSONSerializer(Interface):
+    """ Marker interface for the JSON serializer """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+DATETIME_TYPES = (datetime.datetime, datetime.date, datetime.time)
+
+NDJSON_MIME_TYPE = 'application/x-ndjson'
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _orjson_dumps(data, default, options):
+    return orjson.dumps(data, default=default, option=options)
+
+
+JSON_TYPES = (type(u''), str, int, float, bool, type(None))
+
+
+def adapt_objects(data, default):
+    """ Return a copy of data with all the objects which aren't JSON
+        types replaced by ``default(obj)``
+    """
+    if isinstance(data, dict):
+        return dict((key, adapt_objects(value, default)) for (key, value) in data.items())
+    if isinstance(data, (list, tuple)):
+        return [adapt_objects(value, default) for value in data]
+    if isinstance(data, JSON_TYPES):
+        return data
+    return adapt_objects(default(data), default)
+
+
+def _ujson_dumps(data, default, options):
+    # pylint: disable=unused-argument
+    # ujson calls __json__() without the request before trying default
+    # and embeds its result as raw JSON, so objects are adapted first
+    data = adapt_objects(data, default)
+    return ujson.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def _rapidjson_dumps(data, default, options):
+    # pylint: disable=unused-argument
+    return rapidjson.dumps(data, default=default, ensure_ascii=False).encode('utf-8')
+
+
+def _json_dumps(data, default, options):
+    # pylint: disable=unused-argument
+    return json.dumps(data, default=default, separators=(',', ':')).encode('utf-8')
+
+
+BACKENDS = (
+    ('orjson', orjson, _orjson_dumps),
+    ('rapidjson', rapidjson, _rapidjson_dumps),
+    ('json', json, _json_dumps),
+    # after json so auto never picks it, adapting the objects is slow
+    ('ujson', ujson, _ujson_dumps),
+)
+
+
+class JSONSerializer(object):
+    """ JSON serializer with type adapters.
+
+        Adapters are looked up by the exact type of an object first,
+        then along its MRO; the result of the MRO lookup is cached
+        per type. Objects with a ``__json__(request)`` method are
+        supported too, like with Pyramid's JSON renderer.
+
+        :param backend: One of ``auto``, ``orjson``, ``ujson``,
+            ``rapidjson`` or ``json``. ``auto`` picks ``orjson`` or
+            ``rapidjson`` if installed, ``json`` otherwise.
+    """
+
+    def __init__(self, backend='auto'):
+        self.backend = None
+        self._dumps = None
+        for (name, module, dumps) in BACKENDS:
+            if backend == 'auto' and module is None:
+                continue
+            if backend in ('auto', name):
+                if module is None:
+                    raise ValueError("JSON backend '{}' is not installed".format(name))
+                self.backend = name
+                self._dumps = dumps
+                break
+        if self.backend is None:
+            raise ValueError("Unknown JSON backend '{}'".format(backend))
+        self._adapters = {}
+        self._resolved = {}
+        self._options = 0
+        if self.backend == 'orjson':
+            self._options = orjson.OPT_NON_STR_KEYS
+
+    def add_adapter(self, type_or_class, adapter):
+        """ Register an adapter for a type.
+
+            :param type_or_class: The type to adapt
+            :param adapter: A callable taking ``(obj, request)`` and
+                returning a JSON serializable object
+        """
+        self._adapters[type_or_class] = adapter
+        self._resolved = {}
+        if self.backend == 'orjson' and issubclass(type_or_class, DATETIME_TYPES):
+            # orjson serializes these natively unless told otherwise
+            self._options |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _find_adapter(self, cls):
+        try:
+            return self._resolved[cls]
+        except KeyError:
+            pass
+        adapter = None
+        for base in cls.__mro__:
+            adapter = self._adapters.get(base)
+            if adapter is not None:
+                break
+        self._resolved[cls] = adapter
+        return adapter
+
+    def dumps(self, data, request=None):
+        """ Serialize data to JSON encoded bytes """
+        adapters = self._adapters
+        find = self._find_adapter
+
+        def default(obj):
+            adapter = adapters.get(obj.__class__) or find(obj.__class__)
+            if adapter is not None:
+                return adapter(obj, request)
+            if hasattr(obj, '__json__'):
+                return obj.__json__(request)
+            raise TypeError("{!r} is not JSON serializable".format(obj))
+        return self._dumps(data, default, self._options)
+
+
+def render_json(request, data, status_code, serializer):
+    """ Serialize data with a :py:class:`JSONSerializer` directly into
+        ``request.response``
+    """
+    response = request.response
+    response.status_int = status_code
+    if response.content_type == response.default_content_type:
+        response.content_type = 'application/json'
+    response.body = serializer.dumps(data, request)
+    return response
+
+
+def iter_json_array(items, dumps, chunk_size):
+    """ Encode items as a JSON array, yielding chunks of roughly
+        ``chunk_size`` bytes.
+    """
+    chunk = [b'[']
+    size = 1
+    separator = b''
+    for item in items:
+        data = dumps(item)
+        chunk.append(separator)
+        chunk.append(data)
+        separator = b','
+        size += len(data) + 1
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    chunk.append(b']')
+    yield b''.join(chunk)
+
+
+def iter_ndjson(items, dumps, chunk_size):
+    """ Encode items as newline delimited JSON, yielding chunks of
+        roughly ``chunk_size`` bytes.
+    """
+    chunk = []
+    size = 0
+    for item in items:
+        data = dumps(item)
+        chunk.append(data)
+        chunk.append(b'\n')
+        size += len(data) + 1
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def is_stream(data):
+    """ Return true if data should be streamed (i.e. it's an iterator
+        like a generator and not a materialized list)
+    """
+    return isinstance(data, Iterator)
+
+
+def render_stream(request, items, status_code, serializer, chunk_size, ndjson=False):
+    """ Stream items as a JSON array (or as NDJSON) using ``app_iter`` """
+    response = request.response
+    response.status_int = status_code
+    if ndjson:
+        response.content_type = NDJSON_MIME_TYPE
+        encode = iter_ndjson
+    else:
+        if response.content_type == response.default_content_type:
+            response.content_type = 'application/json'
+        encode = iter_json_array
+
+    def dumps(item):
+        return serializer.dumps(item, request)
+    response.app_iter = encode(items, dumps, chunk_size)
+    response.content_length = None
+    return response
+
+
+def add_json_adapter(config, type_or_class, adapter):
+    """ Configurator directive registering a JSON adapter with the
+        pyramlson JSON serializer.
+
+        .. code-block:: python
+
+           config.add_pyramlson_json_adapter(datetime, lambda obj, request: obj.isoformat())
+    """
+    serializer = config.registry.queryUtility(IJSONSerializer)
+    if serializer is None:
+        # only if called directly, the directive requires a serializer
+        raise ConfigurationError("pyramlson.json_serializer is not configured")
+    adapter = config.maybe_dotted(adapter)
+    serializer.add_adapter(config.maybe_dotted(type_or_class), adapter)
+
+
+class RendererSerializer(object):
+    """ Serializes with a Pyramid JSON renderer, so streamed items use
+        the same adapters as the other responses
+    """
+
+    def __init__(self, renderer):
+        self._render = renderer(None)
+
+    def dumps(self, data, request=None):
+        """ Serialize data to JSON encoded bytes """
+        return self._render(data, {'request': request}).encode('utf-8')
+
+
+# used if no renderer is configured either
+STDLIB_SERIALIZER = JSONSerializer('json')
+
+
+def stream_serializer(registry):
+    """ Return the serializer of streamed responses if no
+        ``pyramlson.json_serializer`` is configured: the ``json``
+        renderer of the application
+    """
+    renderer = registry.queryUtility(IRendererFactory, name='json')
+    if isinstance(renderer, JSON):
+        return RendererSerializer(renderer)
+    return STDLIB_SERIALIZER
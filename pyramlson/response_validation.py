@@ -0,0 +1,95 @@
+# coding: utf-8
+"""
+Pyramlson response validation
+
+Rendered JSON responses can be validated against the schema of the
+RAML response body, using the same compiled validators as request
+bodies. Validation is enabled with a sampling rate:
+
+- ``pyramlson.response_validation``: fraction of responses to validate,
+  e.g. ``1`` in tests and ``0.01`` in production (default: ``0``)
+- ``pyramlson.response_validation.mode``: ``log`` (default) only logs
+  invalid responses, ``strict`` replaces them with an error
+"""
+import json
+import logging
+import random
+
+from functools import partial
+
+from pyramid.exceptions import ConfigurationError
+from pyramid.httpexceptions import HTTPInternalServerError
+from pyramid.settings import asbool
+
+from .fields import ENVIRON_KEY as PROJECTION_KEY
+from .validation import SchemaValidationError
+
+
+LOG = logging.getLogger(__name__)
+
+MODES = ('log', 'strict')
+
+
+def sampling_rate(settings):
+    """ Return the response validation sampling rate from settings """
+    value = settings.get('pyramlson.response_validation', 0)
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        rate = 1.0 if asbool(value) else 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+def validation_mode(settings):
+    """ Return the response validation mode from settings """
+    mode = settings.get('pyramlson.response_validation.mode', 'log')
+    if mode not in MODES:
+        raise ConfigurationError("Invalid pyramlson.response_validation.mode: {}".format(mode))
+    return mode
+
+
+def _response_body(resource, status_code):
+    for response in resource.responses or ():
+        if response.code == status_code and response.body:
+            for body in response.body:
+                if body.mime_type == 'application/json':
+                    return body
+    return None
+
+
+def _validate_response(render, validator, rate, strict, name, request, result):
+    # pylint: disable=too-many-arguments
+    response = render(request, result)
+    if rate < 1.0 and random.random() >= rate:
+        return response
+    if not isinstance(response.app_iter, list) or response.content_type != 'application/json':
+        # streamed or custom responses
+        return response
+    if PROJECTION_KEY in request.environ:
+        # sparse responses omit fields on purpose
+        return response
+    try:
+        validator(json.loads(response.body.decode(response.charset or 'utf-8')))
+    except (ValueError, SchemaValidationError) as err:
+        message = err.message if isinstance(err, SchemaValidationError) else str(err)
+        LOG.warning("Invalid response of %s: %s", name, message)
+        if strict:
+            raise HTTPInternalServerError("Invalid response: {}".format(message))
+    return response
+
+
+def compile_response_validation(apidef, resource, status_code, render, settings):
+    """ Wrap a render strategy so it validates sampled responses, or
+        return it unchanged if response validation is disabled or the
+        RAML response body has no schema.
+    """
+    rate = sampling_rate(settings)
+    if not rate:
+        return render
+    mode = validation_mode(settings)
+    body = _response_body(resource, status_code)
+    validator = apidef.get_validator(body) if body is not None else None
+    if validator is None:
+        return render
+    name = '{} {}'.format(resource.method.upper(), resource.path)
+    return partial(_validate_response, render, validator, rate, mode == 'strict', name)
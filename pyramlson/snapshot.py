@@ -0,0 +1,231 @@
+# coding: utf-8
+"""
+Pyramlson RAML snapshots
+
+A snapshot is a compact, immutable copy of the parts of a parsed RAML
+definition pyramlson actually uses. Snapshots can be stored on disk,
+so warm starts don't have to parse the RAML definition at all.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+from collections import namedtuple
+
+import ramlfications
+
+
+LOG = logging.getLogger(__name__)
+
+# Bump this whenever the snapshot types change
+SNAPSHOT_VERSION = 1
+
+INCLUDE_RE = re.compile(r'!include\s+([^\s#]+)')
+RAML_EXTENSIONS = ('.raml', '.yaml', '.yml')
+
+
+RamlRoot = namedtuple('RamlRoot', [
+    'title',
+    'version',
+    'base_uri',
+    'media_type',
+    'resources',
+    'schemas',
+    'traits',
+])
+
+RamlResource = namedtuple('RamlResource', [
+    'name',
+    'display_name',
+    'path',
+    'method',
+    'description',
+    'uri_params',
+    'query_params',
+    'body',
+    'responses',
+    'is_',
+])
+
+RamlParam = namedtuple('RamlParam', [
+    'name',
+    'display_name',
+    'type',
+    'required',
+    'default',
+    'enum',
+    'pattern',
+    'minimum',
+    'maximum',
+    'min_length',
+    'max_length',
+])
+
+RamlBody = namedtuple('RamlBody', [
+    'mime_type',
+    'schema',
+])
+
+RamlResponse = namedtuple('RamlResponse', [
+    'code',
+    'body',
+])
+
+RamlTrait = namedtuple('RamlTrait', [
+    'name',
+    'description',
+    'query_params',
+])
+
+
+def _text(content):
+    return None if content is None else str(content)
+
+
+def _tuple(nodes, factory):
+    if nodes is None:
+        return None
+    return tuple(factory(node) for node in nodes)
+
+
+def _param(param):
+    return RamlParam(
+        name=param.name,
+        display_name=param.display_name,
+        type=param.type,
+        required=param.required,
+        default=param.default,
+        enum=tuple(param.enum) if param.enum else None,
+        pattern=param.pattern,
+        minimum=param.minimum,
+        maximum=param.maximum,
+        min_length=param.min_length,
+        max_length=param.max_length,
+    )
+
+
+def _body(body):
+    return RamlBody(mime_type=body.mime_type, schema=body.schema)
+
+
+def _response(response):
+    return RamlResponse(code=response.code, body=_tuple(response.body, _body))
+
+
+def _resource(res):
+    return RamlResource(
+        name=res.name,
+        display_name=res.display_name,
+        path=res.path,
+        method=res.method,
+        description=_text(res.description),
+        uri_params=_tuple(res.uri_params, _param),
+        query_params=_tuple(res.query_params, _param),
+        body=_tuple(res.body, _body),
+        responses=_tuple(res.responses, _response),
+        is_=tuple(res.is_) if res.is_ else None,
+    )
+
+
+def _trait(trait):
+    return RamlTrait(
+        name=trait.name,
+        description=_text(trait.description),
+        query_params=_tuple(trait.query_params, _param),
+    )
+
+
+def take_snapshot(raml):
+    """ Create a :py:class:`RamlRoot` snapshot from a parsed RAML definition """
+    return RamlRoot(
+        title=raml.title,
+        version=raml.version,
+        base_uri=raml.base_uri,
+        media_type=raml.media_type,
+        resources=_tuple(raml.resources, _resource) or (),
+        schemas=tuple(raml.schemas) if raml.schemas else None,
+        traits=_tuple(raml.traits, _trait),
+    )
+
+
+def source_files(apidef_path):
+    """ Return the RAML file and all the files it includes (recursively) """
+    seen = []
+    pending = [os.path.abspath(apidef_path)]
+    while pending:
+        path = pending.pop(0)
+        if path in seen:
+            continue
+        seen.append(path)
+        if not path.endswith(RAML_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as source:
+            content = source.read().decode('utf-8', 'replace')
+        base = os.path.dirname(path)
+        for include in INCLUDE_RE.findall(content):
+            pending.append(os.path.normpath(os.path.join(base, include)))
+    return seen
+
+
+def snapshot_key(apidef_path):
+    """ Compute a cache key from the content of the RAML file and its includes """
+    digest = hashlib.sha1()
+    digest.update("{}:{}:{}:{}".format(
+        SNAPSHOT_VERSION,
+        ramlfications.__version__,
+        sys.version_info[0],
+        os.path.abspath(apidef_path)
+    ).encode('utf-8'))
+    for path in source_files(apidef_path):
+        digest.update(path.encode('utf-8'))
+        try:
+            with open(path, 'rb') as source:
+                digest.update(source.read())
+        except (IOError, OSError):
+            digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+def load_snapshot(cache_dir, key):
+    """ Load a snapshot from the cache directory or return None """
+    path = os.path.join(cache_dir, '{}.pickle'.format(key))
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as cached:
+            return pickle.load(cached)
+    except Exception as err: # pylint: disable=broad-except
+        LOG.warning("Ignoring broken RAML cache file %s: %s", path, err)
+        return None
+
+
+def store_snapshot(cache_dir, key, snapshot):
+    """ Atomically store a snapshot in the cache directory """
+    path = os.path.join(cache_dir, '{}.pickle'.format(key))
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        (fd, tmp_path) = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            pickle.dump(snapshot, tmp, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, path)
+    except (IOError, OSError) as err:
+        LOG.warning("Could not write RAML cache file %s: %s", path, err)
+
+
+def parse_cached(apidef_path, cache_dir):
+    """ Return a snapshot of the RAML definition, parsing it only
+        if there's no snapshot for its current content in the cache.
+    """
+    key = snapshot_key(apidef_path)
+    snapshot = load_snapshot(cache_dir, key)
+    if snapshot is not None:
+        LOG.debug("Loaded RAML definition %s from cache", apidef_path)
+        return snapshot
+    snapshot = take_snapshot(ramlfications.parse(apidef_path))
+    store_snapshot(cache_dir, key, snapshot)
+    return snapshot
@@ -0,0 +1,206 @@
+# coding: utf-8
+"""
+Pyramlson streaming request bodies
+
+JSON array bodies of methods decorated with
+``api_method(..., stream_body=True)`` are parsed incrementally: the
+items are decoded and validated one by one while the service method
+consumes them, so the whole body never has to be held in memory. An
+invalid item is only noticed when it's reached, after the method has
+processed the items before it.
+"""
+import codecs
+import json
+
+from pyramid.httpexceptions import (
+    HTTPBadRequest,
+    HTTPRequestEntityTooLarge,
+)
+
+from .validation import SchemaValidationError
+
+
+DEFAULT_READ_SIZE = 64 * 1024
+
+# the largest item of an array which is buffered while it's decoded
+DEFAULT_MAX_ITEM_SIZE = 1024 * 1024
+
+# a decoding error this close to the end of the buffer might be caused
+# by a truncated item (e.g. "fals" or "\u00e"), not by invalid JSON
+TRUNCATION_MARGIN = 5
+
+WHITESPACE = ' \t\n\r'
+
+DELIMITERS = WHITESPACE + ',]'
+
+
+def check_body_size(request, max_body_size):
+    """ Raise a 413 error if the declared body size is too large """
+    if max_body_size is None:
+        return
+    length = request.content_length
+    if length is not None and length > max_body_size:
+        raise HTTPRequestEntityTooLarge(
+            "Request body too large, expected at most {} bytes, got {}".format(
+                max_body_size,
+                length
+            )
+        )
+
+
+def read_body(request, max_body_size):
+    """ Return the request body, making sure it's not larger than
+        ``max_body_size`` (if set) before reading it.
+    """
+    check_body_size(request, max_body_size)
+    if max_body_size is not None and request.content_length is None:
+        # chunked request, read no more than allowed
+        body = request.body_file.read(max_body_size + 1)
+        if len(body) > max_body_size:
+            raise HTTPRequestEntityTooLarge(
+                "Request body too large, expected at most {} bytes".format(max_body_size)
+            )
+        request.body = body
+    return request.body
+
+
+class LimitedReader(object):
+    """ File-like wrapper raising a 413 error once more than
+        ``max_body_size`` bytes have been read, for bodies without
+        (or with a wrong) ``Content-Length``
+    """
+
+    def __init__(self, stream, max_body_size):
+        self.stream = stream
+        self.max_body_size = max_body_size
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.size > self.max_body_size:
+            raise HTTPRequestEntityTooLarge(
+                "Request body too large, expected at most {} bytes".format(self.max_body_size)
+            )
+        return data
+
+
+class _ArrayReader(object):
+    """ Incremental reader of the items of a JSON array """
+
+    def __init__(self, stream, read_size, max_item_size):
+        self.stream = stream
+        self.read_size = read_size
+        self.max_item_size = max_item_size
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        if len(self.buf) - self.pos > self.max_item_size:
+            raise ValueError("Item at position {} is larger than {} bytes".format(
+                self.pos, self.max_item_size))
+        chunk = self.stream.read(self.read_size)
+        self.eof = not chunk
+        self.buf = self.buf[self.pos:] + self.text.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def next_char(self):
+        """ Return the next non-whitespace character or '' at EOF """
+        while True:
+            buf = self.buf
+            pos = self.pos
+            size = len(buf)
+            while pos < size and buf[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < size:
+                return buf[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.next_char()
+        if char == '' or char not in chars:
+            raise ValueError("Expected one of '{}' at position {}".format(chars, self.pos))
+        self.pos += 1
+        return char
+
+    def value(self):
+        while True:
+            self.next_char()
+            try:
+                (obj, end) = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError as err:
+                if self.truncated(err) and self.fill():
+                    continue
+                raise
+            # a value not followed by a delimiter might be truncated (e.g. numbers)
+            if not self.eof and (end == len(self.buf) or self.buf[end] not in DELIMITERS):
+                self.fill()
+                continue
+            self.pos = end
+            return obj
+
+    def truncated(self, err):
+        """ Return True if a decoding error might be caused by an item
+            which hasn't been read completely yet
+        """
+        pos = getattr(err, 'pos', None)
+        if pos is None:  # pragma: no cover
+            return True
+        return pos >= len(self.buf) - TRUNCATION_MARGIN or \
+            err.msg.startswith('Unterminated string')
+
+    def __iter__(self):
+        self.expect('[')
+        if self.next_char() == ']':
+            self.pos += 1
+        else:
+            while True:
+                yield self.value()
+                if self.expect(',]') == ']':
+                    break
+        if self.next_char() != '':
+            raise ValueError("Extra data after JSON array")
+
+
+def iter_array_items(stream, read_size=DEFAULT_READ_SIZE, max_item_size=DEFAULT_MAX_ITEM_SIZE):
+    """ Yield the items of a JSON array read from a file-like object.
+
+        :raises ValueError: if the stream is not a valid JSON array or
+            an item is larger than ``max_item_size``
+    """
+    return iter(_ArrayReader(stream, read_size, max_item_size))
+
+
+def stream_json_body(request, items_validator, debug=False, max_body_size=None):
+    """ Return an iterator of validated items of a JSON array body.
+
+        :param items_validator: A :py:class:`pyramlson.validation.ArrayItemsValidator`
+        :param debug: Include verbose validation errors
+        :param max_body_size: Maximum number of bytes read from the body
+    """
+    stream = request.body_file
+    if max_body_size is not None:
+        stream = LimitedReader(stream, max_body_size)
+    count = 0
+    try:
+        for item in iter_array_items(stream):
+            try:
+                items_validator.validate_item(item, count)
+            except SchemaValidationError as err:
+                raise HTTPBadRequest(err.detail if debug else err.message)
+            count += 1
+            yield item
+    except ValueError as err:
+        raise HTTPBadRequest(u"Invalid JSON body: {}".format(err))
+    try:
+        items_validator.validate_count(count)
+    except SchemaValidationError as err:
+        raise HTTPBadRequest(err.message)
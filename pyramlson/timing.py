@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+Pyramlson view timing instrumentation
+
+If enabled, generated views measure how long each phase of a request
+takes and report the durations to a timing sink:
+
+- ``uri``: URI parameter conversion
+- ``body``: reading and decoding the request body
+- ``validate``: JSON schema validation of the request body
+- ``query``: query parameter conversion
+- ``call``: the service method call
+- ``render``: rendering the response
+"""
+import bisect
+import logging
+import socket
+import threading
+import time
+
+from pyramid.path import DottedNameResolver
+from pyramid.settings import asbool
+from zope.interface import Interface
+
+
+LOG = logging.getLogger(__name__)
+
+ENVIRON_KEY = 'pyramlson.timings'
+
+try:
+    clock = time.perf_counter
+except AttributeError: # pragma: no cover
+    clock = time.time
+
+
+class ITimingSink(Interface):
+    """ Marker interface for timing sinks.
+
+        A timing sink has a ``record(route_name, method, timings)``
+        method, ``timings`` being a list of ``(phase, seconds)`` pairs.
+    """
+    # pylint: disable=inherit-non-class
+    pass
+
+
+class LoggingSink(object):
+    """ Logs the phase durations of every request """
+
+    def __init__(self, logger=LOG, level=logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def record(self, route_name, method, timings):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.logger.log(
+            self.level,
+            "%s %s %s",
+            method,
+            route_name,
+            ' '.join('{}={:.3f}ms'.format(phase, secs * 1000) for (phase, secs) in timings)
+        )
+
+
+class StatsdSink(object):
+    """ Sends the phase durations as statsd timers over UDP
+
+        Metric names are ``<prefix>.<route_name>.<method>.<phase>``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='pyramlson'):
+        self.address = (host, int(port))
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def metric_name(self, route_name, method, phase):
+        route = ''.join(c if c.isalnum() or c in '-_' else '_' for c in route_name)
+        return '{}.{}.{}.{}'.format(self.prefix, route, method.lower(), phase)
+
+    def record(self, route_name, method, timings):
+        packet = '\n'.join(
+            '{}:{:.3f}|ms'.format(self.metric_name(route_name, method, phase), secs * 1000)
+            for (phase, secs) in timings
+        )
+        try:
+            self.socket.sendto(packet.encode('utf-8'), self.address)
+        except (IOError, OSError) as err:
+            LOG.debug("Could not send timings to %s: %s", self.address, err)
+
+
+class Histogram(object):
+    """ A fixed bucket histogram of durations in milliseconds """
+
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, millis):
+        self.counts[bisect.bisect_left(self.BUCKETS, millis)] += 1
+        self.count += 1
+        self.total += millis
+        if self.min is None or millis < self.min:
+            self.min = millis
+        if self.max is None or millis > self.max:
+            self.max = millis
+
+    def as_dict(self):
+        return dict(
+            count=self.count,
+            total=self.total,
+            min=self.min,
+            max=self.max,
+            mean=self.total / self.count if self.count else None,
+            buckets=list(zip(self.BUCKETS + (float('inf'), ), self.counts)),
+        )
+
+
+class HistogramSink(object):
+    """ Keeps an in-process histogram per route, method and phase """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, route_name, method, timings):
+        with self.lock:
+            for (phase, secs) in timings:
+                key = (route_name, method, phase)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.add(secs * 1000)
+
+    def snapshot(self):
+        """ Return a dict of ``(route_name, method, phase)`` -> histogram dict """
+        with self.lock:
+            return dict((key, hist.as_dict()) for (key, hist) in self.histograms.items())
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+
+def create_sink(settings):
+    """ Create a timing sink from settings or return None if timing is disabled.
+
+        - ``pyramlson.timing``: enables the instrumentation
+        - ``pyramlson.timing.sink``: ``logging`` (default), ``statsd``,
+          ``histogram`` or a dotted name of a sink factory taking the
+          settings as its only argument
+        - ``pyramlson.timing.statsd_host``, ``pyramlson.timing.statsd_port``,
+          ``pyramlson.timing.statsd_prefix``: statsd sink options
+    """
+    if not asbool(settings.get('pyramlson.timing', False)):
+        return None
+    sink = settings.get('pyramlson.timing.sink', 'logging')
+    if sink == 'logging':
+        return LoggingSink()
+    if sink == 'histogram':
+        return HistogramSink()
+    if sink == 'statsd':
+        return StatsdSink(
+            settings.get('pyramlson.timing.statsd_host', '127.0.0.1'),
+            settings.get('pyramlson.timing.statsd_port', 8125),
+            settings.get('pyramlson.timing.statsd_prefix', 'pyramlson'),
+        )
+    return DottedNameResolver().maybe_resolve(sink)(settings)
+
+
+def server_timing(timings):
+    """ Format timings as a ``Server-Timing`` header value """
+    return ', '.join(
+        '{};dur={:.3f}'.format(phase, secs * 1000) for (phase, secs) in timings
+    )
+
+
+def record_phase(request, phase, started):
+    """ Record a phase started at ``started`` for the current request
+        (if it's being timed) and return the current clock value.
+    """
+    now = clock()
+    timings = request.environ.get(ENVIRON_KEY)
+    if timings is not None:
+        timings.append((phase, now - started))
+    return now
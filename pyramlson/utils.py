@@ -3,39 +3,86 @@
 Pyramlson utilities
 """
 import re
-import jsonschema
 from email.utils import parsedate
 from datetime import datetime
+from functools import partial
 
+from pyramid.exceptions import ConfigurationError
 from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.renderers import render_to_response
 
 from .apidef import IRamlApiDefinition
+from .renderers import render_json
+from .streaming import read_body
+from .validation import SchemaValidationError
+
+# invalid bodies are included in error messages up to this size
+MAX_ERROR_BODY_SIZE = 200
+
+
+# id of a RAML body -> (body, validator), the body is kept so its id
+# isn't reused
+_BODY_VALIDATORS = {}
+
+
+def _find_body_validator(registry, body):
+    for (_, apidef) in registry.getUtilitiesFor(IRamlApiDefinition):
+        if apidef.get_schema(body):
+            return apidef.get_validator(body)
+    return None
 
 
 def prepare_json_body(request, body):
-    """ Convert request body to json and validate it. """
-    if not request.body:
+    """ Convert request body to json and validate it.
+
+        The validator of a body is looked up once, in the API
+        definition declaring its schema.
+    """
+    try:
+        validator = _BODY_VALIDATORS[id(body)][1]
+    except KeyError:
+        validator = _find_body_validator(request.registry, body)
+        _BODY_VALIDATORS[id(body)] = (body, validator)
+    return parse_json_body(request, validator)
+
+
+def parse_json_body(request, validator, max_body_size=None):
+    """ Convert request body to json and validate it using a
+        precompiled validator (or don't validate if it's None).
+
+        :param max_body_size: Optional maximum body size in bytes,
+            checked before the body is read
+    """
+    data = decode_json_body(request, max_body_size)
+    validate_json_body(request, data, validator)
+    return data
+
+
+def decode_json_body(request, max_body_size=None):
+    """ Convert request body to json """
+    if not read_body(request, max_body_size):
         raise HTTPBadRequest(u"Empty body!")
     try:
-        data = request.json_body
+        return request.json_body
     except ValueError:
-        raise HTTPBadRequest(u"Invalid JSON body: {}".format(request.body))
-    apidef = request.registry.queryUtility(IRamlApiDefinition)
-    schema = apidef.get_schema(body)
-    if schema:
+        body = request.body
+        if len(body) > MAX_ERROR_BODY_SIZE:
+            body = body[:MAX_ERROR_BODY_SIZE] + b'...'
+        raise HTTPBadRequest(u"Invalid JSON body: {}".format(body))
+
+
+def validate_json_body(request, data, validator):
+    """ Validate decoded json data using a precompiled validator
+        (or don't validate if it's None).
+    """
+    if validator is not None:
         try:
-            jsonschema.validate(
-                data,
-                schema,
-                format_checker=jsonschema.draft4_format_checker
-            )
-        except jsonschema.ValidationError as err:
+            validator(data)
+        except SchemaValidationError as err:
             if request.registry.settings.get('pyramlson.debug'):
-                raise HTTPBadRequest(str(err))
+                raise HTTPBadRequest(err.detail)
             else:
                 raise HTTPBadRequest(err.message)
-    return data
 
 
 def render_mime_view(data, status_code, mime_type):
@@ -44,8 +91,14 @@ def render_mime_view(data, status_code, mime_type):
     data.status_int = status_code
     return data
 
-def render_view(request, data, status_code):
-    """ Render data to response using the correct response status code """
+def render_view(request, data, status_code, serializer=None):
+    """ Render data to response using the correct response status code
+
+        If a :py:class:`pyramlson.renderers.JSONSerializer` is given,
+        it's used instead of Pyramid's ``json`` renderer.
+    """
+    if serializer is not None:
+        return render_json(request, data, status_code, serializer)
     response = request.response
     response.status_int = status_code
     try:
@@ -61,6 +114,19 @@ def validate_and_convert(param, value):
         return converter(param, value)
     return value
 
+def get_converter(param):
+    """ Return a converter callable bound to a parameter or None
+        if there's no converter for the parameter type.
+
+        :raises ConfigurationError: if the parameter declares an invalid pattern
+    """
+    if param.type == 'string':
+        return _compile_string_converter(param)
+    converter = CONVERTERS.get(param.type)
+    if converter:
+        return partial(converter, param)
+    return None
+
 def _bool_converter(param, value):
     if type(value) is bool:
         return value
@@ -111,38 +177,68 @@ def _number_converter(param, value):
 
     return converted
 
+# id of a parameter -> (parameter, converter), the parameter is kept so
+# its id isn't reused
+_STRING_CONVERTERS = {}
+
 def _string_converter(param, value):
-    if param.enum and value not in param.enum:
-        msg = "Malformed parameter '{}', expected one of {}, got '{}'".format(
-            param.name,
-            ', '.join(param.enum),
-            value
-        )
-        raise HTTPBadRequest(msg)
+    try:
+        convert = _STRING_CONVERTERS[id(param)][1]
+    except KeyError:
+        convert = _compile_string_converter(param)
+        _STRING_CONVERTERS[id(param)] = (param, convert)
+    return convert(value)
+
+def _compile_string_converter(param):
+    """ Return a string converter with a precompiled pattern and
+        a precomputed set of allowed values
+    """
+    name = param.name
+    enum = frozenset(param.enum) if param.enum else None
+    enum_str = ', '.join(param.enum) if param.enum else None
+    pattern = None
     if param.pattern:
-        result = re.search(param.pattern, value)
-        if not result:
+        try:
+            pattern = re.compile(param.pattern)
+        except re.error as err:
+            # venusian ignores ValueErrors raised by scan callbacks
+            raise ConfigurationError(
+                "Invalid pattern for parameter '{}': {}".format(name, err)
+            )
+    min_length = param.min_length
+    max_length = param.max_length
+
+    def convert(value):
+        if enum is not None and value not in enum:
+            msg = "Malformed parameter '{}', expected one of {}, got '{}'".format(
+                name,
+                enum_str,
+                value
+            )
+            raise HTTPBadRequest(msg)
+        if pattern is not None and not pattern.search(value):
             msg = "Malformed parameter '{}', expected pattern {}, got '{}'".format(
-                param.name,
-                param.pattern,
+                name,
+                pattern.pattern,
                 value
             )
             raise HTTPBadRequest(msg)
-    if param.min_length and len(value) < param.min_length:
-        msg = "Malformed parameter '{}', expected minimum length is {}, got {}".format(
-            param.name,
-            param.min_length,
-            len(value)
-        )
-        raise HTTPBadRequest(msg)
-    if param.max_length and len(value) > param.max_length:
-        msg = "Malformed parameter '{}', expected maximum length is {}, got {}".format(
-            param.name,
-            param.max_length,
-            len(value)
-        )
-        raise HTTPBadRequest(msg)
-    return value
+        if min_length and len(value) < min_length:
+            msg = "Malformed parameter '{}', expected minimum length is {}, got {}".format(
+                name,
+                min_length,
+                len(value)
+            )
+            raise HTTPBadRequest(msg)
+        if max_length and len(value) > max_length:
+            msg = "Malformed parameter '{}', expected maximum length is {}, got {}".format(
+                name,
+                max_length,
+                len(value)
+            )
+            raise HTTPBadRequest(msg)
+        return value
+    return convert
 
 def _date_converter(param, value):
     if type(param) is datetime:
@@ -0,0 +1,214 @@
+# coding: utf-8
+"""
+Pyramlson JSON schema validators
+
+Validators are compiled once per schema and reused for every request.
+"""
+import json
+import logging
+import threading
+
+import jsonschema
+
+from jsonschema.exceptions import best_match
+
+try:
+    import fastjsonschema
+except ImportError: # pragma: no cover
+    fastjsonschema = None
+
+
+LOG = logging.getLogger(__name__)
+
+
+class SchemaValidationError(Exception):
+    """ Raised when data doesn't validate against a schema.
+
+        :param message: A short description of the validation error
+        :param detail: A verbose description of the validation error
+    """
+
+    def __init__(self, message, detail=None):
+        super(SchemaValidationError, self).__init__(message)
+        self.message = message
+        self.detail = detail if detail is not None else message
+
+
+class JsonSchemaValidator(object):
+    """ Validator using a precompiled :py:mod:`jsonschema` validator """
+
+    def __init__(self, schema):
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        self.validator = cls(
+            schema,
+            format_checker=jsonschema.draft4_format_checker
+        )
+
+    def __call__(self, data):
+        error = best_match(self.validator.iter_errors(data))
+        if error is not None:
+            raise SchemaValidationError(error.message, str(error))
+
+
+class FastJsonSchemaValidator(object):
+    """ Validator using a code-generating :py:mod:`fastjsonschema` validator """
+
+    def __init__(self, schema):
+        self.validator = fastjsonschema.compile(schema)
+
+    def __call__(self, data):
+        try:
+            self.validator(data)
+        except fastjsonschema.JsonSchemaException as err:
+            detail = "{} (failed validating '{}' in {})".format(
+                err.message,
+                getattr(err, 'rule', None),
+                getattr(err, 'name', 'data')
+            )
+            raise SchemaValidationError(err.message, detail)
+
+
+BACKENDS = {
+    'jsonschema': JsonSchemaValidator,
+    'fastjsonschema': FastJsonSchemaValidator,
+}
+
+
+def compile_validator(schema, backend='jsonschema'):
+    """ Compile a validator callable for a JSON schema
+
+        :param schema: The JSON schema (a dict)
+        :param backend: Either ``jsonschema`` or ``fastjsonschema``.
+            If ``fastjsonschema`` is not installed or cannot compile
+            the schema (e.g. draft-03 schemas) the ``jsonschema``
+            backend is used instead.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown schema validator backend '{}'".format(backend))
+    if backend == 'fastjsonschema':
+        if fastjsonschema is None:
+            LOG.warning("fastjsonschema is not installed, using jsonschema instead")
+        else:
+            try:
+                return FastJsonSchemaValidator(schema)
+            except fastjsonschema.JsonSchemaDefinitionException as err:
+                LOG.warning(
+                    "fastjsonschema failed to compile schema, using jsonschema instead: %s",
+                    err
+                )
+    return JsonSchemaValidator(schema)
+
+
+class ArrayItemsValidator(object):
+    """ Validates the items of a JSON array one by one.
+
+        Only the ``items``, ``minItems`` and ``maxItems`` keywords
+        of the array schema are checked.
+    """
+
+    def __init__(self, schema, backend='jsonschema'):
+        items = dict(schema['items'])
+        for key in ('$schema', 'definitions'):
+            if key in schema and key not in items:
+                items[key] = schema[key]
+        self.validator = compile_validator(items, backend)
+        self.min_items = schema.get('minItems')
+        self.max_items = schema.get('maxItems')
+
+    def validate_item(self, item, index):
+        """ Validate the item at ``index`` """
+        if self.max_items is not None and index >= self.max_items:
+            raise SchemaValidationError(
+                "Too many items, expected at most {}".format(self.max_items)
+            )
+        try:
+            self.validator(item)
+        except SchemaValidationError as err:
+            raise SchemaValidationError(
+                "Item {}: {}".format(index, err.message),
+                "Item {}: {}".format(index, err.detail)
+            )
+
+    def validate_count(self, count):
+        """ Validate the number of items once all of them were read """
+        if self.min_items is not None and count < self.min_items:
+            raise SchemaValidationError(
+                "Too few items, expected at least {}, got {}".format(self.min_items, count)
+            )
+
+
+def compile_items_validator(schema, backend='jsonschema'):
+    """ Return an :py:class:`ArrayItemsValidator` if the schema describes
+        an array of objects with a single item schema, None otherwise.
+    """
+    if not isinstance(schema, dict) or schema.get('type') != 'array':
+        return None
+    if not isinstance(schema.get('items'), dict):
+        return None
+    return ArrayItemsValidator(schema, backend)
+
+
+class SchemaPool(object):
+    """ Deduplicates JSON schemas and their compiled validators by content.
+
+        All API definitions of a process share :py:data:`POOL` per
+        default, so identical schemas of several API versions are kept
+        and compiled only once.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.schemas = {}
+        self.validators = {}
+        self.validators_by_id = {}
+        self.items_validators = {}
+
+    @staticmethod
+    def key(schema):
+        return json.dumps(schema, sort_keys=True)
+
+    def intern(self, schema):
+        """ Return the pooled schema equal to ``schema`` """
+        if not isinstance(schema, dict):
+            return schema
+        with self.lock:
+            return self.schemas.setdefault(self.key(schema), schema)
+
+    def get_validator(self, schema, backend='jsonschema'):
+        """ Return the compiled validator of a schema
+
+            Validators are looked up by the identity of the schema
+            first, so schema objects seen before (e.g. interned ones)
+            aren't serialized again to find their validator.
+        """
+        try:
+            return self.validators_by_id[(backend, id(schema))][1]
+        except KeyError:
+            pass
+        key = (backend, self.key(schema))
+        with self.lock:
+            validator = self.validators.get(key)
+            if validator is None:
+                validator = self.validators[key] = compile_validator(schema, backend)
+            # the schema is kept, so its id isn't reused by another object
+            self.validators_by_id[(backend, id(schema))] = (schema, validator)
+        return validator
+
+    def get_items_validator(self, schema, backend='jsonschema'):
+        """ Return the :py:class:`ArrayItemsValidator` of a schema or None """
+        key = (backend, self.key(schema))
+        with self.lock:
+            if key not in self.items_validators:
+                self.items_validators[key] = compile_items_validator(schema, backend)
+            return self.items_validators[key]
+
+    def clear(self):
+        with self.lock:
+            self.schemas.clear()
+            self.validators.clear()
+            self.validators_by_id.clear()
+            self.items_validators.clear()
+
+
+POOL = SchemaPool()
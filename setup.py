@@ -46,13 +46,16 @@ setup(name='pyramlson',
     author_email='devops@scanplus.de',
     url='https://github.com/ScanPlusGmbH/pyramlson',
     keywords='web pyramid api json',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
     zip_safe=False,
     install_requires=install_requires,
     tests_require=tests_require,
     extras_require = {
         'testing': testing_extras,
+        'fastjsonschema': ['fastjsonschema'],
+        'orjson': ['orjson'],
+        'brotli': ['brotli'],
     },
     test_suite="pyramlson",
 )
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+
+from pyramid import testing
+
+from pyramlson.asgi import ASGIApp
+
+from .base import DATA_DIR
+from .async_resource import ASYNC_CALLS
+from .resource import BOOKS
+
+
+def asgi_request(app, method, path, query_string=b'', body=b'', headers=()):
+    messages = []
+    requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return requests.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(b'host', b'localhost')] + list(headers),
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 1234),
+    }
+    return app(scope, receive, send), messages
+
+
+def response_of(messages):
+    status = messages[0]['status']
+    headers = dict((name.decode('latin-1'), value.decode('latin-1'))
+                   for (name, value) in messages[0]['headers'])
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return (status, headers, body)
+
+
+class AsyncMethodTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.convert_parameters': 'true',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        self.config.scan('.async_resource')
+        self.app = self.config.make_wsgi_app()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        testing.tearDown()
+
+    def request(self, method, path, **kwargs):
+        (coroutine, messages) = asgi_request(ASGIApp(self.app), method, path, **kwargs)
+        self.loop.run_until_complete(coroutine)
+        return response_of(messages)
+
+    def test_wsgi(self):
+        from webtest import TestApp
+        testapp = TestApp(self.app)
+        r = testapp.get('/api/v1/async/123', status=200)
+        assert r.json_body == BOOKS[123]
+        r = testapp.get('/api/v1/async/1', status=404)
+        assert r.json_body['success'] is False
+
+    def test_asgi(self):
+        (status, headers, body) = self.request('GET', '/api/v1/async/123')
+        assert status == 200
+        assert headers['Content-Type'] == 'application/json'
+        assert json.loads(body.decode('utf-8')) == BOOKS[123]
+
+    def test_asgi_error(self):
+        (status, _, body) = self.request('GET', '/api/v1/async/1')
+        assert status == 404
+        assert json.loads(body.decode('utf-8'))['message'] == \
+            'Book with id 1 could not be found.'
+        # URI parameters are validated before the coroutine is created
+        (status, _, body) = self.request('GET', '/api/v1/async/abc')
+        assert status == 400
+
+    def test_asgi_sync_views(self):
+        (status, _, body) = self.request('GET', '/api/v1/books/123')
+        assert status == 200
+        assert json.loads(body.decode('utf-8')) == BOOKS[123]
+        book = dict(id=1, title='Async', author='Someone')
+        (status, _, body) = self.request(
+            'POST', '/api/v1/import', body=json.dumps([book]).encode('utf-8'),
+            headers=[(b'content-type', b'application/json')])
+        assert status == 200
+        assert json.loads(body.decode('utf-8'))['ids'] == [1]
+        (status, _, body) = self.request('HEAD', '/api/v1/books/123')
+        assert status == 200
+        assert body == b''
+
+    def test_render_in_executor(self):
+        from pyramid.response import Response
+        from pyramlson.asgi import AsyncCall, AsyncResponse
+        threads = []
+
+        async def coroutine():
+            threads.append(threading.current_thread())
+            return b'done'
+
+        def render(request, result):
+            threads.append(threading.current_thread())
+            return Response(result)
+
+        def chunks():
+            threads.append(threading.current_thread())
+            yield b'streamed'
+
+        app = ASGIApp(self.app)
+        request = testing.DummyRequest()
+        pending = AsyncResponse(request, AsyncCall(coroutine, (), {}), render)
+        response = self.loop.run_until_complete(app.finish(pending, {}))
+        assert response.body == b'done'
+        response.app_iter = chunks()
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+        self.loop.run_until_complete(app.send_response(send, response, {
+            'REQUEST_METHOD': 'GET',
+        }))
+        assert response_of(messages)[2] == b'streamed'
+        # only the coroutine runs on the event loop
+        assert threads[0] is threading.current_thread()
+        assert threading.current_thread() not in threads[1:]
+
+    def test_concurrent_coroutines(self):
+        app = ASGIApp(self.app)
+        requests = [
+            asgi_request(app, 'GET', '/api/v1/async/123', query_string=b'delay=0.2')
+            for _ in range(10)
+        ]
+
+        async def run_all():
+            await asyncio.gather(*[coro for (coro, _) in requests])
+
+        started = time.time()
+        self.loop.run_until_complete(run_all())
+        # the coroutines are awaited concurrently on the event loop
+        assert time.time() - started < 1.5
+        for (_, messages) in requests:
+            assert response_of(messages)[0] == 200
+
+    def test_cache(self):
+        del ASYNC_CALLS[:]
+        for _ in range(2):
+            (status, _, body) = self.request('GET', '/api/v1/async-cached/123')
+            assert status == 200
+            assert json.loads(body.decode('utf-8')) == BOOKS[123]
+        assert ASYNC_CALLS == [123]
+
+    def test_invalidate_after_write(self):
+        app = ASGIApp(self.app)
+        original = dict(BOOKS[123])
+        book = dict(original, title='Updated')
+        (put, put_messages) = asgi_request(
+            app, 'PUT', '/api/v1/async-cached/123', query_string=b'delay=0.2',
+            body=json.dumps(book).encode('utf-8'),
+            headers=[(b'content-type', b'application/json')])
+
+        async def get_during_put():
+            await asyncio.sleep(0.05)
+            (get, _) = asgi_request(app, 'GET', '/api/v1/async-cached/123')
+            await get
+
+        async def run_all():
+            await asyncio.gather(put, get_during_put())
+
+        try:
+            self.loop.run_until_complete(run_all())
+            assert response_of(put_messages)[0] == 200
+            (status, _, body) = self.request('GET', '/api/v1/async-cached/123')
+            assert status == 200
+            # the response cached during the write has been invalidated
+            assert json.loads(body.decode('utf-8'))['title'] == 'Updated'
+        finally:
+            BOOKS[123] = original
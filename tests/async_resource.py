@@ -0,0 +1,38 @@
+import asyncio
+
+from pyramlson import api_service, api_method
+
+from .resource import get_book
+
+
+@api_service('/async/{bookId}')
+class AsyncBookResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    async def get_one(self, book_id, delay=0):
+        await asyncio.sleep(float(delay))
+        return get_book(book_id)
+
+
+ASYNC_CALLS = []
+
+
+@api_service('/async-cached/{bookId}')
+class CachedAsyncBookResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', cache_ttl=60)
+    async def get_one(self, book_id):
+        ASYNC_CALLS.append(book_id)
+        return dict(get_book(book_id))
+
+    @api_method('put', returns=200, invalidates=True)
+    async def update(self, book_id, data, delay=0):
+        await asyncio.sleep(float(delay))
+        get_book(book_id).update(data)
+        return get_book(book_id)
@@ -0,0 +1,15 @@
+from pyramlson import api_service, api_method
+
+@api_service('/books/{bookId}')
+class CachedWriteResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    def get_one(self, book_id):
+        return {}
+
+    @api_method('put', cache_ttl=60)
+    def update(self, book_id, data):
+        return data
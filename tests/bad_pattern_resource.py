@@ -0,0 +1,11 @@
+from pyramlson import api_service, api_method
+
+@api_service('/things')
+class ThingsResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    def get_all(self, code=None):
+        return [code]
@@ -0,0 +1,16 @@
+from pyramlson import api_service, api_method
+
+from .resource import BOOKS, CALLS
+
+
+@api_service('/hashed')
+class CachedFieldsResource(object):
+    """ Selectable fields without declared fields / include parameters """
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', cache_ttl=60, sparse_fields=True)
+    def get_all(self, fields=None):
+        CALLS.append(fields)
+        return list(BOOKS.values())
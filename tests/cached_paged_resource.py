@@ -0,0 +1,19 @@
+from pyramlson import api_service, api_method
+from pyramlson.pagination import Page
+
+from .resource import BOOKS, CALLS
+
+
+@api_service('/hashed')
+class CachedPagedResource(object):
+    """ Pagination without a declared cursor parameter """
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', cache_ttl=60, paginate=True)
+    def get_all(self, cursor=None):
+        CALLS.append(cursor)
+        after = cursor.position if cursor else 0
+        ids = sorted(bid for bid in BOOKS if bid > after)[:1]
+        return Page([BOOKS[bid] for bid in ids], ids[-1] if ids else None)
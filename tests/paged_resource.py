@@ -0,0 +1,17 @@
+from pyramlson import api_service, api_method
+from pyramlson.pagination import Page
+
+from .resource import BOOKS
+
+
+@api_service('/paged')
+class PagedBooksResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', paginate=True)
+    def get_all(self, cursor=None, limit=1):
+        after = cursor.position if cursor else 0
+        ids = sorted(bid for bid in BOOKS if bid > after)[:limit]
+        return Page([BOOKS[bid] for bid in ids], ids[-1] if len(ids) == limit else None)
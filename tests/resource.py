@@ -162,3 +162,131 @@ class FileResource(object):
             "success": True,
             "message": "File created"
         }
+
+
+@api_service('/export')
+class ExportResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    def export(self, count=3, dated=False):
+        if dated:
+            return (dict(id=i, modified=LAST_MODIFIED) for i in range(int(count)))
+        return (dict(id=i) for i in range(int(count)))
+
+
+@api_service('/export/lines')
+class ExportLinesResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get')
+    def export(self):
+        return iter(BOOKS.values())
+
+
+@api_service('/import')
+class ImportResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('post', stream_body=True)
+    def import_books(self, books):
+        ids = [book['id'] for book in books]
+        return dict(streamed=not isinstance(books, list), ids=ids)
+
+
+CALLS = []
+LAST_MODIFIED = datetime(2017, 1, 1, 12, 0, 0)
+
+
+@api_service('/versioned/{bookId}')
+class VersionedBookResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    def version(self, book_id):
+        return 'book-{}-v1'.format(book_id)
+
+    def modified(self, book_id):
+        return LAST_MODIFIED
+
+    @api_method('get', etag=version, last_modified=modified)
+    def get_one(self, book_id):
+        CALLS.append(book_id)
+        return get_book(book_id)
+
+
+@api_service('/hashed')
+class HashedBooksResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', etag=True)
+    def get_all(self):
+        return list(BOOKS.values())
+
+
+@api_service('/cached')
+class CachedBooksResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', cache_ttl=60, cache_vary=('Accept-Language', ))
+    def get_all(self, title=None):
+        CALLS.append(title)
+        return [book for book in BOOKS.values() if title is None or book['title'] == title]
+
+    @api_method('post', invalidates=True)
+    def create(self, book):
+        CALLS.append(book['id'])
+        return dict(success=True, message='created')
+
+
+class LibraryBase(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', path='/{bookId}')
+    def get_one(self, book_id):
+        return get_book(book_id)
+
+
+@api_service('/library')
+class LibraryResource(LibraryBase):
+
+    @api_method('get', cache_ttl=60)
+    def get_all(self):
+        CALLS.append('all')
+        return list(BOOKS.values())
+
+    @api_method('put', path='/{bookId}', returns=200, invalidates=True)
+    def update(self, book_id, data):
+        get_book(book_id).update(data)
+        return dict(success=True, message='updated')
+
+
+@api_service('/sparse')
+class SparseBooksResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', sparse_fields=True)
+    def get_all(self, fields=None):
+        CALLS.append(fields)
+        books = []
+        for book in BOOKS.values():
+            book = dict(book, author={'name': book['author'], 'born': 1920})
+            if fields is not None and 'author' in fields and 'books' in fields.get('author'):
+                book['author']['books'] = [book['id']]
+            books.append(book)
+        return books
@@ -2,6 +2,8 @@ import json
 import os
 import unittest
 
+import pytest
+
 from pyramid import testing
 
 from pyramlson import apidef
@@ -68,3 +70,103 @@ class TestMissingRaml(unittest.TestCase):
         # must raise a ValueError
         config = testing.setUp()
         self.assertRaises(ValueError, config.include, 'pyramlson')
+
+def test_cached_validator():
+    api = get_api()
+    resource = list(api.get_resources('/books'))[1]
+    validator = api.get_validator(resource.body)
+    assert validator is not None
+    assert api.get_validator(resource.body) is validator
+    put = [r for r in api.get_resources('/books/{bookId}') if r.method == 'put'][0]
+    # same schema, same validator
+    assert api.get_validator(put.body) is validator
+    assert api.get_validator(None) is None
+
+def test_fastjsonschema_validator():
+    from pyramlson.validation import SchemaValidationError
+    path = os.path.join(DATA_DIR, 'test-api.raml')
+    api = apidef.RamlApiDefinition(path, validator_backend='fastjsonschema')
+    resource = list(api.get_resources('/books'))[1]
+    validator = api.get_validator(resource.body)
+    validator({'id': 1, 'title': 'Foo', 'author': 'Bar'})
+    try:
+        validator({'author': 'Bar'})
+    except SchemaValidationError as err:
+        assert err.message
+    else:
+        assert False, "SchemaValidationError expected"
+
+def test_get_resource():
+    api = get_api()
+    resource = api.get_resource('/books/{bookId}', 'PUT')
+    assert resource.path == '/books/{bookId}'
+    assert resource.method == 'put'
+    assert api.get_resource('/books/{bookId}', 'post') is None
+    assert api.get_resource('/foo', 'get') is None
+
+def test_schema_def():
+    api = get_api()
+    assert api.get_schema_def('BookRecordJson')['title'] == 'BookRecord'
+    assert api.get_schema_def('foo') is None
+
+def test_shared_definition():
+    from pyramlson.snapshot import RamlRoot
+    path = os.path.join(DATA_DIR, 'test-api.raml')
+    api = apidef.get_shared_definition(path, convert_params=True)
+    assert isinstance(api.raml, RamlRoot)
+    assert api.convert_params
+    assert api.schema_pool.validators
+    assert apidef.get_shared_definition(path, convert_params=True) is api
+    assert apidef.get_shared_definition(path, convert_params=False) is not api
+
+class TestSchemaValidatorSetting(unittest.TestCase):
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_unknown_backend(self):
+        from pyramid.exceptions import ConfigurationError
+        config = testing.setUp(settings={
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.schema_validator': 'fastjson',
+        })
+        self.assertRaises(ConfigurationError, config.include, 'pyramlson')
+
+class TestSharedDefinition(unittest.TestCase):
+    def test_include_shared(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.shared_apidef': 'true',
+        }
+        config = testing.setUp(settings=settings)
+        config.include('pyramlson')
+        first = config.registry.queryUtility(apidef.IRamlApiDefinition)
+        testing.tearDown()
+        config = testing.setUp(settings=settings)
+        config.include('pyramlson')
+        assert config.registry.queryUtility(apidef.IRamlApiDefinition) is first
+        testing.tearDown()
+
+def test_schema_pool():
+    from pyramlson.validation import SchemaPool
+    pool = SchemaPool()
+    v1 = apidef.RamlApiDefinition(os.path.join(DATA_DIR, 'test-api.raml'), schema_pool=pool)
+    v2 = apidef.RamlApiDefinition(os.path.join(DATA_DIR, 'test-api-v2.raml'), schema_pool=pool)
+    assert v1.get_schema_def('BookRecordJson') is v2.get_schema_def('BookRecordJson')
+    body1 = v1.get_resource('/catalog/{bookId}', 'get').responses[0].body[0]
+    body2 = v2.get_resource('/catalog/{bookId}', 'get').responses[0].body[0]
+    assert v1.get_validator(body1) is v2.get_validator(body2)
+    assert len(pool.validators) == 1
+    # known schemas aren't serialized to find their validator again
+    pool.key = None
+    assert v1.get_validator(body1) is v2.get_validator(body2)
+    del pool.key
+    pool.clear()
+    assert not pool.schemas
+
+def test_parse_apidefs():
+    assert apidef.parse_apidefs('\nv1 = a.raml\n  v2=pkg:b.raml \n') == [
+        ('v1', 'a.raml'),
+        ('v2', 'pkg:b.raml'),
+    ]
+    with pytest.raises(ValueError):
+        apidef.parse_apidefs('a.raml')
@@ -0,0 +1,6 @@
+import sys
+
+# coroutine methods need Python 3.5+, their test cases can't even be
+# imported by older interpreters
+if sys.version_info >= (3, 5):
+    from .asgi_cases import AsyncMethodTests
@@ -0,0 +1,121 @@
+import os
+import unittest
+
+from pyramid import testing
+from pyramid.authentication import BasicAuthAuthenticationPolicy
+from pyramid.authorization import ACLAuthorizationPolicy
+
+from .base import DATA_DIR
+from .resource import BOOKS
+from .test_errors import dummy_check
+
+
+class BatchTests(unittest.TestCase):
+
+    workers = '0'
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.batch_path': '/api/v1/batch',
+            'pyramlson.batch_max_requests': '5',
+            'pyramlson.batch_workers': self.workers,
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.set_authorization_policy(ACLAuthorizationPolicy())
+        self.config.set_authentication_policy(
+            BasicAuthAuthenticationPolicy(dummy_check, 'TEST REALM'))
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_batch(self):
+        self.testapp.authorization = ('Basic', ('admin', 'bar'))
+        book = dict(id=789, title='New book', author='Someone')
+        r = self.testapp.post_json('/api/v1/batch', [
+            dict(path='/api/v1/books/123'),
+            dict(method='GET', path='/api/v1/books/1'),
+            dict(method='POST', path='/api/v1/books', body=book),
+            dict(path='/api/v1/books/789'),
+            dict(path='/api/v1/books', query=dict(limit=1)),
+        ], status=200)
+        try:
+            responses = r.json_body
+            assert [resp['status'] for resp in responses] == [200, 404, 200, 200, 200]
+            assert responses[0]['body'] == BOOKS[123]
+            assert responses[0]['headers']['Content-Type'].startswith('application/json')
+            assert responses[1]['body']['success'] is False
+            # sub-requests are executed in order
+            assert responses[3]['body'] == book
+        finally:
+            BOOKS.pop(789, None)
+
+    def test_permissions(self):
+        r = self.testapp.post_json('/api/v1/batch', [dict(path='/api/v1/books/123')])
+        assert r.json_body[0]['status'] == 401
+        self.testapp.authorization = ('Basic', ('somebody', 'bar'))
+        r = self.testapp.post_json('/api/v1/batch', [dict(path='/api/v1/books/123')])
+        assert r.json_body[0]['status'] == 403
+        self.testapp.authorization = ('Basic', ('writer', 'bar'))
+        r = self.testapp.post_json('/api/v1/batch', [dict(path='/api/v1/books/123')])
+        assert r.json_body[0]['status'] == 200
+
+    def test_invalid_batches(self):
+        self.testapp.post('/api/v1/batch', 'foo', status=400)
+        self.testapp.post_json('/api/v1/batch', dict(path='/api/v1/books'), status=400)
+        self.testapp.post_json('/api/v1/batch', [dict(method='GET')], status=400)
+        self.testapp.post_json('/api/v1/batch', [dict(path='/api/v1/batch')], status=400)
+        for (item, message) in [
+                (dict(path=5), 'invalid path 5'),
+                (dict(path='/api/v1/books', method=1), 'invalid method 1'),
+                (dict(path='/api/v1/books', query=[1]), 'query must be an object'),
+                (dict(path='/api/v1/books', headers='x'), 'headers must be an object'),
+                (dict(path='/api/v1/books', headers={'X-A': 1}), 'header values must be strings')]:
+            r = self.testapp.post_json('/api/v1/batch',
+                [dict(path='/api/v1/books'), item], status=400)
+            assert r.json_body['message'] == 'Invalid batch request 1: {}'.format(message)
+        r = self.testapp.post_json('/api/v1/batch',
+            [dict(path='/api/v1/books')] * 6, status=400)
+        assert r.json_body['message'] == 'Too many requests in batch: 6 (max. 5)'
+
+
+
+class CompressedBatchTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.batch_path': '/api/v1/batch',
+            'pyramlson.compression': 'true',
+            'pyramlson.compression.min_size': '0',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_subrequests_not_compressed(self):
+        r = self.testapp.post_json('/api/v1/batch', [
+            dict(path='/api/v1/hashed'),
+            dict(path='/api/v1/versioned/123'),
+        ], headers={
+            'Accept-Encoding': 'gzip',
+            'If-None-Match': '*',
+        }, status=200)
+        responses = r.json_body
+        assert [resp['status'] for resp in responses] == [200, 200]
+        assert responses[0]['body'] == list(BOOKS.values())
+        assert 'Content-Encoding' not in responses[0]['headers']
+        assert responses[1]['body'] == BOOKS[123]
+
+class ConcurrentBatchTests(BatchTests):
+
+    workers = '4'
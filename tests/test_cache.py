@@ -0,0 +1,210 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pyramid import testing
+from pyramid.exceptions import ConfigurationError
+
+from pyramlson.cache import CacheEntry, FileCache, MemoryCache
+
+from .base import DATA_DIR
+from .resource import BOOKS, CALLS
+
+
+def entry(body=b'{}', ttl=60):
+    return CacheEntry(200, (('Content-Type', 'application/json'), ), body, time.time() + ttl)
+
+
+class CachedViewTests(unittest.TestCase):
+
+    cache_settings = {}
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        }
+        settings.update(self.cache_settings)
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_hit_skips_method(self):
+        r1 = self.testapp.get('/api/v1/cached', status=200)
+        r2 = self.testapp.get('/api/v1/cached', status=200)
+        assert r1.json_body == list(BOOKS.values())
+        assert r2.body == r1.body
+        assert r2.headers['Content-Type'] == r1.headers['Content-Type']
+        assert CALLS == [None]
+
+    def test_query_params_and_headers_vary(self):
+        self.testapp.get('/api/v1/cached', params={'title': 'Dune'}, status=200)
+        self.testapp.get('/api/v1/cached', params={'title': 'Dune'}, status=200)
+        self.testapp.get('/api/v1/cached', params={'title': 'Foo'}, status=200)
+        self.testapp.get('/api/v1/cached', params={'title': 'Dune'},
+            headers={'Accept-Language': 'de'}, status=200)
+        # undeclared query parameters don't affect the key
+        self.testapp.get('/api/v1/cached', params={'title': 'Dune', 'x': '1'}, status=200)
+        assert CALLS == ['Dune', 'Foo', 'Dune']
+
+    def test_write_method_invalidates(self):
+        self.testapp.get('/api/v1/cached', status=200)
+        book = dict(id=1, title='New', author='Someone')
+        self.testapp.post_json('/api/v1/cached', book, status=200)
+        self.testapp.get('/api/v1/cached', status=200)
+        assert CALLS == [None, 1, None]
+
+    def test_failed_write_does_not_invalidate(self):
+        self.testapp.get('/api/v1/cached', status=200)
+        self.testapp.post_json('/api/v1/cached', dict(id='x'), status=400)
+        self.testapp.get('/api/v1/cached', status=200)
+        assert CALLS == [None]
+
+
+
+class CachedFieldsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.config = testing.setUp(settings={
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        })
+        self.config.include('pyramlson')
+        self.config.scan('.cached_fields_resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_fields_in_key(self):
+        r = self.testapp.get('/api/v1/hashed', params={'fields': 'id'}, status=200)
+        assert r.json_body == [{'id': book_id} for book_id in BOOKS]
+        r = self.testapp.get('/api/v1/hashed', status=200)
+        assert r.json_body == list(BOOKS.values())
+        r = self.testapp.get('/api/v1/hashed', params={'include': 'title'}, status=200)
+        assert r.json_body == list(BOOKS.values())
+        self.testapp.get('/api/v1/hashed', params={'fields': 'id'}, status=200)
+        assert len(CALLS) == 3
+
+
+class CachedPagesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.config = testing.setUp(settings={
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.cursor_secret': 'secret',
+        })
+        self.config.include('pyramlson')
+        self.config.scan('.cached_paged_resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_cursor_in_key(self):
+        r = self.testapp.get('/api/v1/hashed', status=200)
+        assert r.json_body == [BOOKS[123]]
+        link = r.headers['Link']
+        r = self.testapp.get(link[1:link.index('>')], status=200)
+        assert r.json_body == [BOOKS[456]]
+        r = self.testapp.get('/api/v1/hashed', status=200)
+        assert r.json_body == [BOOKS[123]]
+        assert len(CALLS) == 2
+
+
+class CachedWriteMethodTests(unittest.TestCase):
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_only_get_cached(self):
+        config = testing.setUp(settings={
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        })
+        config.include('pyramlson')
+        with self.assertRaises(ConfigurationError) as ctx:
+            config.scan('.bad_cache_resource')
+        assert 'Only GET responses can be cached: PUT /books/{bookId}' in str(ctx.exception)
+
+class FileCachedViewTests(CachedViewTests):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = {
+            'pyramlson.cache_backend': 'file',
+            'pyramlson.cache_dir': self.cache_dir,
+        }
+        super(FileCachedViewTests, self).setUp()
+
+    def tearDown(self):
+        super(FileCachedViewTests, self).tearDown()
+        shutil.rmtree(self.cache_dir)
+
+
+class MemoryCacheTests(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set('ns', 'a', entry())
+        cache.set('ns', 'b', entry())
+        assert cache.get('ns', 'a') is not None
+        cache.set('ns', 'c', entry())
+        assert cache.get('ns', 'b') is None
+        assert cache.get('ns', 'a') is not None
+        assert cache.get('ns', 'c') is not None
+
+    def test_size_bound(self):
+        cache = MemoryCache(max_bytes=10)
+        cache.set('ns', 'a', entry(b'12345'))
+        cache.set('ns', 'b', entry(b'12345'))
+        cache.set('ns', 'c', entry(b'12345'))
+        cache.set('ns', 'd', entry(b'12345678901'))
+        assert cache.get('ns', 'a') is None
+        assert cache.get('ns', 'b') is not None
+        assert cache.get('ns', 'd') is None
+        assert cache.size == 10
+
+    def test_ttl_and_invalidation(self):
+        cache = MemoryCache()
+        cache.set('ns', 'old', entry(ttl=-1))
+        assert cache.get('ns', 'old') is None
+        cache.set('ns', 'a', entry())
+        cache.set('other', 'a', entry())
+        cache.invalidate('ns')
+        assert cache.get('ns', 'a') is None
+        assert cache.get('other', 'a') is not None
+
+
+class FileCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FileCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_between_instances(self):
+        self.cache.set('ns', ('key', 1), entry(b'cached'))
+        other = FileCache(self.directory)
+        assert other.get('ns', ('key', 1)).body == b'cached'
+        other.invalidate('ns')
+        assert self.cache.get('ns', ('key', 1)) is None
+
+    def test_expired_and_broken_entries(self):
+        self.cache.set('ns', 'old', entry(ttl=-1))
+        assert self.cache.get('ns', 'old') is None
+        self.cache.set('ns', 'broken', entry())
+        with open(self.cache._path('ns', 'broken'), 'wb') as broken:
+            broken.write(b'garbage')
+        assert self.cache.get('ns', 'broken') is None
@@ -0,0 +1,63 @@
+import os
+import unittest
+
+from pyramid import testing
+
+from pyramlson.compilation import CompilationReport, ICompilationReport, warmup
+
+from .base import DATA_DIR
+from .resource import BOOKS
+
+
+class CompilationTests(unittest.TestCase):
+
+    mode = 'eager'
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.compilation': self.mode,
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        self.report = self.config.registry.getUtility(ICompilationReport)
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_compilation(self):
+        assert self.report.pending == []
+        names = [name for (name, _) in self.report.timings]
+        assert ('Get or update a book by id-/api/v1/books/{bookId}', 'GET') in names
+        assert warmup(self.config.registry) == 0
+        r = self.testapp.get('/api/v1/books/123', status=200)
+        assert r.json_body == BOOKS[123]
+
+
+class LazyCompilationTests(CompilationTests):
+
+    mode = 'lazy'
+
+    def test_compilation(self):
+        assert self.report.timings == []
+        pending = len(self.report.pending)
+        assert pending > 0
+        r = self.testapp.get('/api/v1/books/123', status=200)
+        assert r.json_body == BOOKS[123]
+        self.testapp.get('/api/v1/books/123', status=200)
+        assert [name for (name, _) in self.report.timings] == [
+            ('Get or update a book by id-/api/v1/books/{bookId}', 'GET')]
+        assert warmup(self.config.registry) == pending - 1
+        assert len(self.report.timings) == pending
+        assert self.report.pending == []
+        assert len(self.report.slowest(3)) == 3
+        self.testapp.put_json('/api/v1/books/123', BOOKS[123], status=200)
+
+
+class CompilationReportTests(unittest.TestCase):
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, CompilationReport, 'sometimes')
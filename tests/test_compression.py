@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import unittest
+
+from pyramid import testing
+
+from pyramlson.compression import Compressor
+
+from .base import DATA_DIR
+from .resource import BOOKS, CALLS
+
+
+def gunzip(body):
+    return json.loads(gzip.decompress(body).decode('utf-8'))
+
+
+class CompressionTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.compression': 'true',
+            'pyramlson.compression.encodings': 'gzip',
+            'pyramlson.compression.min_size': '100',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        self.app = self.config.make_wsgi_app()
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def get(self, path, accept_encoding=None, status=200, **headers):
+        # webtest decodes compressed responses, use webob directly
+        from webob import Request
+        if accept_encoding is not None:
+            headers['Accept-Encoding'] = accept_encoding
+        response = Request.blank('/api/v1' + path, headers=headers).get_response(self.app)
+        assert response.status_int == status
+        return response
+
+    def test_compressed(self):
+        r = self.get('/books', 'gzip')
+        assert r.headers['Content-Encoding'] == 'gzip'
+        assert r.headers['Vary'] == 'Accept-Encoding'
+        assert gunzip(r.body) == list(BOOKS.values())
+
+    def test_not_accepted(self):
+        r = self.get('/books')
+        assert 'Content-Encoding' not in r.headers
+        assert r.headers['Vary'] == 'Accept-Encoding'
+        r = self.get('/books', 'br')
+        assert 'Content-Encoding' not in r.headers
+
+    def test_small_response(self):
+        r = self.get('/books/123', 'gzip')
+        assert 'Content-Encoding' not in r.headers
+        assert r.json_body == BOOKS[123]
+
+    def test_streamed(self):
+        r = self.get('/export?count=3', 'gzip')
+        assert r.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in r.headers
+        assert gunzip(r.body) == [dict(id=0), dict(id=1), dict(id=2)]
+
+    def test_weak_etag(self):
+        r = self.get('/hashed', 'gzip')
+        etag = r.headers['ETag']
+        assert etag.startswith('W/"')
+        self.get('/hashed', 'gzip', status=304, **{'If-None-Match': etag})
+
+    def test_cached_per_encoding(self):
+        BOOKS[1] = dict(id=1, title='x' * 100, author='Someone')
+        try:
+            r1 = self.get('/cached', 'gzip')
+            r2 = self.get('/cached', 'gzip')
+            r3 = self.get('/cached')
+        finally:
+            BOOKS.pop(1)
+        assert r2.headers['Content-Encoding'] == 'gzip'
+        assert r2.body == r1.body
+        assert 'Content-Encoding' not in r3.headers
+        assert gunzip(r2.body) == r3.json_body
+        assert CALLS == [None, None]
+
+
+class NegotiationTests(unittest.TestCase):
+
+    def negotiate(self, accept_encoding, encodings=('gzip', )):
+        from pyramid.request import Request
+        request = Request.blank('/', headers={'Accept-Encoding': accept_encoding})
+        compressor = Compressor(encodings)
+        compressor.encodings = list(encodings)
+        return compressor.negotiate(request)
+
+    def test_negotiate(self):
+        assert self.negotiate('gzip, deflate') == 'gzip'
+        assert self.negotiate('identity') is None
+        assert self.negotiate('gzip;q=0') is None
+        assert self.negotiate('*') == 'gzip'
+        assert self.negotiate('gzip, br', ('br', 'gzip')) == 'br'
+        assert self.negotiate('gzip, br;q=0.5', ('br', 'gzip')) == 'gzip'
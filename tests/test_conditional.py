@@ -0,0 +1,78 @@
+import os
+import unittest
+
+from pyramid import testing
+
+from .base import DATA_DIR
+from .resource import BOOKS, CALLS
+
+
+def test_integer_etag():
+    from collections import namedtuple
+    from pyramid.request import Request
+    from pyramid.response import Response
+    from pyramlson.conditional import compile_precondition
+    Resource = namedtuple('Resource', ['method'])
+    Config = namedtuple('Config', ['etag', 'last_modified'])
+    precondition = compile_precondition(Resource('get'), Config(lambda book_id: 3, None))
+    request = Request.blank('/')
+    request.response = Response()
+    assert precondition(request, (), {'book_id': 1}) is None
+    assert request.response.etag == '3'
+    request = Request.blank('/', headers={'If-None-Match': '"3"'})
+    request.response = Response()
+    assert precondition(request, (), {'book_id': 1}).status_int == 304
+
+
+class ConditionalGetTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_method_etag(self):
+        r = self.testapp.get('/api/v1/versioned/123', status=200)
+        assert r.headers['ETag'] == '"book-123-v1"'
+        assert r.headers['Last-Modified'] == 'Sun, 01 Jan 2017 12:00:00 GMT'
+        assert r.json_body == BOOKS[123]
+        assert CALLS == ['123']
+
+        r = self.testapp.get('/api/v1/versioned/123',
+            headers={'If-None-Match': '"book-123-v1"'}, status=304)
+        assert r.body == b''
+        assert r.headers['ETag'] == '"book-123-v1"'
+        # the method wasn't called
+        assert CALLS == ['123']
+
+        self.testapp.get('/api/v1/versioned/123',
+            headers={'If-None-Match': '"book-123-v0"'}, status=200)
+        assert CALLS == ['123', '123']
+
+    def test_last_modified(self):
+        self.testapp.get('/api/v1/versioned/123',
+            headers={'If-Modified-Since': 'Sun, 01 Jan 2017 12:00:00 GMT'}, status=304)
+        self.testapp.get('/api/v1/versioned/123',
+            headers={'If-Modified-Since': 'Sun, 01 Jan 2017 11:59:59 GMT'}, status=200)
+        assert CALLS == ['123']
+
+    def test_body_hash_etag(self):
+        r = self.testapp.get('/api/v1/hashed', status=200)
+        etag = r.headers['ETag']
+        assert r.json_body == list(BOOKS.values())
+        r = self.testapp.get('/api/v1/hashed', headers={'If-None-Match': etag}, status=304)
+        assert r.body == b''
+        self.testapp.get('/api/v1/hashed', headers={'If-None-Match': '"foo"'}, status=200)
+
+    def test_no_etag_by_default(self):
+        r = self.testapp.get('/api/v1/books/123', status=200)
+        assert 'ETag' not in r.headers
@@ -0,0 +1,91 @@
+import os
+import unittest
+
+from pyramid import testing
+
+from .base import DATA_DIR
+
+
+class CorsTests(unittest.TestCase):
+
+    cors_settings = {
+        'pyramlson.cors.allow_origins': 'https://app.example.com https://admin.example.com',
+        'pyramlson.cors.allow_credentials': 'true',
+        'pyramlson.cors.max_age': '600',
+    }
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        }
+        settings.update(self.cors_settings)
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_preflight(self):
+        r = self.testapp.options('/api/v1/books',
+            headers={'Origin': 'https://app.example.com'}, status=204)
+        assert r.headers['Access-Control-Allow-Methods'] == 'GET, POST, OPTIONS'
+        assert r.headers['Access-Control-Allow-Headers'] == 'Content-Type, Authorization'
+        assert r.headers['Access-Control-Max-Age'] == '600'
+        assert r.headers['Access-Control-Allow-Origin'] == 'https://app.example.com'
+        assert r.headers['Access-Control-Allow-Credentials'] == 'true'
+        assert r.headers['Vary'] == 'Origin'
+        assert 'Access-Control-Expose-Headers' not in r.headers
+        # the headers of one response don't leak into the next one
+        r = self.testapp.options('/api/v1/books',
+            headers={'Origin': 'https://admin.example.com'}, status=204)
+        assert r.headers.getall('Access-Control-Allow-Origin') == ['https://admin.example.com']
+
+    def test_disallowed_origin(self):
+        r = self.testapp.options('/api/v1/books',
+            headers={'Origin': 'https://evil.example.com'}, status=204)
+        assert 'Access-Control-Allow-Origin' not in r.headers
+        r = self.testapp.get('/api/v1/books',
+            headers={'Origin': 'https://evil.example.com'}, status=200)
+        assert 'Access-Control-Allow-Origin' not in r.headers
+
+    def test_simple_requests(self):
+        r = self.testapp.get('/api/v1/books/123',
+            headers={'Origin': 'https://app.example.com'}, status=200)
+        assert r.headers['Access-Control-Allow-Origin'] == 'https://app.example.com'
+        assert r.headers['Access-Control-Expose-Headers'] == 'ETag, Link'
+        # errors too, so clients can read them
+        r = self.testapp.get('/api/v1/books/1',
+            headers={'Origin': 'https://app.example.com'}, status=404)
+        assert r.headers['Access-Control-Allow-Origin'] == 'https://app.example.com'
+        r = self.testapp.get('/api/v1/books/123', status=200)
+        assert 'Access-Control-Allow-Origin' not in r.headers
+
+
+class AnyOriginCorsTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.cors.allow_origins': '*',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_any_origin(self):
+        r = self.testapp.options('/api/v1/books',
+            headers={'Origin': 'https://app.example.com'}, status=204)
+        assert r.headers['Access-Control-Allow-Origin'] == '*'
+        assert r.headers['Access-Control-Max-Age'] == '86400'
+        assert 'Vary' not in r.headers
+        r = self.testapp.get('/api/v1/books/123',
+            headers={'Origin': 'https://app.example.com'}, status=200)
+        assert r.headers['Access-Control-Allow-Origin'] == '*'
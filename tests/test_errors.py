@@ -1,4 +1,5 @@
 import os
+import traceback
 import unittest
 
 from pyramid import testing
@@ -88,3 +89,86 @@ class UnknownErrorTests(unittest.TestCase):
         r = self.testapp.get('/api/v1/foo', status=500)
         self.assertEquals(r.json_body['success'], False)
         self.assertEquals(r.json_body['message'], "Unknown error")
+
+
+class ErrorLogLimiterTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-errors-api.raml'),
+            'pyramlson.error_log_interval': '60',
+            'pyramlson.error_log_burst': '2',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.error_resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        from pyramlson.error import IErrorLogLimiter
+        limiter = self.config.registry.getUtility(IErrorLogLimiter)
+        if limiter.timer is not None:
+            limiter.timer.cancel()
+        testing.tearDown()
+
+    def test_repeated_errors(self):
+        from pyramlson.error import IErrorLogLimiter
+        limiter = self.config.registry.getUtility(IErrorLogLimiter)
+        now = [1000.0]
+        limiter.clock = lambda: now[0]
+        limiter.next_sweep = now[0] + limiter.interval
+        with self.assertLogs('pyramlson.error', 'ERROR') as logs:
+            for _ in range(5):
+                r = self.testapp.get('/api/v1/foo', status=500)
+                self.assertEqual(r.json_body['message'], "Unknown error")
+            now[0] += 61
+            self.testapp.get('/api/v1/foo', status=500)
+        # two errors with context and traceback, the summary and the next error
+        self.assertEqual(len(logs.output), 7)
+        self.assertTrue('Traceback (most recent call last)' in logs.output[1])
+        self.assertTrue('3 more "Exception: " errors in the last 61s' in logs.output[4])
+
+    def test_summary_without_new_errors(self):
+        from pyramlson.error import IErrorLogLimiter
+        limiter = self.config.registry.getUtility(IErrorLogLimiter)
+        now = [1000.0]
+        limiter.clock = lambda: now[0]
+        limiter.next_sweep = now[0] + limiter.interval
+        with self.assertLogs('pyramlson.error', 'ERROR') as logs:
+            for _ in range(5):
+                self.testapp.get('/api/v1/foo', status=500)
+            # a flush is scheduled once errors are suppressed
+            self.assertTrue(limiter.timer is not None)
+            limiter.timer.cancel()
+            now[0] += 61
+            limiter.flush()
+        self.assertEqual(len(logs.output), 5)
+        self.assertTrue('3 more "Exception: " errors in the last 61s' in logs.output[4])
+        self.assertTrue(limiter.timer is None)
+
+    def test_disabled_by_default(self):
+        from pyramlson.error import IErrorLogLimiter, create_limiter
+        assert create_limiter({}) is None
+        assert self.config.registry.queryUtility(IErrorLogLimiter) is not None
+
+    def test_traceback_not_formatted(self):
+        import logging
+        from pyramlson import error
+        calls = []
+
+        class FakeTraceback(object):
+            def format_exception(self, *exc_info):
+                calls.append(exc_info)
+                return []
+
+        logger = logging.getLogger('pyramlson.error')
+        level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        error.traceback = FakeTraceback()
+        try:
+            self.testapp.get('/api/v1/foo', status=500)
+        finally:
+            logger.setLevel(level)
+            error.traceback = traceback
+        self.assertEqual(calls, [])
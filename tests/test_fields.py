@@ -0,0 +1,111 @@
+import os
+import unittest
+
+from pyramid import testing
+
+from pyramlson.fields import Projection, parse_projection
+
+from .base import DATA_DIR
+from .resource import BOOKS, CALLS
+
+
+ALL = Projection(all_fields=True)
+
+
+def test_parse_projection():
+    assert parse_projection() is None
+    assert parse_projection('', '') is None
+    assert parse_projection('id, title') == Projection({'id': ALL, 'title': ALL})
+    assert parse_projection('id,author(name,born),author.died') == Projection({
+        'id': ALL,
+        'author': Projection({'name': ALL, 'born': ALL, 'died': ALL}),
+    })
+    assert parse_projection(include='author.books,reviews') == Projection({
+        'author': Projection({'books': ALL}, all_fields=True),
+        'reviews': ALL,
+    }, all_fields=True)
+    assert parse_projection('id', 'author.books') == Projection({
+        'id': ALL,
+        'author': Projection({'books': ALL}, all_fields=True),
+    })
+    assert parse_projection('.'.join(['a'] * 16)) is not None
+    # a field selected whole stays whole
+    for fields in ('author,author.name', 'author.name,author', 'author(name),author'):
+        assert parse_projection(fields) == Projection({
+            'author': Projection({'name': ALL}, all_fields=True),
+        })
+    for (fields, include) in [
+            ('id,', None),
+            ('a(b', None),
+            ('a)', None),
+            ('a..b', None),
+            ('(a)', None),
+            (None, 'a..b'),
+            ('a(' * 20 + ')' * 20, None),
+            ('.'.join(['a'] * 17), None),
+            ('.'.join(['a'] * 1000), None),
+            ('a,' * 2000, None)]:
+        try:
+            parse_projection(fields, include)
+        except ValueError:
+            pass
+        else:
+            assert False, "ValueError expected for {!r}".format((fields, include))
+
+
+def test_apply():
+    projection = parse_projection('id,author(name)')
+    book = {'id': 1, 'title': 'Dune', 'author': {'name': 'Frank', 'born': 1920}}
+    assert projection.apply(book) == {'id': 1, 'author': {'name': 'Frank'}}
+    assert projection.apply((book, )) == [{'id': 1, 'author': {'name': 'Frank'}}]
+    assert projection.apply('text') == 'text'
+    assert projection.selects('id') and not projection.selects('title')
+    assert parse_projection(include='author').selects('title')
+    assert 'title' not in parse_projection(include='author')
+
+
+class SparseFieldsTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.response_validation': 1,
+            'pyramlson.response_validation.mode': 'strict',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_all_fields(self):
+        r = self.testapp.get('/api/v1/sparse', status=200)
+        assert [book['title'] for book in r.json_body] == [
+            book['title'] for book in BOOKS.values()]
+        assert CALLS == [None]
+
+    def test_fields(self):
+        r = self.testapp.get('/api/v1/sparse', params={'fields': 'id,author(name)'}, status=200)
+        assert r.json_body == [
+            {'id': book['id'], 'author': {'name': book['author']}}
+            for book in BOOKS.values()
+        ]
+        assert CALLS == [parse_projection('id,author(name)')]
+
+    def test_include(self):
+        r = self.testapp.get('/api/v1/sparse', params={
+            'fields': 'id',
+            'include': 'author.books',
+        }, status=200)
+        assert r.json_body[0] == {
+            'id': 123,
+            'author': {'name': BOOKS[123]['author'], 'born': 1920, 'books': [123]},
+        }
+
+    def test_invalid_fields(self):
+        r = self.testapp.get('/api/v1/sparse', params={'fields': 'id,('}, status=400)
+        assert r.json_body['message'].startswith('Invalid fields:')
@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from pyramid import testing
+
+from pyramlson import api_method, build_method_index
+
+from .base import DATA_DIR
+from .resource import BOOKS, CALLS
+
+
+class SubPathTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.convert_parameters': 'true',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        del CALLS[:]
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_sub_path(self):
+        r = self.testapp.get('/api/v1/library/123', status=200)
+        assert r.json_body == BOOKS[123]
+        r = self.testapp.options('/api/v1/library/123', status=204)
+        assert r.headers['Access-Control-Allow-Methods'] == 'GET, PUT, OPTIONS'
+        self.testapp.get('/api/v1/library/abc', status=400)
+
+    def test_invalidates_all_routes(self):
+        self.testapp.get('/api/v1/library', status=200)
+        self.testapp.get('/api/v1/library', status=200)
+        book = dict(BOOKS[123])
+        self.testapp.put_json('/api/v1/library/123', book, status=200)
+        self.testapp.get('/api/v1/library', status=200)
+        assert CALLS == ['all', 'all']
+
+
+class MethodIndexTests(unittest.TestCase):
+
+    def test_index(self):
+        evaluated = []
+
+        class Base(object):
+            @api_method('get')
+            def get_all(self):
+                pass
+
+            @api_method('delete', path='/{id}')
+            def delete(self, item_id):
+                pass
+
+        class Service(Base):
+            @property
+            def expensive(self):
+                evaluated.append(True)
+
+            @api_method('get', path='/{id}')
+            def get_one(self, item_id):
+                pass
+
+            # overrides and disables Base.delete
+            def delete(self, item_id):
+                pass
+
+        index = build_method_index(Service)
+        assert sorted(index) == [('get', ''), ('get', '/{id}')]
+        assert index[('get', '')][0] is Base.get_all
+        assert index[('get', '/{id}')][1].path == '/{id}'
+        assert evaluated == []
+
+    def test_duplicates(self):
+        class Service(object):
+            @api_method('get')
+            def a_first(self):
+                pass
+
+            @api_method('get')
+            def b_second(self):
+                pass
+
+        with self.assertLogs('pyramlson', 'WARNING'):
+            index = build_method_index(Service)
+        assert index[('get', '')][0] is Service.a_first
@@ -0,0 +1,88 @@
+import os
+import unittest
+
+from pyramid import testing
+from pyramid.exceptions import ConfigurationError
+
+from pyramlson.pagination import Cursor, CursorCodec
+
+from .base import DATA_DIR
+from .resource import BOOKS
+
+
+def next_link(response):
+    link = response.headers.get('Link')
+    if link is None:
+        return None
+    assert link.endswith('>; rel="next"')
+    return link[1:link.index('>')]
+
+
+def test_codec():
+    codec = CursorCodec('secret')
+    cursor = codec.encode('GET /books', {'id': 123})
+    assert codec.decode('GET /books', cursor) == Cursor({'id': 123})
+    for (namespace, value) in [
+            ('GET /other', cursor),
+            ('GET /books', cursor.replace('.', '')),
+            ('GET /books', cursor[:-2]),
+            ('GET /books', 'e30.' + cursor.split('.')[1]),
+            ('GET /books', '!!!.???')]:
+        try:
+            codec.decode(namespace, value)
+        except ValueError:
+            pass
+        else:
+            assert False, "ValueError expected for {!r}".format(value)
+    assert CursorCodec('other').encode('GET /books', 123) != codec.encode('GET /books', 123)
+
+
+class PaginationTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.convert_parameters': 'true',
+            'pyramlson.cursor_secret': 'secret',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.paged_resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_pages(self):
+        r = self.testapp.get('/api/v1/paged', params={'limit': 1}, status=200)
+        assert r.json_body == [BOOKS[123]]
+        url = next_link(r)
+        assert url.startswith('http://localhost/api/v1/paged?limit=1&cursor=')
+        r = self.testapp.get(url, status=200)
+        assert r.json_body == [BOOKS[456]]
+        r = self.testapp.get(next_link(r), status=200)
+        assert r.json_body == []
+        assert next_link(r) is None
+
+    def test_single_page(self):
+        r = self.testapp.get('/api/v1/paged', params={'limit': 10}, status=200)
+        assert r.json_body == list(BOOKS.values())
+        assert next_link(r) is None
+
+    def test_invalid_cursor(self):
+        r = self.testapp.get('/api/v1/paged', params={'cursor': 'MTIz.abc'}, status=400)
+        assert r.json_body['message'] == 'Invalid cursor'
+        self.testapp.get('/api/v1/paged', params={'limit': 0}, status=400)
+
+
+class MissingSecretTests(unittest.TestCase):
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_missing_secret(self):
+        settings = {'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml')}
+        config = testing.setUp(settings=settings)
+        config.include('pyramlson')
+        self.assertRaises(ConfigurationError, config.scan, '.paged_resource')
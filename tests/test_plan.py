@@ -0,0 +1,109 @@
+import os
+
+from pyramid import testing
+from pyramid.exceptions import ConfigurationError
+from pyramid.httpexceptions import HTTPBadRequest
+
+from pyramlson import MethodRestConfig, apidef
+from pyramlson.plan import compile_request_plan
+
+from .base import DATA_DIR
+
+
+def get_plan(path, method, convert_params=False):
+    api = apidef.RamlApiDefinition(
+        os.path.join(DATA_DIR, 'test-api.raml'),
+        convert_params=convert_params
+    )
+    resource = [r for r in api.get_resources(path) if r.method == method][0]
+    cfg = MethodRestConfig(method, None, 200)
+    return compile_request_plan(api, resource, cfg)
+
+
+def test_plan_uri_params():
+    plan = get_plan('/books/{bookId}', 'get')
+    assert [name for (name, _) in plan.uri_params] == ['bookId']
+    assert plan.body is None
+    assert plan.query_params == ()
+    # not converted, but validated
+    (_, convert) = plan.uri_params[0]
+    assert convert('123') == '123'
+    try:
+        convert('abc')
+    except HTTPBadRequest:
+        pass
+    else:
+        assert False, "HTTPBadRequest expected"
+
+
+def test_plan_converted_query_params():
+    plan = get_plan('/books', 'get', convert_params=True)
+    kwargs = {}
+    for extract in plan.query_params:
+        extract({'limit': '7'}, kwargs)
+    assert kwargs == {'limit': 7, 'offset': 0, 'sort_by': 'id', 'sort_reversed': False}
+
+
+def test_plan_required_query_param():
+    plan = get_plan('/books/some/other/things', 'get')
+    (extract, ) = plan.query_params
+    try:
+        extract({}, {})
+    except HTTPBadRequest as err:
+        assert err.message == 'thingType (string) is required'
+    else:
+        assert False, "HTTPBadRequest expected"
+
+
+def test_plan_body():
+    assert get_plan('/books', 'post').body is not None
+    request = testing.DummyRequest(body=b'abc')
+    assert get_plan('/files/{fileId}', 'post').body(request) == b'abc'
+
+
+def test_string_converter():
+    from pyramlson.snapshot import RamlParam
+    from pyramlson.utils import get_converter
+    param = RamlParam(
+        name='code', display_name=None, type='string', required=False,
+        default=None, enum=('AB12', 'CD34', 'ab'), pattern='^[A-Z]{2}[0-9]+$',
+        minimum=None, maximum=None, min_length=None, max_length=None
+    )
+    convert = get_converter(param)
+    assert convert('CD34') == 'CD34'
+    for value in ('XY99', 'ab'):
+        try:
+            convert(value)
+        except HTTPBadRequest:
+            pass
+        else:
+            assert False, "HTTPBadRequest expected"
+    # the public converter compiles a parameter once
+    from pyramlson.utils import _STRING_CONVERTERS, validate_and_convert
+    assert validate_and_convert(param, 'CD34') == 'CD34'
+    compiled = _STRING_CONVERTERS[id(param)][1]
+    try:
+        validate_and_convert(param, 'XY99')
+    except HTTPBadRequest:
+        pass
+    else:
+        assert False, "HTTPBadRequest expected"
+    assert _STRING_CONVERTERS[id(param)][1] is compiled
+    try:
+        get_converter(param._replace(pattern='[A-Z'))
+    except ConfigurationError as err:
+        assert "Invalid pattern for parameter 'code'" in str(err)
+    else:
+        assert False, "ConfigurationError expected"
+
+
+def test_plan_stream_body_requires_array():
+    api = apidef.RamlApiDefinition(os.path.join(DATA_DIR, 'test-api.raml'))
+    resource = api.get_resource('/books/{bookId}', 'put')
+    cfg = MethodRestConfig('put', None, 200, stream_body=True)
+    try:
+        compile_request_plan(api, resource, cfg)
+    except ConfigurationError as err:
+        assert "Only JSON array bodies can be streamed: PUT /books/{bookId}" in str(err)
+    else:
+        assert False, "ConfigurationError expected"
@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyramid import testing
+
+from pyramlson.apidef import IRamlApiDefinition
+from pyramlson.reload import IApiReloader, file_stamp
+
+from .base import DATA_DIR
+
+
+class ReloadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmpdir, 'data')
+        shutil.copytree(DATA_DIR, self.data_dir)
+        settings = {
+            'pyramlson.apidef_path': os.path.join(self.data_dir, 'test-api.raml'),
+            'pyramlson.reload': 'true',
+            'pyramlson.reload_interval': 0,
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        self.reloader = self.config.registry.getUtility(IApiReloader)
+
+    def tearDown(self):
+        testing.tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def require_isbn(self):
+        path = os.path.join(self.data_dir, 'schemas', 'BookRecord.json')
+        with open(path) as source:
+            schema = json.load(source)
+        schema['required'].append('isbn')
+        with open(path, 'w') as target:
+            json.dump(schema, target)
+
+    def test_reload(self):
+        book = {'id': 123, 'title': 'Foo', 'author': 'Blah'}
+        self.testapp.put_json('/api/v1/books/123', book, status=200)
+        old = self.reloader.apidef
+        self.require_isbn()
+        assert self.reloader.reload()
+        assert self.reloader.apidef is not old
+        # each definition has its own schema pool
+        assert self.reloader.apidef.schema_pool is not old.schema_pool
+        assert self.config.registry.getUtility(IRamlApiDefinition) is self.reloader.apidef
+        r = self.testapp.put_json('/api/v1/books/123', book, status=400)
+        assert 'isbn' in r.json_body['message']
+        self.testapp.put_json('/api/v1/books/123', dict(book, isbn='1'), status=200)
+
+    def test_broken_definition(self):
+        views = self.reloader.views
+        with open(os.path.join(self.data_dir, 'test-api.raml'), 'a') as target:
+            target.write('\n  : [\n')
+        assert not self.reloader.reload()
+        assert self.reloader.views is views
+        self.testapp.get('/api/v1/books/123', status=200)
+
+    def test_poll(self):
+        book = {'id': 123, 'title': 'Foo', 'author': 'Blah'}
+        old = self.reloader.stamp
+        self.require_isbn()
+        assert file_stamp(self.reloader.apidef_path) != old
+        # the request which notices the change finishes on the old views
+        self.testapp.put_json('/api/v1/books/123', book, status=200)
+        thread = self.reloader.thread
+        if thread is not None:
+            thread.join()
+        self.testapp.put_json('/api/v1/books/123', book, status=400)
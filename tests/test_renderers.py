@@ -0,0 +1,115 @@
+import json
+
+from datetime import datetime
+from decimal import Decimal
+
+from pyramid import testing
+
+from pyramlson.renderers import JSONSerializer, orjson, render_json
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __json__(self, request):
+        return [self.x, self.y]
+
+
+def check_serializer(backend):
+    serializer = JSONSerializer(backend)
+    serializer.add_adapter(Decimal, lambda obj, request: str(obj))
+    serializer.add_adapter(datetime, lambda obj, request: 'date')
+    data = {
+        'price': Decimal('1.10'),
+        'when': datetime(2017, 1, 1),
+        'where': Point(1, 2),
+        'list': [1, 'a', None, True],
+    }
+    assert json.loads(serializer.dumps(data).decode('utf-8')) == {
+        'price': '1.10',
+        'when': 'date',
+        'where': [1, 2],
+        'list': [1, 'a', None, True],
+    }
+    try:
+        serializer.dumps(object())
+    except TypeError:
+        pass
+    else:
+        assert False, "TypeError expected"
+
+
+def test_json_backend():
+    check_serializer('json')
+
+
+def test_orjson_backend():
+    if orjson is not None:
+        check_serializer('orjson')
+
+
+def test_auto_backend():
+    assert JSONSerializer('auto').backend in ('orjson', 'rapidjson', 'json')
+
+
+def test_adapt_objects():
+    from pyramlson.renderers import adapt_objects
+
+    class Item(object):
+        def __json__(self, request):
+            return {'when': Decimal('1.5')}
+
+    def default(obj):
+        return obj.__json__(None) if hasattr(obj, '__json__') else float(obj)
+    data = {'items': (Item(), 1, u'a', None)}
+    assert adapt_objects(data, default) == {'items': [{'when': 1.5}, 1, u'a', None]}
+
+
+def test_unknown_backend():
+    try:
+        JSONSerializer('foo')
+    except ValueError:
+        pass
+    else:
+        assert False, "ValueError expected"
+
+
+def test_subclass_adapter():
+    class MyDecimal(Decimal):
+        pass
+    serializer = JSONSerializer('json')
+    serializer.add_adapter(Decimal, lambda obj, request: float(obj))
+    assert serializer.dumps([MyDecimal('1.5')]) == b'[1.5]'
+
+
+def test_render_json():
+    request = testing.DummyRequest()
+    response = render_json(request, {'a': 1}, 201, JSONSerializer('json'))
+    assert response.status_int == 201
+    assert response.content_type == 'application/json'
+    assert response.body == b'{"a":1}'
+
+
+def test_stream_chunks():
+    from pyramlson.renderers import iter_json_array
+    dumps = lambda item: str(item).encode('utf-8')
+    chunks = list(iter_json_array(iter(range(100)), dumps, 10))
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks).decode('utf-8')) == list(range(100))
+    assert list(iter_json_array(iter([]), dumps, 10)) == [b'[]']
+
+
+def test_add_json_adapter_without_serializer():
+    from pyramid.exceptions import ConfigurationError
+    from pyramlson.renderers import add_json_adapter
+    config = testing.setUp()
+    try:
+        add_json_adapter(config, datetime, lambda obj, request: obj.isoformat())
+    except ConfigurationError:
+        pass
+    else:
+        assert False, "ConfigurationError expected"
+    finally:
+        testing.tearDown()
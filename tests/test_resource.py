@@ -8,6 +8,7 @@ from pyramid import testing
 from six import text_type
 
 from pyramid.config import Configurator
+from pyramid.exceptions import ConfigurationError
 
 from .base import DATA_DIR
 from .resource import BOOKS
@@ -135,6 +136,20 @@ class ResourceFunctionalTests(unittest.TestCase):
         r2 = self.testapp.get('/api/v1/files/{}'.format(file_id), status=200)
         assert r2.body == file_content
 
+    def test_stream_json_array(self):
+        r = self.testapp.get('/api/v1/export', status=200)
+        assert r.content_type == 'application/json'
+        assert r.json_body == [dict(id=0), dict(id=1), dict(id=2)]
+        r = self.testapp.get('/api/v1/export', params=dict(count=0), status=200)
+        assert r.json_body == []
+
+    def test_stream_ndjson(self):
+        import json
+        r = self.testapp.get('/api/v1/export/lines', status=200)
+        assert r.content_type == 'application/x-ndjson'
+        lines = r.body.decode('utf-8').splitlines()
+        assert [json.loads(line) for line in lines] == list(BOOKS.values())
+
 
 class NoMatchingResourceMethodTests(unittest.TestCase):
 
@@ -149,6 +164,41 @@ class NoMatchingResourceMethodTests(unittest.TestCase):
         self.assertRaises(NoMethodFoundError, self.config.scan, '.bad_resource')
 
 
+class BadPatternTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-bad-pattern-api.raml'),
+            'pyramlson.convert_parameters': 'true',
+        }
+        self.config = testing.setUp(settings=settings)
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_invalid_pattern(self):
+        self.config.include('pyramlson')
+        with self.assertRaises(ConfigurationError) as ctx:
+            self.config.scan('.bad_pattern_resource')
+        assert "Invalid pattern for parameter 'code'" in str(ctx.exception)
+
+
+class RescanTests(unittest.TestCase):
+
+    def test_scan_twice(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        }
+        from webtest import TestApp
+        for _ in range(2):
+            config = Configurator(settings=settings)
+            config.include('pyramlson')
+            config.scan('.resource')
+            # conflicting (i.e. duplicated) views would raise here
+            testapp = TestApp(config.make_wsgi_app())
+            testapp.get('/api/v1/books/123', status=200)
+
+
 def datetime_adapter(obj, request):
     return obj.isoformat()
 
@@ -172,6 +222,13 @@ class ParamsConverterTests(unittest.TestCase):
         from webtest import TestApp
         self.testapp = TestApp(self.config.make_wsgi_app())
 
+    def test_streamed_adapters(self):
+        r = self.testapp.get('/api/v1/export', params=dict(count=2, dated='true'), status=200)
+        assert r.json_body == [
+            {'id': 0, 'modified': '2017-01-01T12:00:00'},
+            {'id': 1, 'modified': '2017-01-01T12:00:00'},
+        ]
+
     def test_param_type_conversion(self):
         date_str = 'Sun, 06 Nov 1994 08:49:37 GMT'
         date = datetime(*parsedate(date_str)[:6])
@@ -298,3 +355,36 @@ class ParamsConverterTests(unittest.TestCase):
     def test_missing_default_in_raml(self):
         r = self.testapp.get('/api/v1/parametrized', status=200)
         assert "defined in method!" == r.json_body['missing_default']
+
+
+class FastJSONSerializerTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.arguments_transformation_callback': inflection.underscore,
+            'pyramlson.convert_parameters': 'true',
+            'pyramlson.json_serializer': 'json',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.add_pyramlson_json_adapter(datetime, datetime_adapter)
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_get_list_json(self):
+        r = self.testapp.get('/api/v1/books', status=200)
+        assert r.content_type == 'application/json'
+        assert r.json_body == list(BOOKS.values())
+
+    def test_adapter(self):
+        r = self.testapp.get('/api/v1/parametrized', status=200)
+        assert r.json_body['some_date'] == datetime_adapter(datetime(2017, 1, 1, 1, 1, 1), None)
+
+    def test_error_status(self):
+        r = self.testapp.get('/api/v1/books/111', status=404)
+        assert r.json_body['success'] == False
@@ -0,0 +1,88 @@
+import os
+import unittest
+
+from pyramid import testing
+from pyramid.exceptions import ConfigurationError
+
+from pyramlson.response_validation import sampling_rate
+
+from .base import DATA_DIR
+from .resource import BOOKS
+
+
+class ResponseValidationTests(unittest.TestCase):
+
+    validation_settings = {
+        'pyramlson.response_validation': '1',
+    }
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+        }
+        settings.update(self.validation_settings)
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        BOOKS[999] = dict(id=999, author='Nobody')
+
+    def tearDown(self):
+        BOOKS.pop(999)
+        testing.tearDown()
+
+    def test_valid_response(self):
+        with self.assertLogs('pyramlson.response_validation', 'WARNING') as logs:
+            self.testapp.get('/api/v1/books/123', status=200)
+            self.testapp.get('/api/v1/books/999', status=200)
+        assert len(logs.output) == 1
+        assert "Invalid response of GET /books/{bookId}: 'title' is a required property" \
+            in logs.output[0]
+
+
+class StrictResponseValidationTests(ResponseValidationTests):
+
+    validation_settings = {
+        'pyramlson.response_validation': 'true',
+        'pyramlson.response_validation.mode': 'strict',
+    }
+
+    def test_valid_response(self):
+        self.testapp.get('/api/v1/books/123', status=200)
+        r = self.testapp.get('/api/v1/books/999', status=500)
+        assert r.json_body['message'] == "Invalid response: 'title' is a required property"
+
+
+class DisabledResponseValidationTests(ResponseValidationTests):
+
+    validation_settings = {
+        'pyramlson.response_validation.mode': 'strict',
+    }
+
+    def test_valid_response(self):
+        self.testapp.get('/api/v1/books/999', status=200)
+
+
+class SamplingRateTests(unittest.TestCase):
+
+    def test_sampling_rate(self):
+        assert sampling_rate({}) == 0.0
+        assert sampling_rate({'pyramlson.response_validation': '0.01'}) == 0.01
+        assert sampling_rate({'pyramlson.response_validation': 'true'}) == 1.0
+        assert sampling_rate({'pyramlson.response_validation': 'false'}) == 0.0
+        assert sampling_rate({'pyramlson.response_validation': '5'}) == 1.0
+
+
+class InvalidModeTests(unittest.TestCase):
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_invalid_mode(self):
+        config = testing.setUp(settings={
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.response_validation': '1',
+            'pyramlson.response_validation.mode': 'strct',
+        })
+        self.assertRaises(ConfigurationError, config.include, 'pyramlson')
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyramlson import apidef
+from pyramlson.snapshot import RamlRoot, snapshot_key, source_files
+
+from .base import DATA_DIR
+
+
+class SnapshotCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        shutil.copytree(DATA_DIR, os.path.join(self.tmpdir, 'data'))
+        self.raml = os.path.join(self.tmpdir, 'data', 'test-api.raml')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get_api(self):
+        return apidef.RamlApiDefinition(self.raml, cache_dir=self.cache_dir)
+
+    def test_source_files(self):
+        files = source_files(self.raml)
+        assert files[0] == self.raml
+        assert os.path.join(self.tmpdir, 'data', 'schemas', 'BookRecord.json') in files
+        assert os.path.join(self.tmpdir, 'data', 'schemas', 'token.json') in files
+
+    def test_cached_definition(self):
+        api = self.get_api()
+        assert isinstance(api.raml, RamlRoot)
+        assert len(os.listdir(self.cache_dir)) == 1
+        cached = self.get_api()
+        assert cached.raml == api.raml
+        assert cached.base_path == '/api/v1'
+        resource = cached.get_resource('/books/{bookId}', 'put')
+        assert cached.get_validator(resource.body) is not None
+        assert str(cached.get_trait('sorted').description) == 'A sorted collection resource'
+
+    def test_include_changes_invalidate(self):
+        key = snapshot_key(self.raml)
+        schema = os.path.join(self.tmpdir, 'data', 'schemas', 'token.json')
+        with open(schema, 'a') as f:
+            f.write('\n')
+        assert snapshot_key(self.raml) != key
+        self.get_api()
+        self.get_api()
+        assert len(os.listdir(self.cache_dir)) == 1
+
+    def test_broken_cache_file(self):
+        self.get_api()
+        (name, ) = os.listdir(self.cache_dir)
+        with open(os.path.join(self.cache_dir, name), 'wb') as f:
+            f.write(b'garbage')
+        api = self.get_api()
+        assert len(list(api.get_resources('/books'))) == 2
@@ -0,0 +1,160 @@
+import io
+import json
+import os
+import unittest
+
+from pyramid import testing
+
+from pyramlson.streaming import iter_array_items
+
+from .base import DATA_DIR
+
+
+def parse(text, read_size=3):
+    return list(iter_array_items(io.BytesIO(text.encode('utf-8')), read_size))
+
+
+def test_iter_array_items():
+    data = [1, 12345, -1.5e3, "a,]b", {"a": [1, {"b": None}]}, True, False, None, u"ä"]
+    assert parse(json.dumps(data)) == data
+    assert parse(json.dumps(data), read_size=1) == data
+    assert parse(' [ ] ') == []
+    assert parse('[1 , 2]\n') == [1, 2]
+
+
+def test_iter_array_items_invalid():
+    for text in ('', '{}', '[1,', '[1 2]', '[1,]', '[1] 2', '[tru]'):
+        try:
+            parse(text)
+        except ValueError:
+            pass
+        else:
+            assert False, "ValueError expected for {!r}".format(text)
+
+
+class CountingStream(io.BytesIO):
+
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return io.BytesIO.read(self, size)
+
+
+def test_iter_array_items_fails_fast():
+    # an invalid item is reported without reading the rest of the body
+    stream = CountingStream(b'[{"a": tru}, ' + b'1, ' * 10000 + b'1]')
+    try:
+        list(iter_array_items(stream, read_size=16))
+    except ValueError:
+        pass
+    else:
+        assert False, "ValueError expected"
+    assert stream.reads < 3
+
+
+def test_iter_array_items_max_item_size():
+    text = json.dumps([{"a": "x" * 1000}, 1])
+    assert len(list(iter_array_items(io.BytesIO(text.encode('utf-8')), 16, 2000))) == 2
+    try:
+        list(iter_array_items(io.BytesIO(text.encode('utf-8')), 16, 100))
+    except ValueError as err:
+        assert 'larger than 100 bytes' in str(err)
+    else:
+        assert False, "ValueError expected"
+
+
+def book(bid):
+    return {'id': bid, 'title': 'Title', 'author': 'Author'}
+
+
+class StreamingBodyTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.max_body_size': '10000',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_small_body_streamed(self):
+        r = self.testapp.post_json('/api/v1/import', [book(1)], status=200)
+        assert r.json_body == {'streamed': True, 'ids': [1]}
+
+    def test_large_body_streamed(self):
+        books = [book(i) for i in range(20)]
+        r = self.testapp.post_json('/api/v1/import', books, status=200)
+        assert r.json_body == {'streamed': True, 'ids': list(range(20))}
+
+    def test_streamed_item_validation(self):
+        books = [book(i) for i in range(20)]
+        del books[5]['title']
+        r = self.testapp.post_json('/api/v1/import', books, status=400)
+        assert r.json_body['message'].startswith('Item 5:')
+
+    def test_streamed_invalid_json(self):
+        body = json.dumps([book(i) for i in range(20)])[:-1].encode('utf-8')
+        r = self.testapp.post('/api/v1/import', body,
+            content_type='application/json', status=400)
+        assert r.json_body['message'].startswith('Invalid JSON body:')
+
+    def test_chunked_max_body_size(self):
+        from webob import Request
+        body = json.dumps([book(i) for i in range(1000)]).encode('utf-8')
+        request = Request.blank('/api/v1/import', method='POST', environ={
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.input_terminated': True,
+            'CONTENT_TYPE': 'application/json',
+            'HTTP_TRANSFER_ENCODING': 'chunked',
+        })
+        request.environ.pop('CONTENT_LENGTH', None)
+        response = request.get_response(self.testapp.app)
+        assert response.status_int == 413
+
+    def test_max_body_size(self):
+        books = [book(i) for i in range(1000)]
+        assert len(json.dumps(books)) > 10000
+        r = self.testapp.post_json('/api/v1/import', books, status=413)
+        assert r.json_body['success'] == False
+
+    def test_invalid_body_message_truncated(self):
+        r = self.testapp.request('/api/v1/books/123', method='PUT',
+            body=b'{' * 90, content_type='application/json', status=400)
+        assert r.json_body['message'].startswith('Invalid JSON body:')
+        r = self.testapp.request('/api/v1/books/123', method='PUT',
+            body=b'{' * 20000, content_type='application/json', status=413)
+
+
+class InvalidSizeTests(unittest.TestCase):
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_invalid_sizes(self):
+        from pyramid.exceptions import ConfigurationError
+        for (name, value) in [
+                ('pyramlson.max_body_size', '10k'),
+                ('pyramlson.max_body_size', '-1'),
+                ('pyramlson.stream_chunk_size', 'abc')]:
+            config = testing.setUp(settings={
+                'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+                name: value,
+            })
+            self.assertRaises(ConfigurationError, config.include, 'pyramlson')
+            testing.tearDown()
+
+    def test_body_settings(self):
+        from pyramlson.plan import body_settings
+        from pyramlson.renderers import DEFAULT_CHUNK_SIZE
+        assert body_settings({}) == (DEFAULT_CHUNK_SIZE, None)
+        assert body_settings({
+            'pyramlson.stream_chunk_size': '1024',
+            'pyramlson.max_body_size': 0,
+        }) == (1024, 0)
@@ -0,0 +1,65 @@
+import os
+import socket
+import unittest
+
+from pyramid import testing
+
+from pyramlson.timing import ITimingSink, HistogramSink, StatsdSink, server_timing
+
+from .base import DATA_DIR
+
+
+class TimingTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidef_path': os.path.join(DATA_DIR, 'test-api.raml'),
+            'pyramlson.debug': 'true',
+            'pyramlson.timing': 'true',
+            'pyramlson.timing.sink': 'histogram',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+        self.sink = self.config.registry.getUtility(ITimingSink)
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_histograms(self):
+        assert isinstance(self.sink, HistogramSink)
+        book = {'id': 123, 'title': 'Foo', 'author': 'Blah'}
+        r = self.testapp.put_json('/api/v1/books/123', params=book, status=200)
+        phases = [part.split(';')[0] for part in r.headers['Server-Timing'].split(', ')]
+        assert phases == ['uri', 'body', 'validate', 'call', 'render']
+        self.testapp.get('/api/v1/books', status=200)
+        self.testapp.get('/api/v1/books', status=200)
+        snapshot = self.sink.snapshot()
+        route = 'Get or update a book by id-/api/v1/books/{bookId}'
+        assert snapshot[(route, 'PUT', 'validate')]['count'] == 1
+        assert snapshot[('Books Service-/api/v1/books', 'GET', 'query')]['count'] == 2
+
+    def test_errors_recorded(self):
+        self.testapp.get('/api/v1/books/111', status=404)
+        snapshot = self.sink.snapshot()
+        route = 'Get or update a book by id-/api/v1/books/{bookId}'
+        assert snapshot[(route, 'GET', 'uri')]['count'] == 1
+        assert (route, 'GET', 'render') not in snapshot
+
+
+def test_statsd_sink():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    server.settimeout(5)
+    sink = StatsdSink('127.0.0.1', server.getsockname()[1], 'api')
+    sink.record('Books-/api/v1/books', 'GET', [('call', 0.002), ('render', 0.0005)])
+    packet = server.recv(4096).decode('utf-8')
+    server.close()
+    assert packet == 'api.Books-_api_v1_books.get.call:2.000|ms\n' \
+        'api.Books-_api_v1_books.get.render:0.500|ms'
+
+
+def test_server_timing():
+    assert server_timing([('uri', 0.001), ('call', 0.0125)]) == 'uri;dur=1.000, call;dur=12.500'
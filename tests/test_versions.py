@@ -0,0 +1,73 @@
+import json
+import os
+import unittest
+
+from pyramid import testing
+
+from pyramlson.apidef import IRamlApiDefinition
+
+from .base import DATA_DIR
+from .resource import BOOKS
+
+
+class VersionsTests(unittest.TestCase):
+
+    def setUp(self):
+        settings = {
+            'pyramlson.apidefs': '\n'.join([
+                'v1 = {}'.format(os.path.join(DATA_DIR, 'test-api.raml')),
+                'v2 = {}'.format(os.path.join(DATA_DIR, 'test-api-v2.raml')),
+            ]),
+            'pyramlson.convert_parameters': 'true',
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.include('pyramlson')
+        self.config.scan('.versioned_resource')
+        from webtest import TestApp
+        self.testapp = TestApp(self.config.make_wsgi_app())
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_named_definitions(self):
+        registry = self.config.registry
+        assert registry.queryUtility(IRamlApiDefinition) is None
+        v1 = registry.getUtility(IRamlApiDefinition, name='v1')
+        v2 = registry.getUtility(IRamlApiDefinition, name='v2')
+        assert v1.base_path == '/api/v1'
+        assert v2.base_path == '/api/v2'
+        assert v1.get_schema_def('BookRecordJson') is v2.get_schema_def('BookRecordJson')
+
+    def test_prepare_json_body(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from pyramid.request import Request
+        from pyramlson.utils import prepare_json_body
+        v1 = self.config.registry.getUtility(IRamlApiDefinition, name='v1')
+        body = v1.get_resource('/books/{bookId}', 'put').body
+        book = dict(BOOKS[123])
+        request = Request.blank('/', POST=json.dumps(book), content_type='application/json')
+        request.registry = self.config.registry
+        assert prepare_json_body(request, body) == book
+        del book['title']
+        request = Request.blank('/', POST=json.dumps(book), content_type='application/json')
+        request.registry = self.config.registry
+        self.assertRaises(HTTPBadRequest, prepare_json_body, request, body)
+
+    def test_versions(self):
+        r = self.testapp.get('/api/v1/catalog/123', status=200)
+        assert r.json_body == BOOKS[123]
+        r = self.testapp.get('/api/v2/catalog/123', status=200)
+        assert r.json_body == BOOKS[123]
+        # only v2 defines PUT
+        self.testapp.put_json('/api/v1/catalog/123', BOOKS[123], status=404)
+        self.testapp.put_json('/api/v2/catalog/123', BOOKS[123], status=200)
+        self.testapp.put_json('/api/v2/catalog/123', {'id': 1}, status=400)
+
+    def test_find_apidef(self):
+        from pyramlson import find_apidef
+        registry = self.config.registry
+        v2 = registry.getUtility(IRamlApiDefinition, name='v2')
+        assert find_apidef(registry, 'v2') is v2
+        assert find_apidef(registry, '/api/v2') is v2
+        assert find_apidef(registry, 'v3') is None
+        assert find_apidef(registry) is None
@@ -0,0 +1,19 @@
+from pyramlson import api_service, api_method
+
+from .resource import BOOKS
+
+
+@api_service('/catalog', api='v1')
+@api_service('/catalog', api='/api/v2')
+class CatalogResource(object):
+
+    def __init__(self, request):
+        self.request = request
+
+    @api_method('get', path='/{bookId}')
+    def get_one(self, book_id):
+        return BOOKS[book_id]
+
+    @api_method('put', returns=200, path='/{bookId}')
+    def update(self, book_id, data):
+        return dict(data, id=book_id)